@@ -10,6 +10,8 @@ Features:
 - Identify cross-reactivity between similar substances
 - Provide detailed allergy warnings and recommendations
 - Support both authenticated and anonymous allergy checking
+- Names are compared as canonical ingredient IDs (drug_normalizer.py), so
+  brand names and salt forms match their ingredient ("Advil" -> ibuprofen)
 """
 
 import logging
@@ -17,6 +19,7 @@ import re
 from typing import List, Dict, Any, Optional
 from django.contrib.auth.models import User
 from .models import UserProfile
+from .drug_normalizer import drug_normalizer
 
 logger = logging.getLogger(__name__)
 
@@ -49,6 +52,10 @@ class AllergyChecker:
     
     def __init__(self):
         self.logger = logger
+        # Group members resolve to themselves inside longer names
+        drug_normalizer.add_ingredients(
+            med for group_medicines in self.ALLERGY_GROUPS.values() for med in group_medicines
+        )
     
     def check_medicine_allergies(self, medicine_name: str, user_allergies: List[str]) -> Dict[str, Any]:
         """
@@ -61,26 +68,36 @@ class AllergyChecker:
         Returns:
             Dict containing allergy check results
         """
-        medicine_lower = medicine_name.lower()
+        medicine_ids = set(drug_normalizer.ingredients(medicine_name))
+        medicine_words = set(drug_normalizer.clean(medicine_name).split()) | medicine_ids
         user_allergies_lower = [allergy.lower() for allergy in user_allergies]
+        allergy_ids = drug_normalizer.normalize_many(user_allergies_lower)
         
-        # Direct allergy matches
+        # Direct allergy matches: same ingredient, or the allergy named as
+        # whole words in the medicine (and vice versa)
         direct_matches = []
         for allergy in user_allergies_lower:
-            if allergy in medicine_lower or medicine_lower in allergy:
+            allergy_id = allergy_ids.get(allergy, '')
+            if not allergy_id:
+                continue
+            if (allergy_id in medicine_ids or
+                    set(allergy_id.split()) <= medicine_words or
+                    any(set(drug_id.split()) <= set(allergy_id.split()) for drug_id in medicine_ids)):
                 direct_matches.append(allergy)
         
         # Cross-reactivity group checks
         cross_reactions = []
         for group_name, group_medicines in self.ALLERGY_GROUPS.items():
             # Check if user is allergic to any medicine in this group
+            # (allergy text is free-form, e.g. "penicillins")
             user_allergic_to_group = any(
-                any(allergy in med or med in allergy for allergy in user_allergies_lower)
-                for med in group_medicines
+                allergy_ids.get(allergy) in group_medicines or
+                any(med in allergy for med in group_medicines)
+                for allergy in user_allergies_lower
             )
             
             # Check if prescribed medicine is in the same group
-            if user_allergic_to_group and any(med in medicine_lower for med in group_medicines):
+            if user_allergic_to_group and medicine_ids & set(group_medicines):
                 cross_reactions.append({
                     'group': group_name,
                     'reason': f'Cross-reactivity with {group_name.replace("_", " ")}',
@@ -0,0 +1,288 @@
+"""
+============================================================================
+API STUB SERVER - Local Stand-In for OpenFDA and RxNorm (Record/Replay)
+============================================================================
+
+This file provides a small local HTTP server that answers the OpenFDA
+label and RxNorm endpoints used by openfda_client.py and rxnorm_client.py,
+so the enhanced interaction path can be benchmarked and load-tested
+without the live APIs.
+
+The stub serves the upstream paths unchanged, so one server stands in for
+both hosts:
+- OpenFDA: GET /drug/label.json?search=...&limit=1
+- RxNorm:  GET /REST/drugs.json?name=...
+           GET /REST/rxcui/<rxcui>/properties.json
+           GET /REST/rxcui/<rxcui>/interactions.json
+
+Point the clients at it with:
+    OPENFDA_BASE_URL=http://127.0.0.1:8765/drug/label.json
+    RXNORM_BASE_URL=http://127.0.0.1:8765/REST
+
+Modes:
+- replay: answer from fixture files; unknown requests get the upstream
+  "not found" answer (404)
+- record: forward unknown requests to the real API (through the shared
+  HTTP transport, so rate limits apply) and save the responses as
+  fixtures; known requests are replayed
+
+Fault injection (both modes):
+- latency_ms + jitter_ms: delay added to every response
+- error_rate: fraction of requests answered with one of error_statuses
+
+Fixtures:
+- One JSON file per request: {"request": {...}, "status": ..., "body": ...}
+- Stored as <fixtures_dir>/<openfda|rxnorm>/<slug>.json
+
+Used by:
+- api/management/commands/run_api_stub.py - Starts the server
+============================================================================
+"""
+
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FIXTURES_DIR = "datasets/fixtures/api_stub"
+DEFAULT_PORT = 8765
+
+# Upstream origin for each served path prefix
+UPSTREAMS = {
+    '/drug/': ('openfda', 'https://api.fda.gov'),
+    '/REST/': ('rxnorm', 'https://rxnav.nlm.nih.gov'),
+}
+
+# What each upstream answers when nothing matches
+NOT_FOUND_BODIES = {
+    'openfda': {'error': {'code': 'NOT_FOUND', 'message': 'No matches found!'}},
+    'rxnorm': {},
+}
+
+MODES = ('replay', 'record')
+
+
+def route(path: str) -> Optional[Tuple[str, str]]:
+    """(service, upstream origin) for a request path, or None"""
+    for prefix, upstream in UPSTREAMS.items():
+        if path.startswith(prefix):
+            return upstream
+    return None
+
+
+def canonical_request(path: str, query: str) -> str:
+    """Path plus sorted query string, so parameter order does not matter"""
+    params = sorted(parse_qsl(query, keep_blank_values=True))
+    return f"{path}?{urlencode(params)}" if params else path
+
+
+def fixture_path(fixtures_dir: str, service: str, request_key: str) -> str:
+    """File name for a request: readable slug plus a short hash"""
+    slug = re.sub(r'[^A-Za-z0-9]+', '_', request_key).strip('_')[:80]
+    digest = hashlib.sha1(request_key.encode('utf-8')).hexdigest()[:10]
+    return os.path.join(fixtures_dir, service, f"{slug}-{digest}.json")
+
+
+class StubAPIServer:
+    """
+    Local OpenFDA/RxNorm stand-in with record/replay and fault injection.
+
+    Main Methods:
+    - serve_forever() - Run in the current thread until interrupted
+    - start() / stop() - Run on a background thread (benchmarks, scripts)
+    - get_stats() - Request counters (also served at /_stub/stats)
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = DEFAULT_PORT,
+                 mode: str = 'replay', fixtures_dir: str = DEFAULT_FIXTURES_DIR,
+                 latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0.0,
+                 error_statuses: Sequence[int] = (503,), transport=None, seed: Optional[int] = None):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
+        self.mode = mode
+        self.fixtures_dir = fixtures_dir
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses) or (503,)
+        self._transport = transport
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stats = {
+            'requests': 0,
+            'replayed': 0,
+            'recorded': 0,
+            'not_found': 0,
+            'injected_errors': 0,
+            'upstream_errors': 0,
+        }
+
+        handler = type('StubRequestHandler', (_StubRequestHandler,), {'stub': self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+
+    @property
+    def address(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _count(self, key: str):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _delay(self):
+        """Injected latency for one response"""
+        delay_ms = self.latency_ms
+        if self.jitter_ms:
+            with self._lock:
+                delay_ms += self._random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000.0)
+
+    def _injected_error(self) -> Optional[int]:
+        """Status code to fail this request with, or None"""
+        if self.error_rate <= 0:
+            return None
+        with self._lock:
+            if self._random.random() >= self.error_rate:
+                return None
+            return self._random.choice(self.error_statuses)
+
+    def _load_fixture(self, path: str) -> Optional[Dict]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable fixture {path}: {e}")
+            return None
+
+    def _record(self, service: str, origin: str, request_key: str, path: str) -> Optional[Dict]:
+        """Fetch from the real API and save the response as a fixture"""
+        if self._transport is None:
+            from .http_transport import http_transport
+            self._transport = http_transport
+        try:
+            response = self._transport.get(f"{origin}{request_key}")
+        except Exception as e:
+            logger.warning(f"Upstream request failed for {request_key}: {e}")
+            self._count('upstream_errors')
+            return None
+
+        if response.status_code >= 500 or response.status_code == 429:
+            # Never record an upstream outage as the expected answer
+            self._count('upstream_errors')
+            return {'status': response.status_code, 'body': {'error': f'Upstream error {response.status_code}'}}
+
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        fixture = {
+            'request': {'service': service, 'path': request_key},
+            'status': response.status_code,
+            'body': body,
+            'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(fixture, f, indent=2)
+        os.replace(tmp_path, path)
+        self._count('recorded')
+        return fixture
+
+    def respond(self, raw_path: str) -> Tuple[int, Dict]:
+        """Status and JSON body for one GET request"""
+        self._count('requests')
+        parts = urlsplit(raw_path)
+
+        if parts.path == '/_stub/stats':
+            return 200, self.get_stats()
+
+        target = route(parts.path)
+        if target is None:
+            return 404, {'error': f'Unknown path {parts.path}'}
+        service, origin = target
+
+        self._delay()
+        error_status = self._injected_error()
+        if error_status is not None:
+            self._count('injected_errors')
+            return error_status, {'error': f'Injected error {error_status}'}
+
+        request_key = canonical_request(parts.path, parts.query)
+        path = fixture_path(self.fixtures_dir, service, request_key)
+        fixture = self._load_fixture(path)
+        if fixture is not None:
+            self._count('replayed')
+            return fixture['status'], fixture['body']
+
+        if self.mode == 'record':
+            fixture = self._record(service, origin, request_key, path)
+            if fixture is not None:
+                return fixture['status'], fixture['body']
+            return 502, {'error': 'Upstream request failed'}
+
+        self._count('not_found')
+        return 404, NOT_FOUND_BODIES[service]
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update({
+            'mode': self.mode,
+            'fixtures_dir': self.fixtures_dir,
+            'latency_ms': self.latency_ms,
+            'jitter_ms': self.jitter_ms,
+            'error_rate': self.error_rate,
+        })
+        return stats
+
+    def serve_forever(self):
+        logger.info(f"API stub ({self.mode}) listening on {self.address}")
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.httpd.server_close()
+
+    def start(self) -> 'StubAPIServer':
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='api-stub', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+
+class _StubRequestHandler(BaseHTTPRequestHandler):
+    """Turns HTTP GETs into StubAPIServer.respond() calls"""
+
+    stub: StubAPIServer = None
+    protocol_version = 'HTTP/1.1'  # Keep-alive, like the real APIs
+
+    def do_GET(self):
+        status_code, body = self.stub.respond(self.path)
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
@@ -0,0 +1,54 @@
+"""
+App configuration for the api app.
+
+ready() connects the signals that keep the medical knowledge full-text
+index (api/knowledge_search.py), the medicine aliases
+(api/medicine_lookup.py) and the cached table sizes (api/table_counts.py)
+in sync, and optionally starts a background cache warm-up
+(api/cache_warmup.py) when the server starts.
+Enable it with WARM_CACHES_ON_STARTUP=1; tune it with WARM_CACHES_DAYS,
+WARM_CACHES_TOP, WARM_CACHES_TIME_BUDGET and WARM_CACHES_BIOBERT=1.
+"""
+
+import os
+import sys
+
+from django.apps import AppConfig
+
+
+def _env_flag(name: str) -> bool:
+    return os.environ.get(name, '').lower() in ('1', 'true', 'yes')
+
+
+class ApiConfig(AppConfig):
+    name = 'api'
+
+    def ready(self):
+        from .knowledge_search import connect_signals
+        from .medicine_lookup import connect_signals as connect_medicine_signals
+        from .table_counts import connect_signals as connect_count_signals
+        connect_signals()
+        connect_medicine_signals()
+        connect_count_signals()
+
+        if not _env_flag('WARM_CACHES_ON_STARTUP'):
+            return
+
+        # Only warm in the serving process: not for migrate & co., and not in
+        # the runserver autoreloader's parent process
+        if len(sys.argv) > 1 and os.path.basename(sys.argv[0]) == 'manage.py':
+            if sys.argv[1] != 'runserver':
+                return
+            if '--noreload' not in sys.argv and os.environ.get('RUN_MAIN') != 'true':
+                return
+
+        from .cache_warmup import (
+            start_warmup_thread,
+            DEFAULT_WINDOW_DAYS, DEFAULT_TOP_N, DEFAULT_TIME_BUDGET,
+        )
+        start_warmup_thread(
+            days=int(os.environ.get('WARM_CACHES_DAYS', DEFAULT_WINDOW_DAYS)),
+            top=int(os.environ.get('WARM_CACHES_TOP', DEFAULT_TOP_N)),
+            time_budget=float(os.environ.get('WARM_CACHES_TIME_BUDGET', DEFAULT_TIME_BUDGET)),
+            include_biobert=_env_flag('WARM_CACHES_BIOBERT'),
+        )
@@ -51,6 +51,7 @@ from django.db import transaction
 import logging
 
 from .models import UserProfile  # User medical data model
+from .user_interaction_state import user_interaction_tracker  # Incremental interaction state
 
 logger = logging.getLogger(__name__)
 
@@ -471,6 +472,13 @@ def update_user_profile(request):
         profile.preferences = request.data.get('preferences', profile.preferences)
         profile.save()
         
+        # Medication list changed: check only the pairs it added
+        if 'medications' in request.data:
+            try:
+                user_interaction_tracker.sync(user)
+            except Exception as e:
+                logger.error(f"Failed to update interaction state: {e}")
+        
         return Response({
             'status': 'success',
             'message': 'Profile updated successfully',
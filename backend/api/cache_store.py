@@ -0,0 +1,711 @@
+"""
+============================================================================
+CACHE STORE - Shared SQLite Cache for External Drug API Responses
+============================================================================
+
+This file provides the persistent cache used by the OpenFDA and RxNorm
+clients. All responses live in ONE SQLite database instead of one JSON
+file per drug.
+
+Why SQLite instead of JSON files:
+- Tens of thousands of small files cost an inode (and a directory scan)
+  each; cache stats used to list and stat every file on every call
+- One indexed table answers lookups with a single primary-key read
+- WAL mode lets many readers and one writer work at the same time,
+  across threads and worker processes
+
+Storage Layout:
+- Table cache_entries keyed by (source, endpoint, key)
+  - source: 'openfda' or 'rxnorm'
+  - endpoint: 'label', 'search', 'drug_info', 'interactions', ...
+  - key: normalized query (lower-cased drug name, RxCUI, ...)
+- payload: 1-byte format version header + zlib-compressed compact JSON
+  (PAYLOAD_FORMAT_VERSION; headerless zlib rows from before the header
+  existed are still readable and are upgraded by migrate_external_cache)
+- expires_at: UNIX timestamp, indexed for fast expiry scans and purges
+- negative: 1 for cached misses/errors (see Negative Caching below)
+- Table cache_counters keeps per-source entry/byte totals, maintained by
+  triggers, so stats never scan the cache
+- cache_counters also holds a global 'generation' that triggers bump
+  whenever an entry is added, replaced or removed (fetch, refresh, purge,
+  clear, migration); generation() lets derived caches notice that, across
+  processes
+
+Memory Tier:
+- A bounded in-process LRU (MemoryTier) sits in front of SQLite
+- Hot entries (e.g. aspirin) are served without decompressing or parsing
+- Budgeted by entry count AND payload bytes; least recently used evicted
+- Each entry keeps the disk expires_at, so both tiers expire together
+- Hits are counted per tier (memory_hits / disk_hits) in get_stats()
+
+Stale-While-Revalidate:
+- Expired entries are kept (up to DEFAULT_MAX_STALE past expiry) and can be
+  served immediately via get_entry(..., max_stale=...)
+- schedule_refresh() re-fetches them on a small background thread pool;
+  if the refresh fails the stale copy stays until the max-stale bound
+- put() jitters every TTL by +/-10% so entries cached together (bulk
+  downloads, warm-ups) do not all expire in the same minute
+
+Negative Caching:
+- "Not found" and error responses are cached too (put(..., negative=True))
+  with a much shorter TTL chosen by the client, so a misspelled drug does
+  not hit the network on every request
+- Negative entries are never served stale and never overwrite a positive
+  entry that is still within the max-stale window
+- Counted separately (negative_entries / negative_hits) in get_stats()
+
+Used by:
+- api/openfda_client.py - FDA label cache
+- api/rxnorm_client.py - RxNorm query cache
+- api/management/commands/prune_external_cache.py - Eviction and VACUUM
+
+Location:
+- backend/datasets/cache/external_api_cache.sqlite3, resolved from this
+  file whatever the working directory (EXTERNAL_API_CACHE_PATH overrides
+  it; MEDICINE_CACHE_DIR moves the whole cache directory, which the test
+  settings point at a temporary directory)
+============================================================================
+"""
+
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# State shared by all processes lives under backend/datasets/cache
+# (also used by rate_limiter.py's bucket and single_flight.py's lock files)
+CACHE_DIR = Path(os.environ.get('MEDICINE_CACHE_DIR')
+                 or Path(__file__).resolve().parent.parent / 'datasets' / 'cache')
+DEFAULT_DB_PATH = str(CACHE_DIR / 'external_api_cache.sqlite3')
+
+# Expired entries may still be served (and refreshed in the background)
+# for this long; after that a caller must wait for a live fetch
+DEFAULT_MAX_STALE = timedelta(days=30)
+
+# Fraction by which every TTL is randomly shortened or lengthened
+DEFAULT_TTL_JITTER = 0.1
+
+# Background threads used to refresh stale entries
+REFRESH_WORKERS = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    source      TEXT    NOT NULL,
+    endpoint    TEXT    NOT NULL,
+    key         TEXT    NOT NULL,
+    payload     BLOB    NOT NULL,
+    size        INTEGER NOT NULL,
+    created_at  REAL    NOT NULL,
+    expires_at  REAL    NOT NULL,
+    negative    INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (source, endpoint, key)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_cache_entries_expires_at
+    ON cache_entries (expires_at);
+
+CREATE INDEX IF NOT EXISTS idx_cache_entries_negative
+    ON cache_entries (source) WHERE negative = 1;
+
+CREATE TABLE IF NOT EXISTS cache_counters (
+    source  TEXT    NOT NULL,
+    name    TEXT    NOT NULL,
+    value   INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (source, name)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_entries_insert
+AFTER INSERT ON cache_entries
+BEGIN
+    INSERT INTO cache_counters (source, name, value) VALUES (NEW.source, 'entries', 1)
+        ON CONFLICT (source, name) DO UPDATE SET value = value + 1;
+    INSERT INTO cache_counters (source, name, value) VALUES (NEW.source, 'bytes', NEW.size)
+        ON CONFLICT (source, name) DO UPDATE SET value = value + NEW.size;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_entries_update
+AFTER UPDATE OF size ON cache_entries
+BEGIN
+    UPDATE cache_counters SET value = value + NEW.size - OLD.size
+        WHERE source = NEW.source AND name = 'bytes';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_entries_delete
+AFTER DELETE ON cache_entries
+BEGIN
+    UPDATE cache_counters SET value = value - 1
+        WHERE source = OLD.source AND name = 'entries';
+    UPDATE cache_counters SET value = value - OLD.size
+        WHERE source = OLD.source AND name = 'bytes';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_generation_insert
+AFTER INSERT ON cache_entries
+BEGIN
+    INSERT INTO cache_counters (source, name, value) VALUES ('*', 'generation', 1)
+        ON CONFLICT (source, name) DO UPDATE SET value = value + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_generation_update
+AFTER UPDATE OF payload ON cache_entries
+BEGIN
+    INSERT INTO cache_counters (source, name, value) VALUES ('*', 'generation', 1)
+        ON CONFLICT (source, name) DO UPDATE SET value = value + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_cache_generation_delete
+AFTER DELETE ON cache_entries
+BEGIN
+    INSERT INTO cache_counters (source, name, value) VALUES ('*', 'generation', 1)
+        ON CONFLICT (source, name) DO UPDATE SET value = value + 1;
+END;
+"""
+
+
+def normalize_cache_key(key: str) -> str:
+    """Normalize a query so 'Aspirin ' and 'aspirin' share one entry"""
+    return ' '.join(str(key).lower().split())
+
+
+# First byte of every stored payload. Version 1 was headerless zlib, whose
+# first byte is always 0x78, so the two can never be confused.
+PAYLOAD_FORMAT_VERSION = 2
+LEGACY_ZLIB_HEADER = 0x78
+
+
+def serialize_payload(data: Dict) -> bytes:
+    """Compact (no whitespace) UTF-8 JSON"""
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def compress_payload(raw: bytes) -> bytes:
+    """Prefix the format version and compress serialized JSON"""
+    return bytes([PAYLOAD_FORMAT_VERSION]) + zlib.compress(raw, 6)
+
+
+def decompress_payload(payload: bytes) -> bytes:
+    """Return the serialized JSON of a stored payload (any known version)"""
+    version = payload[0] if payload else None
+    if version == PAYLOAD_FORMAT_VERSION:
+        return zlib.decompress(payload[1:])
+    if version == LEGACY_ZLIB_HEADER:
+        return zlib.decompress(payload)
+    raise ValueError(f"Unknown cache payload format: {version!r}")
+
+
+def payload_version(payload: bytes) -> int:
+    """Format version of a stored payload (1 = legacy headerless zlib)"""
+    return 1 if payload and payload[0] == LEGACY_ZLIB_HEADER else payload[0]
+
+
+def encode_payload(data: Dict) -> bytes:
+    """Serialize to compact JSON and compress"""
+    return compress_payload(serialize_payload(data))
+
+
+def decode_payload(payload: bytes) -> Dict:
+    """Decompress and parse a stored payload"""
+    return json.loads(decompress_payload(payload).decode('utf-8'))
+
+
+class MemoryTier:
+    """
+    Bounded in-process LRU cache of decoded payloads.
+
+    Entries are evicted least-recently-used first once either budget
+    (max_entries or max_bytes) is exceeded. Sizes are the uncompressed
+    JSON length, a close proxy for the memory a parsed payload holds.
+    """
+
+    def __init__(self, max_entries: int = 2048, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()   # (source, endpoint, key) -> (value, expires_at, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, cache_key):
+        """Return a fresh entry's value and mark it most recently used"""
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None:
+                return None
+            value, expires_at, size = entry
+            if expires_at <= time.time():
+                del self._entries[cache_key]
+                self._bytes -= size
+                return None
+            self._entries.move_to_end(cache_key)
+            return value
+
+    def put(self, cache_key, value, expires_at: float, size: int):
+        """Insert an entry, evicting LRU entries to stay within budget"""
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(cache_key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[cache_key] = (value, expires_at, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[2]
+
+    def discard(self, cache_key):
+        with self._lock:
+            old = self._entries.pop(cache_key, None)
+            if old is not None:
+                self._bytes -= old[2]
+
+    def clear(self, source: Optional[str] = None):
+        with self._lock:
+            if source is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            for cache_key in [k for k in self._entries if k[0] == source]:
+                self._bytes -= self._entries.pop(cache_key)[2]
+
+    def get_stats(self, source: str) -> Dict:
+        with self._lock:
+            sizes = [entry[2] for k, entry in self._entries.items() if k[0] == source]
+        return {'entries': len(sizes), 'bytes': sum(sizes)}
+
+
+class CacheStore:
+    """
+    SQLite-backed cache shared by all external API clients.
+
+    Singleton Pattern:
+    - Instance created: cache_store = CacheStore()
+    - One connection per thread (and per process after a fork)
+
+    Main Methods:
+    - get() - Return a fresh cached payload or None (memory tier first)
+    - get_entry() - Like get(), but may return stale data with a flag
+    - schedule_refresh() - Refresh a stale entry in the background
+    - put() - Store a payload with a time-to-live
+    - delete() / clear() - Remove entries
+    - purge_expired() - Evict expired entries
+    - vacuum() - Reclaim disk space after large purges
+    - get_stats() - Per-source totals from counters (no table scan)
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH,
+                 memory_max_entries: int = 2048, memory_max_bytes: int = 32 * 1024 * 1024):
+        self.db_path = db_path
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._local = threading.local()
+
+        # Per-process lookup counters (cheap, reset on restart)
+        self._counter_lock = threading.Lock()
+        self._lookups = {}
+
+        # Hot entries are kept decoded in memory, in front of SQLite
+        self.memory = MemoryTier(memory_max_entries, memory_max_bytes)
+
+        # Background refresh of stale entries (created on first use)
+        self._refresh_executor = None
+        self._refresh_lock = threading.Lock()
+        self._refreshing = set()
+
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection, reconnecting after a fork"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _init_schema(self):
+        """Create tables, indexes and counter triggers if missing"""
+        try:
+            conn = self._connect()
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(cache_entries)')]
+            if columns and 'negative' not in columns:
+                # Databases created before negative caching existed
+                conn.execute('ALTER TABLE cache_entries ADD COLUMN negative INTEGER NOT NULL DEFAULT 0')
+            conn.executescript(SCHEMA)
+        except sqlite3.Error as e:
+            logger.error(f"Error initializing cache store at {self.db_path}: {e}")
+
+    def _count_lookup(self, source: str, outcome: str):
+        with self._counter_lock:
+            counters = self._lookups.setdefault(
+                source, {'memory_hits': 0, 'disk_hits': 0, 'stale_hits': 0, 'negative_hits': 0, 'misses': 0}
+            )
+            counters[outcome] += 1
+
+    def get(self, source: str, endpoint: str, key: str) -> Optional[Dict]:
+        """
+        Return the cached payload if present and not expired
+        """
+        entry = self.get_entry(source, endpoint, key)
+        return entry[0] if entry else None
+
+    def get_entry(self, source: str, endpoint: str, key: str,
+                  max_stale: Union[timedelta, float] = 0) -> Optional[Tuple[Dict, bool]]:
+        """
+        Return (payload, is_stale) or None.
+
+        Checks the in-memory LRU first and promotes fresh disk hits into it.
+        Entries that expired less than `max_stale` ago are returned with
+        is_stale=True. Payloads are shallow copies so callers can add
+        top-level keys without touching the shared cached object.
+        """
+        cache_key = (source, endpoint, normalize_cache_key(key))
+
+        entry = self.memory.get(cache_key)
+        if entry is not None:
+            data, negative = entry
+            self._count_lookup(source, 'negative_hits' if negative else 'memory_hits')
+            return dict(data), False
+
+        max_stale_seconds = max_stale.total_seconds() if isinstance(max_stale, timedelta) else float(max_stale)
+        now = time.time()
+        try:
+            row = self._connect().execute(
+                'SELECT payload, expires_at, negative FROM cache_entries '
+                'WHERE source = ? AND endpoint = ? AND key = ? '
+                'AND expires_at > CASE WHEN negative = 1 THEN ? ELSE ? END',
+                (source, endpoint, cache_key[2], now, now - max_stale_seconds)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Error reading cache entry {source}/{endpoint}/{key}: {e}")
+            return None
+
+        if row is None:
+            self._count_lookup(source, 'misses')
+            return None
+
+        try:
+            raw = decompress_payload(row[0])
+            data = json.loads(raw.decode('utf-8'))
+        except (zlib.error, ValueError) as e:
+            logger.error(f"Corrupt cache entry {source}/{endpoint}/{key}: {e}")
+            self.delete(source, endpoint, key)
+            self._count_lookup(source, 'misses')
+            return None
+
+        is_stale = row[1] <= now
+        if is_stale:
+            self._count_lookup(source, 'stale_hits')
+        else:
+            self.memory.put(cache_key, (data, bool(row[2])), row[1], len(raw))
+            self._count_lookup(source, 'negative_hits' if row[2] else 'disk_hits')
+        return dict(data), is_stale
+
+    def schedule_refresh(self, source: str, endpoint: str, key: str,
+                         refresh: Callable[[], Optional[Dict]]) -> bool:
+        """
+        Run `refresh` on a background thread unless one is already running
+        for this entry. The callable is expected to fetch and store the new
+        payload itself (the clients' normal fetch path already does).
+        """
+        cache_key = (source, endpoint, normalize_cache_key(key))
+        with self._refresh_lock:
+            if cache_key in self._refreshing:
+                return False
+            self._refreshing.add(cache_key)
+            if self._refresh_executor is None:
+                self._refresh_executor = ThreadPoolExecutor(
+                    max_workers=REFRESH_WORKERS, thread_name_prefix='cache-refresh'
+                )
+
+        def run():
+            try:
+                result = refresh()
+                if isinstance(result, dict) and result.get('error'):
+                    logger.warning(
+                        f"Background refresh failed for {source}/{endpoint}/{key}, "
+                        f"keeping stale entry: {result['error']}"
+                    )
+            except Exception as e:
+                logger.error(f"Background refresh error for {source}/{endpoint}/{key}: {e}")
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(cache_key)
+
+        self._refresh_executor.submit(run)
+        logger.info(f"Scheduled background refresh for {source}/{endpoint}/{key}")
+        return True
+
+    def put(self, source: str, endpoint: str, key: str, data: Dict,
+            ttl: Union[timedelta, float], jitter: float = DEFAULT_TTL_JITTER,
+            negative: bool = False) -> bool:
+        """
+        Store a payload; replaces any existing entry for the same key.
+        The TTL is randomly stretched or shrunk by up to `jitter`.
+
+        A negative entry (cached miss/error) does not replace a positive
+        entry that can still be served stale; returns False in that case.
+        """
+        ttl_seconds = ttl.total_seconds() if isinstance(ttl, timedelta) else float(ttl)
+        if jitter:
+            ttl_seconds *= 1 + random.uniform(-jitter, jitter)
+        raw = serialize_payload(data)
+        payload = compress_payload(raw)
+        now = time.time()
+        cache_key = (source, endpoint, normalize_cache_key(key))
+
+        try:
+            cursor = self._connect().execute(
+                'INSERT INTO cache_entries '
+                '(source, endpoint, key, payload, size, created_at, expires_at, negative) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (source, endpoint, key) DO UPDATE SET '
+                'payload = excluded.payload, size = excluded.size, '
+                'created_at = excluded.created_at, expires_at = excluded.expires_at, '
+                'negative = excluded.negative '
+                'WHERE excluded.negative = 0 OR cache_entries.negative = 1 '
+                'OR cache_entries.expires_at <= ?',
+                (source, endpoint, cache_key[2], payload, len(payload), now, now + ttl_seconds,
+                 int(negative), now - DEFAULT_MAX_STALE.total_seconds())
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Error writing cache entry {source}/{endpoint}/{key}: {e}")
+            self.memory.discard(cache_key)
+            return False
+
+        if cursor.rowcount == 0:
+            return False
+
+        self.memory.put(cache_key, (data, negative), now + ttl_seconds, len(raw))
+        return True
+
+    def restore(self, source: str, endpoint: str, key: str, data: Dict,
+                created_at: float, expires_at: float, negative: bool = False) -> int:
+        """
+        Store a payload with explicit timestamps (cache migrations/imports).
+        An existing entry is only replaced if it is older than created_at,
+        so an import never overwrites fresher data fetched since.
+        Returns the stored payload size in bytes (0 if the entry was kept).
+        """
+        payload = encode_payload(data)
+        cursor = self._connect().execute(
+            'INSERT INTO cache_entries '
+            '(source, endpoint, key, payload, size, created_at, expires_at, negative) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT (source, endpoint, key) DO UPDATE SET '
+            'payload = excluded.payload, size = excluded.size, '
+            'created_at = excluded.created_at, expires_at = excluded.expires_at, '
+            'negative = excluded.negative '
+            'WHERE excluded.created_at > cache_entries.created_at',
+            (source, endpoint, normalize_cache_key(key), payload, len(payload),
+             created_at, expires_at, int(negative))
+        )
+        if not cursor.rowcount:
+            return 0
+        self.memory.discard((source, endpoint, normalize_cache_key(key)))
+        return len(payload)
+
+    def rewrite_payloads(self, transform: Callable[[str, str, Dict], Dict],
+                         source: Optional[str] = None, batch_size: int = 500) -> Dict:
+        """
+        Re-encode every stored payload in the current format.
+
+        transform(source, endpoint, data) returns the data to keep (e.g.
+        with unused fields pruned). Rows are rewritten in batches, each in
+        its own transaction. Returns byte and parse-time totals before and
+        after, for reporting.
+        """
+        conn = self._connect()
+        report = {'entries': 0, 'upgraded': 0, 'bytes_before': 0, 'bytes_after': 0,
+                  'parse_seconds_before': 0.0, 'parse_seconds_after': 0.0, 'errors': 0}
+
+        query = 'SELECT source, endpoint, key FROM cache_entries'
+        params = ()
+        if source:
+            query += ' WHERE source = ?'
+            params = (source,)
+        keys = conn.execute(query, params).fetchall()
+
+        for start in range(0, len(keys), batch_size):
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for entry_key in keys[start:start + batch_size]:
+                    row = conn.execute(
+                        'SELECT payload FROM cache_entries WHERE source = ? AND endpoint = ? AND key = ?',
+                        entry_key
+                    ).fetchone()
+                    if row is None:
+                        continue
+                    old_payload = row[0]
+                    report['entries'] += 1
+                    try:
+                        started = time.perf_counter()
+                        data = decode_payload(old_payload)
+                        report['parse_seconds_before'] += time.perf_counter() - started
+                    except (zlib.error, ValueError):
+                        report['errors'] += 1
+                        continue
+
+                    new_payload = encode_payload(transform(entry_key[0], entry_key[1], data))
+                    started = time.perf_counter()
+                    decode_payload(new_payload)
+                    report['parse_seconds_after'] += time.perf_counter() - started
+
+                    report['bytes_before'] += len(old_payload)
+                    report['bytes_after'] += len(new_payload)
+                    if new_payload != old_payload:
+                        conn.execute(
+                            'UPDATE cache_entries SET payload = ?, size = ? '
+                            'WHERE source = ? AND endpoint = ? AND key = ?',
+                            (new_payload, len(new_payload)) + tuple(entry_key)
+                        )
+                        report['upgraded'] += 1
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+
+        self.memory.clear(source)
+        return report
+
+    def delete(self, source: str, endpoint: str, key: str):
+        """
+        Remove a single entry
+        """
+        self.memory.discard((source, endpoint, normalize_cache_key(key)))
+        try:
+            self._connect().execute(
+                'DELETE FROM cache_entries WHERE source = ? AND endpoint = ? AND key = ?',
+                (source, endpoint, normalize_cache_key(key))
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Error deleting cache entry {source}/{endpoint}/{key}: {e}")
+
+    def clear(self, source: Optional[str] = None) -> int:
+        """
+        Remove all entries (optionally for one source only)
+        """
+        self.memory.clear(source)
+        conn = self._connect()
+        if source:
+            cursor = conn.execute('DELETE FROM cache_entries WHERE source = ?', (source,))
+        else:
+            cursor = conn.execute('DELETE FROM cache_entries')
+        return cursor.rowcount
+
+    def purge_expired(self, grace: Union[timedelta, float] = 0, source: Optional[str] = None) -> int:
+        """
+        Evict entries that expired more than `grace` ago (uses the expires_at index)
+        """
+        grace_seconds = grace.total_seconds() if isinstance(grace, timedelta) else float(grace)
+        cutoff = time.time() - grace_seconds
+        conn = self._connect()
+        if source:
+            cursor = conn.execute(
+                'DELETE FROM cache_entries WHERE expires_at <= ? AND source = ?', (cutoff, source)
+            )
+        else:
+            cursor = conn.execute('DELETE FROM cache_entries WHERE expires_at <= ?', (cutoff,))
+        return cursor.rowcount
+
+    def entry_stamp(self, source: str, endpoint: str, key: str) -> Optional[float]:
+        """
+        created_at of the stored entry (expired and negative entries
+        included), None if there is none. The stamp changes exactly when
+        the entry is fetched, refreshed or removed, so derived results can
+        be versioned on the entries they were built from.
+        """
+        try:
+            row = self._connect().execute(
+                'SELECT created_at FROM cache_entries WHERE source = ? AND endpoint = ? AND key = ?',
+                (source, endpoint, normalize_cache_key(key))
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Error reading cache entry stamp {source}/{endpoint}/{key}: {e}")
+            return None
+        return row[0] if row else None
+
+    def generation(self) -> Optional[int]:
+        """
+        Global change counter: bumped whenever a cached entry is added,
+        replaced or removed by any process sharing this database.
+        None if it cannot be read.
+        """
+        try:
+            row = self._connect().execute(
+                "SELECT value FROM cache_counters WHERE source = '*' AND name = 'generation'"
+            ).fetchone()
+            return row[0] if row else 0
+        except sqlite3.Error as e:
+            logger.warning(f"Error reading cache generation: {e}")
+            return None
+
+    def vacuum(self):
+        """
+        Rebuild the database file to return freed pages to the filesystem
+        """
+        conn = self._connect()
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        conn.execute('VACUUM')
+
+    def get_stats(self, source: str) -> Dict:
+        """
+        Get statistics for one source from the counter table.
+
+        Totals come from trigger-maintained counters; the expired count is
+        an index range scan over expires_at, not a full table scan.
+        """
+        conn = self._connect()
+        counters = dict(conn.execute(
+            'SELECT name, value FROM cache_counters WHERE source = ?', (source,)
+        ).fetchall())
+        expired = conn.execute(
+            'SELECT COUNT(*) FROM cache_entries WHERE expires_at <= ? AND source = ?',
+            (time.time(), source)
+        ).fetchone()[0]
+        negative = conn.execute(
+            'SELECT COUNT(*) FROM cache_entries WHERE source = ? AND negative = 1', (source,)
+        ).fetchone()[0]
+
+        total = counters.get('entries', 0)
+        with self._counter_lock:
+            lookups = dict(self._lookups.get(
+                source, {'memory_hits': 0, 'disk_hits': 0, 'stale_hits': 0, 'negative_hits': 0, 'misses': 0}
+            ))
+        memory = self.memory.get_stats(source)
+
+        return {
+            'total_entries': total,
+            'valid_entries': total - expired,
+            'expired_entries': expired,
+            'negative_entries': negative,
+            'payload_bytes': counters.get('bytes', 0),
+            'hits': lookups['memory_hits'] + lookups['disk_hits'] + lookups['stale_hits'],
+            'memory_hits': lookups['memory_hits'],
+            'disk_hits': lookups['disk_hits'],
+            'stale_hits': lookups['stale_hits'],
+            'negative_hits': lookups['negative_hits'],
+            'misses': lookups['misses'],
+            'memory_entries': memory['entries'],
+            'memory_bytes': memory['bytes'],
+            'refreshes_in_flight': sum(1 for k in list(self._refreshing) if k[0] == source),
+            'cache_database': self.db_path
+        }
+
+# Global instance (EXTERNAL_API_CACHE_PATH keeps benchmark runs against the
+# API stub out of the real cache)
+cache_store = CacheStore(os.environ.get('EXTERNAL_API_CACHE_PATH', DEFAULT_DB_PATH))
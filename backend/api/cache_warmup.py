@@ -0,0 +1,205 @@
+"""
+============================================================================
+CACHE WARM-UP - Popularity-Driven Pre-Population After Deploys
+============================================================================
+
+After a deploy or a cache clear, the first users to mention a common drug
+pay for cold caches: OpenFDA/RxNorm round trips, the medicine database
+scan and, on the very first analysis, loading BioBERT. This file mines
+recent prescription history for the most frequently extracted medicines
+and resolves them ahead of real traffic.
+
+What gets warmed per medicine:
+- External API caches (OpenFDA label + RxNorm concept) via
+  enhanced_interaction_checker.get_medicine_info() - these live in the
+  shared SQLite cache store, so any process can warm them
+- In-process only (in_process=True, the startup thread): medicine
+  resolution results (views._get_detailed_medicine_info), alternatives
+  results (views._get_medicine_alternatives) and optionally the BioBERT
+  model. These are per-process memory caches; warming them from a
+  separate, short-lived process (the management command) would do nothing
+  for the server
+
+Features:
+- Top-N names over a recent window of PrescriptionHistory.extracted_data
+- Hard time budget: medicines not started before the deadline are skipped
+- Small worker pool; external pacing comes from the shared rate limiter
+- start_warmup_thread() runs it in the background at process startup
+
+Used by:
+- api/management/commands/warm_caches.py - Command line runs (shared
+  cache store only)
+- api/apps.py: ApiConfig.ready() - Startup warm-up inside the server
+  process (WARM_CACHES_ON_STARTUP=1)
+============================================================================
+"""
+
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import timedelta
+from typing import Dict, Iterable, List
+
+from .prefetch import RATE_LIMIT_WAIT, retryable_error_type
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW_DAYS = 30
+DEFAULT_TOP_N = 50
+DEFAULT_TIME_BUDGET = 60  # seconds
+DEFAULT_WORKERS = 4
+
+
+def _extracted_names(extracted_data) -> Iterable[str]:
+    """Medicine names stored in one PrescriptionHistory.extracted_data value"""
+    if not isinstance(extracted_data, dict):
+        return []
+    names = []
+    for medicine in extracted_data.get('medicines') or []:
+        name = medicine.get('name', '') if isinstance(medicine, dict) else medicine
+        if isinstance(name, str) and name.strip():
+            names.append(name.strip())
+    return names
+
+
+def top_prescribed_medicines(days: int = DEFAULT_WINDOW_DAYS, limit: int = DEFAULT_TOP_N) -> List[str]:
+    """
+    Most frequently extracted medicine names over the last `days` days.
+
+    Names are counted case-insensitively (each prescription counts a name
+    once); the most common spelling is returned for each.
+    """
+    from django.utils import timezone
+    from .models import PrescriptionHistory
+
+    since = timezone.now() - timedelta(days=days)
+    counts = Counter()
+    spellings = {}
+
+    rows = (PrescriptionHistory.objects
+            .filter(created_at__gte=since)
+            .values_list('extracted_data', flat=True)
+            .iterator(chunk_size=500))
+    for extracted_data in rows:
+        seen = set()
+        for name in _extracted_names(extracted_data):
+            key = name.lower()
+            spellings.setdefault(key, Counter())[name] += 1
+            if key not in seen:
+                seen.add(key)
+                counts[key] += 1
+
+    return [spellings[key].most_common(1)[0][0] for key, _ in counts.most_common(limit)]
+
+
+def _warm_medicine(name: str, in_process: bool) -> Dict:
+    """Resolve one medicine through the shared (and optionally in-process) caches"""
+    from .enhanced_drug_interactions import enhanced_interaction_checker
+    from .http_transport import http_transport
+
+    if in_process:
+        # Imported lazily: views pulls in the whole request stack
+        from .views import _get_detailed_medicine_info, _get_medicine_alternatives
+        _get_detailed_medicine_info(name)
+        _get_medicine_alternatives(name)
+    with http_transport.rate_limit_budget(RATE_LIMIT_WAIT):
+        info = enhanced_interaction_checker.get_medicine_info(name)
+    # "Not found" is a cached answer too; only upstream failures count
+    return {'name': name, 'error': info.get('error') or retryable_error_type(info)}
+
+
+def warm_caches(names: Iterable[str], time_budget: float = DEFAULT_TIME_BUDGET,
+                workers: int = DEFAULT_WORKERS, in_process: bool = False,
+                include_biobert: bool = False) -> Dict:
+    """
+    Warm caches for the given medicines within time_budget seconds.
+
+    The shared cache store is always warmed; in_process=True also fills
+    this process's memory caches (and BioBERT if include_biobert), which
+    only helps when called inside the serving process.
+
+    Medicines still queued when the budget runs out are skipped; lookups
+    already in flight are allowed to finish in the background.
+
+    Returns:
+    - Summary dict: total, warmed, failed, skipped, biobert_loaded,
+      elapsed_seconds, failures
+    """
+    names = list(dict.fromkeys(name for name in names if name))
+    started = time.monotonic()
+    deadline = started + time_budget
+    summary = {
+        'total': len(names),
+        'warmed': 0,
+        'failed': 0,
+        'skipped': 0,
+        'biobert_loaded': None,
+        'elapsed_seconds': 0,
+        'failures': [],
+    }
+
+    if in_process and include_biobert:
+        from .views import get_biobert_processor
+        summary['biobert_loaded'] = get_biobert_processor() is not None
+
+    def task(name):
+        if time.monotonic() >= deadline:
+            return None
+        return _warm_medicine(name, in_process)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='cache-warmup')
+    try:
+        futures = [executor.submit(task, name) for name in names]
+        done, not_done = wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+        for future in done:
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.warning(f"Cache warm-up lookup failed: {e}")
+                summary['failed'] += 1
+                continue
+            if result is None:
+                summary['skipped'] += 1
+            elif result['error']:
+                summary['failed'] += 1
+                summary['failures'].append(result['name'])
+            else:
+                summary['warmed'] += 1
+        summary['skipped'] += len(not_done)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    summary['elapsed_seconds'] = round(time.monotonic() - started, 2)
+    logger.info(
+        f"Cache warm-up: {summary['warmed']} warmed, {summary['failed']} failed, "
+        f"{summary['skipped']} skipped in {summary['elapsed_seconds']}s"
+    )
+    return summary
+
+
+def warm_popular_medicines(days: int = DEFAULT_WINDOW_DAYS, top: int = DEFAULT_TOP_N,
+                           time_budget: float = DEFAULT_TIME_BUDGET,
+                           workers: int = DEFAULT_WORKERS, in_process: bool = False,
+                           include_biobert: bool = False) -> Dict:
+    """Warm caches for the top prescribed medicines of the recent window"""
+    names = top_prescribed_medicines(days=days, limit=top)
+    return warm_caches(names, time_budget=time_budget, workers=workers,
+                       in_process=in_process, include_biobert=include_biobert)
+
+
+def start_warmup_thread(**options) -> threading.Thread:
+    """
+    Run warm_popular_medicines() on a daemon thread of this (serving)
+    process, including its in-process caches (used at startup)
+    """
+    def run():
+        try:
+            warm_popular_medicines(in_process=True, **options)
+        except Exception as e:
+            logger.warning(f"Startup cache warm-up failed: {e}")
+
+    thread = threading.Thread(target=run, name='cache-warmup', daemon=True)
+    thread.start()
+    return thread
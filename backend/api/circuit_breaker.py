@@ -0,0 +1,186 @@
+"""
+============================================================================
+CIRCUIT BREAKER - Fail Fast When an External Drug API Is Degraded
+============================================================================
+
+This file stops worker threads from piling up behind a slow or failing
+upstream (api.fda.gov, rxnav.nlm.nih.gov). Without it every prescription
+analysis waits for the full request timeout, possibly several times.
+
+States:
+- CLOSED: requests flow normally; outcomes are recorded in a rolling
+  time window (failures and slow calls)
+- OPEN: the failure rate or slow-call rate crossed its threshold;
+  requests fail immediately with CircuitOpenError for open_seconds
+- HALF_OPEN: after open_seconds a few probe requests are let through;
+  if they succeed the circuit closes, if one fails it opens again
+
+What counts as a failure:
+- Connection errors and timeouts
+- 429 and 5xx responses (after the transport's own retries)
+- Calls slower than slow_call_seconds count as "slow", tracked separately
+
+Used by:
+- api/http_transport.py - One breaker per host, checked before each request
+- api/openfda_client.py / api/rxnorm_client.py - Serve cached data when open
+============================================================================
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+DEFAULT_BREAKER_CONFIG = {
+    'window_seconds': 60,          # Rolling window for failure/slow rates
+    'min_calls': 10,               # Don't judge a host on fewer calls than this
+    'failure_rate_threshold': 0.5, # Open when half of the calls fail...
+    'slow_call_seconds': 5.0,      # ...or when calls slower than this...
+    'slow_rate_threshold': 0.8,    # ...make up this share of the window
+    'open_seconds': 30,            # How long to fail fast before probing
+    'half_open_max_calls': 2,      # Probe requests allowed while half-open
+}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while a host's circuit is open"""
+
+    def __init__(self, host: str, retry_after: float):
+        super().__init__(f"Circuit open for {host}, retry after {retry_after:.0f}s")
+        self.host = host
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Rolling-window circuit breaker for one host (per process).
+
+    Main Methods:
+    - before_request() - Raise CircuitOpenError if the call must not be made
+    - record_success() / record_failure() - Report the outcome and latency
+    - cancel_request() - The admitted request was not sent after all
+    - get_stats() - State, rates and counters
+    """
+
+    def __init__(self, host: str, config: Dict = None):
+        self.host = host
+        self.config = dict(DEFAULT_BREAKER_CONFIG)
+        if config:
+            self.config.update(config)
+
+        self._lock = threading.Lock()
+        self._calls = deque()   # (timestamp, failed, slow)
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+
+        self._stats = {'rejected': 0, 'opened': 0, 'last_latency': None}
+
+    def _trim(self, now: float):
+        cutoff = now - self.config['window_seconds']
+        while self._calls and self._calls[0][0] < cutoff:
+            self._calls.popleft()
+
+    def _rates(self):
+        total = len(self._calls)
+        if not total:
+            return 0.0, 0.0
+        failures = sum(1 for _, failed, _ in self._calls if failed)
+        slow = sum(1 for _, _, is_slow in self._calls if is_slow)
+        return failures / total, slow / total
+
+    def _open(self, now: float, reason: str):
+        self.state = OPEN
+        self._opened_at = now
+        self._half_open_calls = 0
+        self._stats['opened'] += 1
+        logger.warning(f"Circuit for {self.host} OPEN ({reason}); failing fast for "
+                       f"{self.config['open_seconds']}s")
+
+    def before_request(self):
+        """
+        Check whether a request may be sent now
+        """
+        with self._lock:
+            now = time.time()
+            if self.state == OPEN:
+                remaining = self._opened_at + self.config['open_seconds'] - now
+                if remaining > 0:
+                    self._stats['rejected'] += 1
+                    raise CircuitOpenError(self.host, remaining)
+                self.state = HALF_OPEN
+                self._half_open_calls = 0
+                logger.info(f"Circuit for {self.host} HALF-OPEN, probing for recovery")
+
+            if self.state == HALF_OPEN:
+                if self._half_open_calls >= self.config['half_open_max_calls']:
+                    self._stats['rejected'] += 1
+                    raise CircuitOpenError(self.host, self.config['open_seconds'])
+                self._half_open_calls += 1
+
+    def cancel_request(self):
+        """
+        Give back the admission of a request that was never sent (e.g. no
+        rate-limit token), so a half-open probe slot is not lost
+        """
+        with self._lock:
+            if self.state == HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    def record_success(self, latency: float):
+        self._record(False, latency)
+
+    def record_failure(self, latency: float):
+        self._record(True, latency)
+
+    def _record(self, failed: bool, latency: float):
+        with self._lock:
+            now = time.time()
+            slow = latency >= self.config['slow_call_seconds']
+            self._stats['last_latency'] = round(latency, 3)
+
+            if self.state == HALF_OPEN:
+                if failed or slow:
+                    self._open(now, 'probe failed' if failed else 'probe slow')
+                else:
+                    self.state = CLOSED
+                    self._calls.clear()
+                    logger.info(f"Circuit for {self.host} CLOSED, upstream recovered")
+                return
+
+            self._calls.append((now, failed, slow))
+            self._trim(now)
+            if self.state == CLOSED and len(self._calls) >= self.config['min_calls']:
+                failure_rate, slow_rate = self._rates()
+                if failure_rate >= self.config['failure_rate_threshold']:
+                    self._open(now, f"failure rate {failure_rate:.0%}")
+                elif slow_rate >= self.config['slow_rate_threshold']:
+                    self._open(now, f"slow call rate {slow_rate:.0%}")
+
+    def get_stats(self) -> Dict:
+        """
+        Get current state and rolling-window rates
+        """
+        with self._lock:
+            now = time.time()
+            self._trim(now)
+            failure_rate, slow_rate = self._rates()
+            stats = {
+                'state': self.state,
+                'calls_in_window': len(self._calls),
+                'failure_rate': round(failure_rate, 3),
+                'slow_call_rate': round(slow_rate, 3),
+                'rejected': self._stats['rejected'],
+                'times_opened': self._stats['opened'],
+                'last_latency': self._stats['last_latency'],
+            }
+            if self.state == OPEN:
+                stats['retry_after'] = round(max(0.0, self._opened_at + self.config['open_seconds'] - now), 1)
+        return stats
@@ -19,6 +19,8 @@ from .models import (
     PrescriptionHistory, MedicalKnowledge, UserFeedback
 )
 from .nlp_processor import extract_medicine_info, processor as nlp_processor
+from .medicine_lookup import find_medicine, find_medicines
+from .table_counts import table_counter
 from .biobert_processor import BioBERTProcessor
 
 logger = logging.getLogger(__name__)
@@ -101,16 +103,19 @@ def analyze_prescription_with_safety(request):
         frequency = extracted_data.get('frequency', '')
         duration = extracted_data.get('duration', '')
         
+        medicine_items = []
         for i, medicine_item in enumerate(medicines_list):
             if isinstance(medicine_item, dict):
-                medicine_name = medicine_item.get('name', '')
-                dosage = medicine_item.get('dosage', '')
+                medicine_items.append((medicine_item.get('name', ''), medicine_item.get('dosage', '')))
             else:
-                medicine_name = str(medicine_item)
-                dosage = dosages[i] if i < len(dosages) else ''
-            
+                medicine_items.append((str(medicine_item), dosages[i] if i < len(dosages) else ''))
+        
+        # Resolve every extracted name in one query; shared with the safety analysis
+        medicines_by_name = find_medicines(name for name, _ in medicine_items)
+        
+        for medicine_name, dosage in medicine_items:
             # Get detailed medicine info from database
-            detailed_info = _get_detailed_medicine_info_from_db(medicine_name)
+            detailed_info = _get_detailed_medicine_info_from_db(medicine_name, medicines_by_name)
             
             medicine_data = {
                 'name': medicine_name,
@@ -129,7 +134,7 @@ def analyze_prescription_with_safety(request):
         profile = _get_or_create_profile(user)
         
         # Safety analysis
-        safety_alerts = _analyze_safety_from_db(extracted_medicines, profile)
+        safety_alerts = _analyze_safety_from_db(extracted_medicines, profile, medicines_by_name)
         
         # Store prescription history
         prescription_history = PrescriptionHistory.objects.create(
@@ -145,9 +150,9 @@ def analyze_prescription_with_safety(request):
             confidence_score=extracted_data.get('confidence_score', 0.8)
         )
         
-        # Get database statistics
-        total_medicines = Medicine.objects.count()
-        total_knowledge = MedicalKnowledge.objects.count()
+        # Get database statistics (cached table sizes)
+        total_medicines = table_counter.get(Medicine)
+        total_knowledge = table_counter.get(MedicalKnowledge)
         
         return Response({
             'status': 'success',
@@ -176,43 +181,41 @@ def analyze_prescription_with_safety(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-def _get_detailed_medicine_info_from_db(medicine_name):
-    """Get detailed medicine information from database"""
+def _medicine_details(medicine):
+    """Detail fields of a Medicine row"""
+    return {
+        'generic_name': medicine.generic_name,
+        'brand_names': medicine.brand_names,
+        'category': medicine.category,
+        'description': medicine.description,
+        'common_doses': medicine.common_doses,
+        'side_effects': medicine.side_effects,
+        'interactions': medicine.interactions,
+        'contraindications': medicine.contraindications,
+        'alternatives': medicine.alternatives,
+        'cost_analysis': medicine.cost_analysis,
+        'molecular_structure': medicine.molecular_structure,
+        'medical_explanation': medicine.medical_explanation,
+        'data_sources': medicine.data_sources
+    }
+
+
+def _get_detailed_medicine_info_from_db(medicine_name, medicines_by_name=None):
+    """
+    Get detailed medicine information from database
+    (from a find_medicines() map when one is passed in)
+    """
     try:
         if not medicine_name:
             return None
         
-        # Clean the medicine name for better matching
-        clean_name = medicine_name.lower().strip()
-        
-        # Try exact match first
-        medicine = Medicine.objects.filter(
-            Q(name__iexact=medicine_name) |
-            Q(generic_name__iexact=medicine_name)
-        ).first()
-        
-        # If no exact match, try partial matches in brand names
-        if not medicine:
-            medicine = Medicine.objects.filter(
-                brand_names__icontains=medicine_name
-            ).first()
+        if medicines_by_name is not None:
+            medicine = medicines_by_name.get(medicine_name)
+        else:
+            medicine = find_medicine(medicine_name)
         
         if medicine:
-            return {
-                'generic_name': medicine.generic_name,
-                'brand_names': medicine.brand_names,
-                'category': medicine.category,
-                'description': medicine.description,
-                'common_doses': medicine.common_doses,
-                'side_effects': medicine.side_effects,
-                'interactions': medicine.interactions,
-                'contraindications': medicine.contraindications,
-                'alternatives': medicine.alternatives,
-                'cost_analysis': medicine.cost_analysis,
-                'molecular_structure': medicine.molecular_structure,
-                'medical_explanation': medicine.medical_explanation,
-                'data_sources': medicine.data_sources
-            }
+            return _medicine_details(medicine)
         
         return None
         
@@ -221,7 +224,7 @@ def _get_detailed_medicine_info_from_db(medicine_name):
         return None
 
 
-def _analyze_safety_from_db(medicines, profile):
+def _analyze_safety_from_db(medicines, profile, medicines_by_name=None):
     """Analyze safety using database information"""
     safety_alerts = []
     
@@ -229,13 +232,12 @@ def _analyze_safety_from_db(medicines, profile):
         user_allergies = profile.allergies or []
         user_conditions = profile.current_conditions or []
         
+        if medicines_by_name is None:
+            medicines_by_name = find_medicines(medicine_data.get('name', '') for medicine_data in medicines)
+        
         for medicine_data in medicines:
             medicine_name = medicine_data.get('name', '')
-            medicine = Medicine.objects.filter(
-                Q(name__iexact=medicine_name) |
-                Q(generic_name__iexact=medicine_name) |
-                Q(brand_names__icontains=medicine_name)
-            ).first()
+            medicine = medicines_by_name.get(medicine_name)
             
             if medicine:
                 # Check allergies
@@ -407,11 +409,7 @@ def get_medicine_info(request, medicine_id):
         
         # If not found by ID, try by name
         if not medicine:
-            medicine = Medicine.objects.filter(
-                Q(name__iexact=medicine_id) |
-                Q(generic_name__iexact=medicine_id) |
-                Q(brand_names__icontains=medicine_id)
-            ).first()
+            medicine = find_medicine(medicine_id)
         
         if not medicine:
             return Response({
@@ -482,7 +480,7 @@ def search_medical_knowledge(request):
             'query': query,
             'results': results,
             'total_found': len(results),
-            'database_size': MedicalKnowledge.objects.count()
+            'database_size': table_counter.get(MedicalKnowledge)
         })
         
     except Exception as e:
@@ -496,11 +494,7 @@ def get_medical_explanation(request, medicine_name):
     """Get detailed medical explanation for a medicine from database"""
     try:
         # Try to find medicine in database
-        medicine = Medicine.objects.filter(
-            Q(name__iexact=medicine_name) |
-            Q(generic_name__iexact=medicine_name) |
-            Q(brand_names__icontains=medicine_name)
-        ).first()
+        medicine = find_medicine(medicine_name)
         
         if not medicine:
             return Response({
@@ -530,10 +524,11 @@ def get_medical_explanation(request, medicine_name):
 def get_medical_knowledge_stats(request):
     """Get statistics about the medical knowledge database"""
     try:
-        medicine_count = Medicine.objects.count()
-        knowledge_count = MedicalKnowledge.objects.count()
-        reminder_count = MedicationReminder.objects.count()
-        prescription_count = PrescriptionHistory.objects.count()
+        counts = table_counter.get_many([Medicine, MedicalKnowledge, MedicationReminder, PrescriptionHistory])
+        medicine_count = counts[Medicine._meta.label]
+        knowledge_count = counts[MedicalKnowledge._meta.label]
+        reminder_count = counts[MedicationReminder._meta.label]
+        prescription_count = counts[PrescriptionHistory._meta.label]
         
         return Response({
             'status': 'success',
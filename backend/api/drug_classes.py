@@ -0,0 +1,379 @@
+"""
+============================================================================
+DRUG CLASSES - Class-Level Interaction Rules Evaluated with Bitsets
+============================================================================
+
+Pair-by-pair interaction entries explode combinatorially (warfarin+aspirin,
+warfarin+ibuprofen, warfarin+naproxen, ...). This file lets interactions be
+written once between drug classes (NSAIDs, ACE inhibitors, MAOIs, SSRIs,
+diuretics, ...) and checks a whole prescription in linear time, which
+matters for polypharmacy patients with 10-20 active drugs.
+
+How it works:
+- Every class gets one bit; every drug gets a precomputed class mask
+  (OR of the bits of the classes it belongs to)
+- Every drug also gets a precomputed partner mask: the bits of all classes
+  that have a rule with any of its classes
+- Checking a prescription walks the drugs once, keeping the OR of the
+  masks seen so far; a drug only needs work when
+  partner_mask & seen_mask != 0, which for most drugs it is not
+
+Class Membership:
+- DRUG_CLASS_MEMBERS seeds each class with well-known ingredients
+- CATEGORY_PATTERNS adds every medicine of the local medicine database
+  whose categories text matches the class (e.g. "Anti-Inflammatory
+  Agents, Non-Steroidal" -> nsaid)
+
+Used by:
+- api/drug_interactions.py: check_interactions(), adjacency map and
+  get_interaction_details() - Class rules next to the pair entries
+============================================================================
+"""
+
+import hashlib
+import json
+import logging
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .drug_normalizer import canonical_drug_id
+
+logger = logging.getLogger(__name__)
+
+# Seed members per class (canonical drug IDs)
+DRUG_CLASS_MEMBERS = {
+    'anticoagulant': [
+        'warfarin', 'acenocoumarol', 'phenprocoumon', 'dabigatran', 'rivaroxaban',
+        'apixaban', 'edoxaban', 'heparin', 'enoxaparin',
+    ],
+    'nsaid': [
+        'aspirin', 'ibuprofen', 'naproxen', 'diclofenac', 'indomethacin',
+        'ketorolac', 'meloxicam', 'celecoxib', 'rofecoxib', 'piroxicam', 'etodolac',
+    ],
+    'ace_inhibitor': [
+        'captopril', 'enalapril', 'lisinopril', 'ramipril', 'quinapril',
+        'benazepril', 'fosinopril', 'moexipril', 'trandolapril', 'perindopril',
+    ],
+    'potassium_supplement': [
+        'potassium', 'potassium chloride', 'potassium citrate',
+        'potassium gluconate', 'potassium bicarbonate',
+    ],
+    'potassium_sparing_diuretic': ['spironolactone', 'eplerenone', 'amiloride', 'triamterene'],
+    'loop_diuretic': ['furosemide', 'bumetanide', 'torsemide', 'ethacrynic acid'],
+    'thiazide_diuretic': ['hydrochlorothiazide', 'chlorthalidone', 'indapamide', 'metolazone'],
+    'cardiac_glycoside': ['digoxin', 'digitoxin'],
+    'maoi': ['phenelzine', 'tranylcypromine', 'isocarboxazid', 'selegiline', 'moclobemide'],
+    'ssri': ['fluoxetine', 'sertraline', 'paroxetine', 'citalopram', 'escitalopram', 'fluvoxamine'],
+    'snri': ['venlafaxine', 'desvenlafaxine', 'duloxetine', 'milnacipran'],
+    'lithium': ['lithium', 'lithium carbonate', 'lithium citrate'],
+    'beta_blocker': [
+        'metoprolol', 'atenolol', 'propranolol', 'bisoprolol', 'carvedilol',
+        'nadolol', 'nebivolol', 'labetalol',
+    ],
+    'insulin': ['insulin', 'insulin glargine', 'insulin lispro', 'insulin aspart', 'insulin detemir'],
+}
+
+# Category text (from the medicine database) that puts a medicine in a class
+CATEGORY_PATTERNS = {
+    'anticoagulant': r'\banticoagulant',
+    'nsaid': r'non-?steroidal anti-?inflammatory|anti-inflammatory agents, non-steroidal|\bnsaid',
+    'ace_inhibitor': r'angiotensin-converting enzyme inhibitor|\bace inhibitor',
+    'potassium_sparing_diuretic': r'potassium[- ]sparing',
+    'loop_diuretic': r'sodium potassium chloride symporter inhibitor|\bloop diuretic',
+    'thiazide_diuretic': r'\bthiazide',
+    'cardiac_glycoside': r'cardiac glycoside|cardiotonic',
+    'maoi': r'monoamine oxidase inhibitor',
+    'ssri': r'serotonin uptake inhibitor|selective serotonin reuptake',
+    'snri': r'serotonin and norepinephrine reuptake',
+    'beta_blocker': r'adrenergic beta-antagonist|beta[- ]blocker',
+}
+
+# Interactions between classes; one rule covers every member combination
+CLASS_RULES = [
+    (('anticoagulant', 'nsaid'), {
+        'severity': 'HIGH',
+        'interaction_type': 'Bleeding Risk',
+        'description': 'Increased risk of bleeding and bruising',
+        'mechanism': 'Both drugs affect blood clotting mechanisms',
+        'recommendation': 'Avoid combination. Use alternative pain relief. Monitor INR closely if necessary.',
+        'alternatives': ['Acetaminophen', 'Topical pain relievers'],
+        'monitoring': 'INR levels, bleeding signs'
+    }),
+    (('ace_inhibitor', 'potassium_supplement'), {
+        'severity': 'HIGH',
+        'interaction_type': 'Hyperkalemia Risk',
+        'description': 'Risk of dangerously high potassium levels',
+        'mechanism': 'ACE inhibitors reduce potassium excretion',
+        'recommendation': 'Monitor potassium levels. Avoid potassium supplements. Limit high-potassium foods.',
+        'alternatives': ['ARB medications', 'Calcium channel blockers'],
+        'monitoring': 'Serum potassium levels, EKG'
+    }),
+    (('ace_inhibitor', 'potassium_sparing_diuretic'), {
+        'severity': 'HIGH',
+        'interaction_type': 'Hyperkalemia Risk',
+        'description': 'Risk of dangerously high potassium levels',
+        'mechanism': 'Both drugs reduce potassium excretion',
+        'recommendation': 'Monitor potassium levels closely. Avoid potassium supplements.',
+        'alternatives': ['Loop or thiazide diuretics'],
+        'monitoring': 'Serum potassium levels, kidney function'
+    }),
+    (('cardiac_glycoside', 'loop_diuretic'), {
+        'severity': 'HIGH',
+        'interaction_type': 'Digoxin Toxicity',
+        'description': 'Increased risk of digoxin toxicity',
+        'mechanism': 'Diuretics cause potassium loss, increasing digoxin sensitivity',
+        'recommendation': 'Monitor digoxin levels. Maintain normal potassium levels. Watch for toxicity signs.',
+        'alternatives': ['ACE inhibitors', 'Beta-blockers'],
+        'monitoring': 'Digoxin levels, potassium levels, EKG'
+    }),
+    (('cardiac_glycoside', 'thiazide_diuretic'), {
+        'severity': 'HIGH',
+        'interaction_type': 'Digoxin Toxicity',
+        'description': 'Increased risk of digoxin toxicity',
+        'mechanism': 'Diuretics cause potassium loss, increasing digoxin sensitivity',
+        'recommendation': 'Monitor digoxin levels. Maintain normal potassium levels. Watch for toxicity signs.',
+        'alternatives': ['ACE inhibitors', 'Beta-blockers'],
+        'monitoring': 'Digoxin levels, potassium levels, EKG'
+    }),
+    (('maoi', 'ssri'), {
+        'severity': 'HIGH',
+        'interaction_type': 'Serotonin Syndrome',
+        'description': 'Life-threatening serotonin syndrome risk',
+        'mechanism': 'Both drugs increase serotonin levels',
+        'recommendation': 'NEVER combine. Wait 14 days between stopping MAOI and starting SSRI.',
+        'alternatives': ['SNRIs', 'Tricyclic antidepressants'],
+        'monitoring': 'Serotonin syndrome symptoms'
+    }),
+    (('maoi', 'snri'), {
+        'severity': 'HIGH',
+        'interaction_type': 'Serotonin Syndrome',
+        'description': 'Life-threatening serotonin syndrome risk',
+        'mechanism': 'Both drugs increase serotonin levels',
+        'recommendation': 'NEVER combine. Wait 14 days between stopping MAOI and starting SNRI.',
+        'alternatives': ['Tricyclic antidepressants'],
+        'monitoring': 'Serotonin syndrome symptoms'
+    }),
+    (('lithium', 'nsaid'), {
+        'severity': 'HIGH',
+        'interaction_type': 'Lithium Toxicity',
+        'description': 'Increased risk of lithium toxicity',
+        'mechanism': 'NSAIDs reduce lithium excretion',
+        'recommendation': 'Avoid combination. Monitor lithium levels closely. Use alternative pain relief.',
+        'alternatives': ['Acetaminophen', 'Topical pain relievers'],
+        'monitoring': 'Lithium levels, toxicity symptoms'
+    }),
+    (('lithium', 'thiazide_diuretic'), {
+        'severity': 'HIGH',
+        'interaction_type': 'Lithium Toxicity',
+        'description': 'Increased risk of lithium toxicity',
+        'mechanism': 'Thiazides reduce lithium excretion',
+        'recommendation': 'Avoid combination or reduce lithium dose. Monitor lithium levels closely.',
+        'alternatives': ['Loop diuretics (with monitoring)'],
+        'monitoring': 'Lithium levels, toxicity symptoms'
+    }),
+    (('beta_blocker', 'insulin'), {
+        'severity': 'MEDIUM',
+        'interaction_type': 'Hypoglycemia Risk',
+        'description': 'Masked hypoglycemia symptoms',
+        'mechanism': 'Beta-blockers mask hypoglycemia warning signs',
+        'recommendation': 'Monitor blood glucose closely. Educate about hypoglycemia symptoms.',
+        'alternatives': ['ACE inhibitors', 'Calcium channel blockers'],
+        'monitoring': 'Blood glucose levels, hypoglycemia symptoms'
+    }),
+]
+
+SEVERITY_CATEGORY = {
+    'HIGH': 'high_severity',
+    'MEDIUM': 'medium_severity',
+    'LOW': 'low_severity',
+    'INFO': 'info_severity',
+}
+
+
+def _iter_bits(mask: int) -> Iterable[int]:
+    """Indexes of the set bits of a mask"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class DrugClassIndex:
+    """
+    Precomputed class masks and class rules for bitset interaction checks.
+
+    Singleton Pattern:
+    - Instance created: drug_class_index = DrugClassIndex()
+
+    Main Methods:
+    - classes_of() - Class names of a drug
+    - check() - Class-rule interactions within a list of drugs (linear)
+    - partners() - Class-rule interactions of one drug with known drugs
+    - rule_for_pair() - Class-rule interaction between two drugs, if any
+    """
+
+    def __init__(self, members: Optional[Dict[str, List[str]]] = None,
+                 rules: Optional[List[Tuple[Tuple[str, str], Dict]]] = None,
+                 medicines: Optional[List[Dict]] = None):
+        members = {name: list(drugs) for name, drugs in (members or DRUG_CLASS_MEMBERS).items()}
+        self.rules_source = rules or CLASS_RULES
+
+        # Class -> bit
+        class_names = sorted(set(members) | {name for pair, _ in self.rules_source for name in pair})
+        self.class_bits = {name: index for index, name in enumerate(class_names)}
+        self.class_names = class_names
+
+        # Drug -> class mask (seed lists plus categories from the medicine database)
+        self._canonical = canonical_drug_id
+        self.drug_masks = {}
+        for class_name, drugs in members.items():
+            for drug in drugs:
+                self._add_member(canonical_drug_id(drug), class_name)
+        added = self._add_category_members(medicines)
+
+        # Rules: class pair -> rule, and class bit -> bits of partner classes
+        self.rules = {}
+        self.partner_bits = [0] * len(class_names)
+        for (class_a, class_b), rule in self.rules_source:
+            bit_a, bit_b = self.class_bits[class_a], self.class_bits[class_b]
+            self.rules[(bit_a, bit_b)] = self.rules[(bit_b, bit_a)] = rule
+            self.partner_bits[bit_a] |= 1 << bit_b
+            self.partner_bits[bit_b] |= 1 << bit_a
+
+        # Drug -> mask of classes it interacts with
+        self.partner_masks = {drug: self._partner_mask(mask) for drug, mask in self.drug_masks.items()}
+
+        self.data_version = self._compute_data_version()
+        logger.info(
+            f"Drug class index: {len(class_names)} classes, {len(self.drug_masks)} drugs "
+            f"({added} from categories), {len(self.rules_source)} rules"
+        )
+
+    def _add_member(self, drug_id: str, class_name: str):
+        if drug_id:
+            self.drug_masks[drug_id] = self.drug_masks.get(drug_id, 0) | (1 << self.class_bits[class_name])
+
+    def _add_category_members(self, medicines: Optional[List[Dict]]) -> int:
+        """Add medicines whose categories text matches a class pattern"""
+        if medicines is None:
+            try:
+                from .nlp_processor import processor
+                medicines = processor.medicine_database.get('medicines', [])
+            except Exception as e:
+                logger.warning(f"Medicine categories unavailable for drug classes: {e}")
+                medicines = []
+
+        patterns = {name: re.compile(pattern, re.IGNORECASE)
+                    for name, pattern in CATEGORY_PATTERNS.items() if name in self.class_bits}
+        added = 0
+        for medicine in medicines:
+            categories = medicine.get('categories') or medicine.get('category') or ''
+            if isinstance(categories, list):
+                categories = '; '.join(str(c) for c in categories)
+            if not categories:
+                continue
+            for class_name, pattern in patterns.items():
+                if pattern.search(categories):
+                    for name in (medicine.get('name'), medicine.get('generic_name')):
+                        if name:
+                            self._add_member(self._canonical(name), class_name)
+                            added += 1
+        return added
+
+    def _partner_mask(self, mask: int) -> int:
+        partner_mask = 0
+        for bit in _iter_bits(mask):
+            partner_mask |= self.partner_bits[bit]
+        return partner_mask
+
+    def _compute_data_version(self) -> str:
+        content = {
+            'members': sorted(self.drug_masks.items()),
+            'classes': self.class_names,
+            'rules': [[list(pair), rule] for pair, rule in self.rules_source],
+        }
+        encoded = json.dumps(content, sort_keys=True).encode('utf-8')
+        return hashlib.sha1(encoded).hexdigest()[:12]
+
+    def classes_of(self, drug: str) -> List[str]:
+        mask = self.drug_masks.get(self._canonical(drug), 0)
+        return [self.class_names[bit] for bit in _iter_bits(mask)]
+
+    def _finding(self, drug_a: str, drug_b: str, bit_a: int, bit_b: int) -> Dict:
+        finding = dict(self.rules[(bit_a, bit_b)])
+        finding['drugs'] = [drug_a, drug_b]
+        finding['drug_classes'] = [self.class_names[bit_a], self.class_names[bit_b]]
+        finding['category'] = SEVERITY_CATEGORY.get(finding['severity'], 'info_severity')
+        finding['rule_type'] = 'class'
+        return finding
+
+    def _pair_findings(self, drug_a: str, mask_a: int, drug_b: str, mask_b: int) -> List[Dict]:
+        """One finding per matching class rule between two drugs"""
+        findings = []
+        for bit_a in _iter_bits(mask_a & self._partner_mask(mask_b)):
+            for bit_b in _iter_bits(mask_b & self.partner_bits[bit_a]):
+                findings.append(self._finding(drug_a, drug_b, bit_a, bit_b))
+        return findings
+
+    def check(self, drugs: Iterable[str]) -> List[Dict]:
+        """
+        Class-rule interactions among a list of drugs.
+
+        One pass over the drugs: a drug is only compared with earlier drugs
+        when its partner mask overlaps the OR of their class masks, and then
+        only with the drugs of the overlapping classes.
+        """
+        seen_mask = 0
+        members_by_bit = {}
+        findings = []
+        done = set()
+        for drug in drugs:
+            drug_id = self._canonical(drug)
+            mask = self.drug_masks.get(drug_id, 0)
+            if not mask or drug_id in done:
+                continue
+            done.add(drug_id)
+
+            hits = self.partner_masks[drug_id] & seen_mask
+            if hits:
+                partners = {other for bit in _iter_bits(hits) for other in members_by_bit[bit]}
+                for other in sorted(partners):
+                    findings.extend(self._pair_findings(other, self.drug_masks[other], drug_id, mask))
+
+            seen_mask |= mask
+            for bit in _iter_bits(mask):
+                members_by_bit.setdefault(bit, []).append(drug_id)
+        return findings
+
+    def partners(self, drug: str) -> List[Dict]:
+        """Class-rule interactions between one drug and every known member"""
+        drug_id = self._canonical(drug)
+        mask = self.drug_masks.get(drug_id, 0)
+        partner_mask = self.partner_masks.get(drug_id, 0)
+        if not partner_mask:
+            return []
+        findings = []
+        for other, other_mask in self.drug_masks.items():
+            if other != drug_id and other_mask & partner_mask:
+                findings.extend(self._pair_findings(drug_id, mask, other, other_mask))
+        return findings
+
+    def rule_for_pair(self, drug_a: str, drug_b: str) -> Optional[Dict]:
+        """Most severe class-rule interaction between two drugs, or None"""
+        id_a, id_b = self._canonical(drug_a), self._canonical(drug_b)
+        findings = self._pair_findings(id_a, self.drug_masks.get(id_a, 0), id_b, self.drug_masks.get(id_b, 0))
+        if not findings:
+            return None
+        order = ['INFO', 'LOW', 'MEDIUM', 'HIGH']
+        return max(findings, key=lambda f: order.index(f['severity']) if f['severity'] in order else -1)
+
+
+_drug_class_index = None
+
+
+def get_drug_class_index() -> DrugClassIndex:
+    """Build the class index on first use (needs the medicine database)"""
+    global _drug_class_index
+    if _drug_class_index is None:
+        _drug_class_index = DrugClassIndex()
+    return _drug_class_index
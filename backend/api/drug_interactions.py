@@ -27,6 +27,11 @@ Used by:
 Calls:
 - api/models.py: Medicine.objects.filter() - Get interaction data
 - Built-in interaction database (self.interactions_db)
+- api/drug_classes.py - Class-level rules (NSAIDs, ACE inhibitors, MAOIs,
+  SSRIs, diuretics, ...) checked with class bitmasks; a pair entry in
+  interactions_db takes precedence over a class rule for the same drugs
+- api/drug_normalizer.py - Resolves every name (brand, salt form, strength)
+  to a canonical ingredient ID; pairs are matched on those IDs exactly
 
 Data Sources:
 - DrugBank interaction database
@@ -40,9 +45,14 @@ Frontend Integration:
 ============================================================================
 """
 
+import hashlib
+import json
 import logging
 from typing import List, Dict, Tuple, Optional
 from datetime import datetime
+from itertools import combinations
+from .drug_classes import get_drug_class_index   # Class-level rules (bitsets)
+from .drug_normalizer import drug_normalizer, canonical_drug_id  # Shared name resolution
 
 class DrugInteractionChecker:
     """
@@ -56,16 +66,89 @@ class DrugInteractionChecker:
     - check() - Check interactions for medicine list
     - _check_pair() - Check specific medicine pair
     - _get_severity() - Determine interaction severity
+    - get_medicine_interactions_page() - Paginated partners of one drug
     """
     
     def __init__(self):
         self.interactions_db = self._load_interactions_database()
+        # Drug names of the database resolve to themselves
+        drug_normalizer.add_ingredients(
+            drug for interactions in self.interactions_db.values() for pair in interactions for drug in pair
+        )
         self.severity_levels = {
             'HIGH': {'color': '#FF4444', 'icon': '⚠️', 'priority': 3},
             'MEDIUM': {'color': '#FF8800', 'icon': '⚡', 'priority': 2},
             'LOW': {'color': '#FFAA00', 'icon': '💡', 'priority': 1},
             'INFO': {'color': '#4488FF', 'icon': 'ℹ️', 'priority': 0}
         }
+        # Class-level rules with precomputed class bitmasks per drug
+        self.class_index = get_drug_class_index()
+        # Canonical drug pair -> pair entries
+        self.pair_index = self._build_pair_index()
+        # Canonical drug ID -> interacting partners, most severe first
+        self.adjacency = self._build_adjacency()
+        # Changes whenever the interaction database content changes
+        self.data_version = self._compute_data_version()
+    
+    def _compute_data_version(self) -> str:
+        """
+        Short content hash of the interaction database (used to key cached
+        interaction results)
+        """
+        content = {
+            category: sorted((f"{med1}|{med2}", data) for (med1, med2), data in interactions.items())
+            for category, interactions in self.interactions_db.items()
+        }
+        content['class_rules'] = self.class_index.data_version
+        encoded = json.dumps(content, sort_keys=True, default=str).encode('utf-8')
+        return hashlib.sha1(encoded).hexdigest()[:12]
+    
+    def _build_pair_index(self) -> Dict[frozenset, List[Tuple[str, Dict]]]:
+        """Pair entries keyed by the canonical IDs of both drugs"""
+        pair_index = {}
+        for category, category_interactions in self.interactions_db.items():
+            for (med1, med2), interaction_data in category_interactions.items():
+                key = frozenset((canonical_drug_id(med1), canonical_drug_id(med2)))
+                pair_index.setdefault(key, []).append((category, interaction_data))
+        return pair_index
+    
+    def _pair_entry(self, category: str, interaction_data: Dict, drug_a: str, drug_b: str) -> Dict:
+        entry = dict(interaction_data)
+        entry['category'] = category
+        entry['drugs'] = [drug_a, drug_b]
+        return entry
+    
+    def _build_adjacency(self) -> Dict[str, List[Dict]]:
+        """
+        Precompute, for every drug in the interaction database or a drug
+        class, the list of its interactions sorted by severity priority
+        (then partner name), so per-drug lookups never scan the database.
+        """
+        adjacency = {}
+        for category, category_interactions in self.interactions_db.items():
+            for (med1, med2), interaction_data in category_interactions.items():
+                for drug, partner in ((med1, med2), (med2, med1)):
+                    entry = dict(interaction_data)
+                    entry['category'] = category
+                    entry['partner'] = partner
+                    adjacency.setdefault(canonical_drug_id(drug), []).append(entry)
+        
+        # Class rules, for partners without a specific pair entry
+        for drug in self.class_index.drug_masks:
+            entries = adjacency.setdefault(drug, [])
+            known = {canonical_drug_id(entry['partner']) for entry in entries}
+            for finding in self.class_index.partners(drug):
+                partner = finding['drugs'][1]
+                if partner not in known:
+                    known.add(partner)
+                    finding['partner'] = partner
+                    entries.append(finding)
+            if not entries:
+                del adjacency[drug]
+        
+        for entries in adjacency.values():
+            entries.sort(key=lambda x: (-self.severity_levels[x['severity']]['priority'], x['partner']))
+        return adjacency
     
     def _load_interactions_database(self) -> Dict:
         """
@@ -312,17 +395,27 @@ class DrugInteractionChecker:
             interactions_found = []
             severity_summary = {'HIGH': 0, 'MEDIUM': 0, 'LOW': 0, 'INFO': 0}
             
-            # Convert medicines to lowercase for matching
-            medicines_lower = [med.lower().strip() for med in medicines]
+            # Canonical ingredient IDs (combination products expand to each
+            # ingredient), resolved once for the whole list
+            drug_ids = list(dict.fromkeys(
+                drug_id for medicine in medicines for drug_id in drug_normalizer.ingredients(medicine)
+            ))
+            
+            # Pair entries: exact lookups per canonical pair
+            covered_pairs = set()
+            for drug_a, drug_b in combinations(drug_ids, 2):
+                pair = frozenset((drug_a, drug_b))
+                for category, interaction_data in self.pair_index.get(pair, []):
+                    entry = self._pair_entry(category, interaction_data, drug_a, drug_b)
+                    interactions_found.append(entry)
+                    severity_summary[entry['severity']] += 1
+                    covered_pairs.add(pair)
             
-            # Check all interaction categories
-            for category, interactions in self.interactions_db.items():
-                for (med1, med2), interaction_data in interactions.items():
-                    # Check if both medicines are in the prescription
-                    if self._medicines_match(medicines_lower, med1, med2):
-                        interaction_data['category'] = category
-                        interactions_found.append(interaction_data)
-                        severity_summary[interaction_data['severity']] += 1
+            # Class-level rules (one bitmask pass over the medicines)
+            for finding in self.class_index.check(drug_ids):
+                if frozenset(finding['drugs']) not in covered_pairs:
+                    interactions_found.append(finding)
+                    severity_summary[finding['severity']] += 1
             
             # Sort by severity (HIGH first)
             interactions_found.sort(key=lambda x: self.severity_levels[x['severity']]['priority'], reverse=True)
@@ -352,14 +445,6 @@ class DrugInteractionChecker:
                 'recommendations': []
             }
     
-    def _medicines_match(self, medicines: List[str], med1: str, med2: str) -> bool:
-        """
-        Check if two medicines match in the prescription list
-        """
-        med1_found = any(med1 in med for med in medicines)
-        med2_found = any(med2 in med for med in medicines)
-        return med1_found and med2_found
-    
     def _calculate_overall_risk(self, severity_summary: Dict) -> str:
         """
         Calculate overall risk level based on severity summary
@@ -414,18 +499,15 @@ class DrugInteractionChecker:
         Get detailed interaction information between two specific medicines
         """
         try:
-            med1_lower = medicine1.lower().strip()
-            med2_lower = medicine2.lower().strip()
+            drug_a, drug_b = canonical_drug_id(medicine1), canonical_drug_id(medicine2)
             
-            # Check all interaction categories
-            for category, interactions in self.interactions_db.items():
-                for (med1, med2), interaction_data in interactions.items():
-                    if ((med1_lower in med1 and med2_lower in med2) or 
-                        (med1_lower in med2 and med2_lower in med1)):
-                        interaction_data['category'] = category
-                        return interaction_data
+            entries = self.pair_index.get(frozenset((drug_a, drug_b)), [])
+            if entries:
+                category, interaction_data = entries[0]
+                return self._pair_entry(category, interaction_data, drug_a, drug_b)
             
-            return None
+            # Fall back to class-level rules
+            return self.class_index.rule_for_pair(drug_a, drug_b)
             
         except Exception as e:
             logging.error(f"Error getting interaction details: {e}")
@@ -433,27 +515,27 @@ class DrugInteractionChecker:
     
     def get_medicine_interactions(self, medicine: str) -> List[Dict]:
         """
-        Get all interactions for a specific medicine
+        Get all interactions for a specific medicine (exact canonical match)
+        """
+        interactions, _ = self.get_medicine_interactions_page(medicine)
+        return interactions
+    
+    def get_medicine_interactions_page(self, medicine: str, limit: Optional[int] = None,
+                                       offset: int = 0) -> Tuple[List[Dict], int]:
+        """
+        Get one page of a medicine's interactions from the adjacency map
+        
+        Returns:
+            (interactions on this page, total interactions for the medicine)
         """
         try:
-            medicine_lower = medicine.lower().strip()
-            interactions = []
-            
-            # Check all interaction categories
-            for category, category_interactions in self.interactions_db.items():
-                for (med1, med2), interaction_data in category_interactions.items():
-                    if (medicine_lower in med1 or medicine_lower in med2):
-                        interaction_data['category'] = category
-                        interactions.append(interaction_data)
-            
-            # Sort by severity
-            interactions.sort(key=lambda x: self.severity_levels[x['severity']]['priority'], reverse=True)
-            
-            return interactions
+            entries = self.adjacency.get(canonical_drug_id(medicine), [])
+            end = None if limit is None else offset + limit
+            return [dict(entry) for entry in entries[offset:end]], len(entries)
             
         except Exception as e:
             logging.error(f"Error getting medicine interactions: {e}")
-            return []
+            return [], 0
     
     def validate_prescription_safety(self, prescription_data: Dict) -> Dict:
         """
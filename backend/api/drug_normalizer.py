@@ -0,0 +1,370 @@
+"""
+============================================================================
+DRUG NAME NORMALIZER - One Canonical Ingredient ID per Medicine Name
+============================================================================
+
+Medicine names arrive as free text ("Tab. Advil 200mg", "Warfarin Sodium
+5 mg", "paracetamol"). Every checker used to clean them its own way
+(dosage regexes, substring matching, per-call RxNorm lookups). This file
+resolves raw text to one canonical ingredient ID that every module shares.
+
+Resolution steps (first hit wins):
+1. Clean: lowercase, drop punctuation, leading/trailing dosage-form words
+   ("tab", "capsule", "er", ...) and any trailing strength ("81mg")
+2. Brand/synonym table: built-in BRAND_NAMES and SYNONYMS plus the brand
+   names and synonyms of the local medicine database
+3. Salt forms: trailing salt words ("hydrochloride", "sodium", ...) are
+   dropped when the base is a known ingredient or the full name is not,
+   and only when a drug name remains ("naproxen sodium" -> "naproxen",
+   but "sodium bicarbonate" and "magnesium hydroxide" stay whole)
+4. Local RxNorm data: ingredient concept of a cached RxNorm search
+   (rxnorm_client.cached_ingredient_name(), never an HTTP call)
+5. Known ingredient named inside the text ("jantoven warfarin")
+6. Otherwise the cleaned name itself
+
+Features:
+- LRU memo: each distinct name is resolved once per process - except
+  names that only resolved by fallback (steps 5-6), which are resolved
+  again on each call so RxNorm data cached later is picked up
+- Batch API: normalize_many() resolves a list once, de-duplicated
+- Combination products: ingredients() splits "a/b", "a + b", "a with b"
+- Ambiguous aliases (one brand for several ingredients) are dropped
+
+Used by:
+- api/drug_interactions.py: canonical_drug_id(), check_interactions()
+- api/drug_classes.py: Class membership keys
+- api/interaction_result_cache.py: Medication set keys
+- api/user_interaction_state.py: Standing medication keys
+- api/allergy_checker.py: Direct and cross-reactivity matches
+- api/rxnorm_client.py: standardize_drug_name() query
+- api/views.py / api/database_views.py: Medicine lookups
+============================================================================
+"""
+
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+NORMALIZER_CACHE_SIZE = 8192
+
+# Strength written after a name ("aspirin 81mg", "warfarin 5 mg", "10 meq")
+DOSAGE_SUFFIX = re.compile(r'\s*\d+(\.\d+)?\s*(?:(?:mg|mcg|g|ml|iu|units?|meq)\b|%).*$')
+
+# Characters that never carry meaning in a drug name
+PUNCTUATION = re.compile(r'[^\w\s/+&%.-]|(?<!\d)\.|\.(?!\d)')
+
+# Separators between the ingredients of a combination product
+COMBINATION_SEPARATOR = re.compile(r'\s*(?:/|\+|&)\s*|\s+with\s+')
+
+# Dosage-form and release words written before or after the name
+FORM_WORDS = {
+    'tab', 'tabs', 'tablet', 'tablets', 'cap', 'caps', 'capsule', 'capsules',
+    'inj', 'injection', 'syp', 'syrup', 'susp', 'suspension', 'solution', 'oral',
+    'cream', 'ointment', 'gel', 'drops', 'spray', 'inhaler', 'patch', 'chewable',
+    'ec', 'er', 'xr', 'sr', 'cr', 'xl', 'dr', 'la', 'ds', 'odt',
+    'extended-release', 'delayed-release', 'extended', 'delayed', 'sustained', 'release',
+}
+
+# Salt and hydrate words that follow the active ingredient
+SALT_WORDS = {
+    'hydrochloride', 'hcl', 'hydrobromide', 'hbr', 'sodium', 'disodium', 'potassium',
+    'calcium', 'magnesium', 'sulfate', 'sulphate', 'maleate', 'besylate', 'besilate',
+    'mesylate', 'mesilate', 'tartrate', 'bitartrate', 'succinate', 'fumarate', 'citrate',
+    'acetate', 'phosphate', 'chloride', 'bromide', 'carbonate', 'bicarbonate', 'hydroxide',
+    'oxide', 'gluconate', 'lactate', 'nitrate', 'hyclate', 'propionate', 'dipropionate',
+    'furoate', 'valerate', 'monohydrate', 'dihydrate', 'trihydrate', 'hemihydrate',
+}
+
+# Common brand names -> ingredient (the medicine database adds more)
+BRAND_NAMES = {
+    'tylenol': 'acetaminophen', 'panadol': 'acetaminophen', 'crocin': 'acetaminophen',
+    'advil': 'ibuprofen', 'motrin': 'ibuprofen', 'brufen': 'ibuprofen',
+    'aleve': 'naproxen', 'naprosyn': 'naproxen', 'ecotrin': 'aspirin',
+    'celebrex': 'celecoxib', 'voltaren': 'diclofenac',
+    'coumadin': 'warfarin', 'jantoven': 'warfarin', 'xarelto': 'rivaroxaban',
+    'eliquis': 'apixaban', 'pradaxa': 'dabigatran', 'plavix': 'clopidogrel',
+    'zestril': 'lisinopril', 'prinivil': 'lisinopril', 'vasotec': 'enalapril',
+    'norvasc': 'amlodipine', 'lopressor': 'metoprolol', 'toprol': 'metoprolol',
+    'tenormin': 'atenolol', 'lanoxin': 'digoxin', 'lasix': 'furosemide',
+    'microzide': 'hydrochlorothiazide', 'aldactone': 'spironolactone',
+    'nardil': 'phenelzine', 'parnate': 'tranylcypromine', 'prozac': 'fluoxetine',
+    'zoloft': 'sertraline', 'lithobid': 'lithium',
+    'lipitor': 'atorvastatin', 'zocor': 'simvastatin', 'glucophage': 'metformin',
+    'synthroid': 'levothyroxine', 'amoxil': 'amoxicillin', 'zithromax': 'azithromycin',
+    'cipro': 'ciprofloxacin', 'sudafed': 'pseudoephedrine',
+    'prilosec': 'omeprazole', 'nexium': 'esomeprazole',
+}
+
+# International and chemical names -> ingredient
+SYNONYMS = {
+    'paracetamol': 'acetaminophen',
+    'acetylsalicylic acid': 'aspirin',
+    'asa': 'aspirin',
+    'frusemide': 'furosemide',
+    'lignocaine': 'lidocaine',
+}
+
+
+def clean_drug_name(name: str) -> str:
+    """
+    Lowercase, single-spaced name without punctuation, dosage-form words
+    or trailing strength ("Tab. Aspirin EC 81mg" -> "aspirin").
+    """
+    name = PUNCTUATION.sub(' ', str(name).lower())
+    name = DOSAGE_SUFFIX.sub('', ' '.join(name.split()))
+    tokens = name.split()
+    while tokens and tokens[0] in FORM_WORDS:
+        tokens.pop(0)
+    while tokens and tokens[-1] in FORM_WORDS:
+        tokens.pop()
+    return ' '.join(tokens)
+
+
+def strip_salt(name: str) -> str:
+    """
+    Cleaned name without trailing salt words ("naproxen sodium" -> "naproxen").
+    Unchanged when only salt words would remain ("sodium bicarbonate").
+    """
+    tokens = name.split()
+    while len(tokens) > 1 and tokens[-1] in SALT_WORDS:
+        tokens.pop()
+    if all(token in SALT_WORDS for token in tokens):
+        return name
+    return ' '.join(tokens)
+
+
+class DrugNameNormalizer:
+    """
+    Maps raw medicine text to canonical ingredient IDs.
+
+    Singleton Pattern:
+    - Instance created: drug_normalizer = DrugNameNormalizer()
+    - Tables load on first use; definite results are memoized (LRU)
+
+    Main Methods:
+    - normalize() - Canonical ingredient ID for one name
+    - normalize_many() - Batch version (raw name -> ID)
+    - ingredients() - IDs of each ingredient of a combination product
+    - clean() - Cleaned text without alias/salt resolution
+    - add_ingredients() - Register extra known ingredient names
+    """
+
+    def __init__(self, medicines: Optional[List[Dict]] = None, use_rxnorm: bool = True,
+                 cache_size: int = NORMALIZER_CACHE_SIZE):
+        self._medicines = medicines
+        self.use_rxnorm = use_rxnorm
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.aliases = {}
+        self.known = set()
+        self._extra = set()
+        self.cache_size = cache_size
+        self._memo = OrderedDict()
+        self._memo_lock = threading.Lock()
+        self._memo_hits = 0
+        self._memo_misses = 0
+
+    def clean(self, name: str) -> str:
+        return clean_drug_name(name)
+
+    def ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if not self._loaded:
+                self._build_tables()
+                self._loaded = True
+
+    def _build_tables(self):
+        """Alias table and known ingredients from built-ins and the medicine database"""
+        medicines = self._medicines
+        if medicines is None:
+            try:
+                from .nlp_processor import processor
+                medicines = processor.medicine_database.get('medicines', [])
+            except Exception as e:
+                logger.warning(f"Medicine database unavailable for name normalization: {e}")
+                medicines = []
+
+        known = set(self._extra)
+        candidates = {}
+        for table in (SYNONYMS, BRAND_NAMES):
+            for alias, ingredient in table.items():
+                candidates.setdefault(clean_drug_name(alias), set()).add(ingredient)
+                known.add(ingredient)
+
+        for medicine in medicines:
+            name = clean_drug_name(medicine.get('name') or '')
+            generic = clean_drug_name(medicine.get('generic_name') or '')
+            ingredient = generic or name
+            if not ingredient:
+                continue
+            known.add(ingredient)
+            if name and name != ingredient:
+                candidates.setdefault(name, set()).add(ingredient)
+            for alias in _medicine_aliases(medicine):
+                alias = clean_drug_name(alias)
+                if alias and alias != ingredient:
+                    candidates.setdefault(alias, set()).add(ingredient)
+
+        aliases = {}
+        ambiguous = 0
+        for alias, ingredients in candidates.items():
+            if alias in known:
+                continue  # Never redirect one ingredient to another
+            if len(ingredients) > 1:
+                ambiguous += 1
+                continue
+            aliases[alias] = next(iter(ingredients))
+
+        self.aliases = aliases
+        self.known = known
+        logger.info(
+            f"Drug name normalizer: {len(known)} ingredients, {len(aliases)} aliases "
+            f"({ambiguous} ambiguous dropped)"
+        )
+
+    def add_ingredients(self, names: Iterable[str]):
+        """Register ingredient names that must resolve to themselves"""
+        cleaned = {clean_drug_name(name) for name in names}
+        cleaned.discard('')
+        with self._lock:
+            new = cleaned - self._extra
+            if not new:
+                return
+            self._extra |= new
+            self.known |= new
+            for name in new:
+                self.aliases.pop(name, None)
+        self.cache_clear()
+
+    def cache_clear(self):
+        """Forget memoized results (after the tables change)"""
+        with self._memo_lock:
+            self._memo.clear()
+
+    def _lookup(self, name: str) -> Optional[str]:
+        """Alias target or known ingredient for a cleaned name"""
+        if name in self.aliases:
+            return self.aliases[name]
+        if name in self.known:
+            return name
+        return None
+
+    def normalize(self, name: str) -> str:
+        """Canonical ingredient ID for one raw name"""
+        with self._memo_lock:
+            if name in self._memo:
+                self._memo.move_to_end(name)
+                self._memo_hits += 1
+                return self._memo[name]
+            self._memo_misses += 1
+
+        drug_id, definite = self._normalize(name)
+        if definite:
+            with self._memo_lock:
+                self._memo[name] = drug_id
+                while len(self._memo) > self.cache_size:
+                    self._memo.popitem(last=False)
+        return drug_id
+
+    def _normalize(self, name: str) -> Tuple[str, bool]:
+        """(canonical ID, whether it is definite); fallback answers are not"""
+        self.ensure_loaded()
+        cleaned = clean_drug_name(name or '')
+        if not cleaned:
+            return '', True
+        if cleaned in self.aliases:
+            return self.aliases[cleaned], True
+
+        base = strip_salt(cleaned)
+        if base != cleaned:
+            resolved = self._lookup(base)
+            if resolved:
+                return resolved, True
+        if cleaned in self.known:
+            return cleaned, True
+
+        if self.use_rxnorm:
+            ingredient = self._from_rxnorm_cache(cleaned)
+            if ingredient:
+                return self._lookup(ingredient) or ingredient, True
+
+        # Fallbacks: may change once RxNorm data for the name is cached
+        mentioned = self._mentioned_ingredient(base)
+        if mentioned:
+            return mentioned, False
+        return base, False
+
+    def _from_rxnorm_cache(self, name: str) -> Optional[str]:
+        """Ingredient from locally cached RxNorm data (no API call)"""
+        try:
+            from .rxnorm_client import rxnorm_client
+            ingredient = rxnorm_client.cached_ingredient_name(name)
+        except Exception as e:
+            logger.debug(f"RxNorm cache unavailable for {name}: {e}")
+            return None
+        return strip_salt(clean_drug_name(ingredient)) if ingredient else None
+
+    def _mentioned_ingredient(self, name: str) -> Optional[str]:
+        """The one known ingredient or alias named as whole words in the text"""
+        tokens = name.split()
+        if len(tokens) < 2:
+            return None
+        found = set()
+        for size in (2, 1):
+            for start in range(len(tokens) - size + 1):
+                resolved = self._lookup(' '.join(tokens[start:start + size]))
+                if resolved:
+                    found.add(resolved)
+            if found:
+                break
+        return found.pop() if len(found) == 1 else None
+
+    def normalize_many(self, names: Iterable[str]) -> Dict[str, str]:
+        """Raw name -> canonical ingredient ID, each distinct name resolved once"""
+        return {name: self.normalize(name) for name in dict.fromkeys(names) if name}
+
+    def ingredients(self, name: str) -> List[str]:
+        """Canonical IDs of each ingredient ("aspirin/dipyridamole" -> both)"""
+        parts = COMBINATION_SEPARATOR.split(str(name or ''))
+        if len(parts) < 2:
+            drug_id = self.normalize(name or '')
+            return [drug_id] if drug_id else []
+        ids = [self.normalize(part) for part in parts]
+        return list(dict.fromkeys(drug_id for drug_id in ids if drug_id))
+
+    def get_stats(self) -> Dict:
+        return {
+            'ingredients': len(self.known),
+            'aliases': len(self.aliases),
+            'memo_entries': len(self._memo),
+            'memo_hits': self._memo_hits,
+            'memo_misses': self._memo_misses,
+        }
+
+
+def _medicine_aliases(medicine: Dict) -> List[str]:
+    """Brand names and synonyms of one medicine database record"""
+    aliases = []
+    structure = medicine.get('chemical_structure') or {}
+    sources = (medicine.get('brand_names'), medicine.get('synonyms'),
+               structure.get('synonyms') if isinstance(structure, dict) else None)
+    for value in sources:
+        if isinstance(value, str):
+            value = value.split(',')
+        if isinstance(value, list):
+            aliases.extend(str(alias) for alias in value if alias)
+    return aliases
+
+# Global instance
+drug_normalizer = DrugNameNormalizer()
+
+
+def canonical_drug_id(name: str) -> str:
+    """Canonical ingredient ID for a drug name (see DrugNameNormalizer)"""
+    return drug_normalizer.normalize(name or '')
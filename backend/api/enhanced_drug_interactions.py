@@ -51,11 +51,18 @@ API Rate Limits:
 """
 
 import logging
-from typing import List, Dict, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 from .openfda_client import openfda_client    # FDA API client
+from .http_transport import http_transport, BACKGROUND_RATE_LIMIT_WAIT, DEGRADED_ERROR_TYPES  # Rate-limit budgets
+from .drug_normalizer import canonical_drug_id  # Shared name -> ingredient ID
 from .rxnorm_client import rxnorm_client      # RxNorm API client
+from .single_flight import single_flight      # Request coalescing stats
+from .interaction_result_cache import interaction_result_cache  # Unified result cache stats
 from .drug_interactions import interaction_checker as manual_checker  # Local database
+from .trigram_index import did_you_mean  # Typo-tolerant suggestions (never substituted)
 
 class EnhancedDrugInteractionChecker:
     """
@@ -83,17 +90,38 @@ class EnhancedDrugInteractionChecker:
             'INFO': {'color': '#4488FF', 'icon': 'ℹ️', 'priority': 0},
             'UNKNOWN': {'color': '#888888', 'icon': '❓', 'priority': 0}
         }
+        # Background re-checks of degraded lookups (created on first use)
+        self._retry_executor = None
+        self._retry_lock = threading.Lock()
+        self._retrying = set()
     
-    def check_interactions(self, medicines: List[str]) -> Dict:
+    def check_interactions(self, medicines: List[str], retry_degraded: bool = True) -> Dict:
         """
         Check for drug interactions using multiple data sources
+        
+        Request threads never wait for rate-limit tokens, so lookups may be
+        rate limited (or hit an open circuit / transient error). The report
+        then says degraded and lists them, and unless retry_degraded is
+        False the lookups are re-run on a background thread that may wait
+        for tokens, so the next check finds them cached.
         """
         try:
             all_interactions = []
             severity_summary = {'HIGH': 0, 'MEDIUM': 0, 'LOW': 0, 'INFO': 0, 'UNKNOWN': 0}
             
-            # Convert medicines to lowercase for matching
-            medicines_lower = [med.lower().strip() for med in medicines]
+            # Look each drug up once, by canonical ingredient ID, so "Advil 200mg"
+            # and "ibuprofen" read the same entries (see data_stamp()); findings
+            # are reported under the caller's (lowercased) name
+            display_names = {}
+            for med in medicines:
+                name = med.lower().strip()
+                if name:
+                    display_names.setdefault(canonical_drug_id(name) or name, name)
+            drug_ids = list(display_names)
+            
+            # (source, drug) -> error_type of lookups that failed (no token,
+            # circuit open, transient): the report is then incomplete
+            failures = {}
             
             # 1. Check manual database first (fastest, most reliable)
             manual_results = self.manual_checker.check_interactions(medicines)
@@ -104,16 +132,18 @@ class EnhancedDrugInteractionChecker:
                     severity_summary[interaction['severity']] += 1
             
             # 2. Check OpenFDA for additional interactions
-            openfda_interactions = self._check_openfda_interactions(medicines_lower)
+            openfda_interactions = self._check_openfda_interactions(drug_ids, failures)
             for interaction in openfda_interactions:
+                self._use_display_names(interaction, display_names)
                 if not self._interaction_exists(all_interactions, interaction):
                     interaction['source'] = 'OpenFDA'
                     all_interactions.append(interaction)
                     severity_summary[interaction['severity']] += 1
             
             # 3. Check RxNorm for standardized interactions
-            rxnorm_interactions = self._check_rxnorm_interactions(medicines_lower)
+            rxnorm_interactions = self._check_rxnorm_interactions(drug_ids, failures)
             for interaction in rxnorm_interactions:
+                self._use_display_names(interaction, display_names)
                 if not self._interaction_exists(all_interactions, interaction):
                     interaction['source'] = 'RxNorm'
                     all_interactions.append(interaction)
@@ -134,6 +164,12 @@ class EnhancedDrugInteractionChecker:
                 'interactions': all_interactions,
                 'recommendations': self._generate_recommendations(all_interactions),
                 'data_sources': self._get_data_sources_used(all_interactions),
+                'degraded': bool(failures),
+                'degraded_lookups': [
+                    {'source': source, 'drug': display_names.get(drug, drug), 'error_type': error_type}
+                    for (source, drug), error_type in failures.items()
+                ],
+                'retry_scheduled': bool(failures) and retry_degraded and self._schedule_retry(drug_ids),
                 'timestamp': datetime.now().isoformat()
             }
             
@@ -148,58 +184,129 @@ class EnhancedDrugInteractionChecker:
                 'recommendations': []
             }
     
-    def _check_openfda_interactions(self, medicines: List[str]) -> List[Dict]:
+    def _schedule_retry(self, drug_ids: List[str]) -> bool:
+        """Re-run this check's lookups in the background (once per drug set at a time)"""
+        key = tuple(sorted(drug_ids))
+        with self._retry_lock:
+            if key in self._retrying:
+                return True
+            self._retrying.add(key)
+            if self._retry_executor is None:
+                self._retry_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='interaction-retry')
+        self._retry_executor.submit(self._retry_lookups, key)
+        return True
+    
+    def _retry_lookups(self, drug_ids: Tuple[str, ...]):
+        try:
+            with http_transport.rate_limit_budget(BACKGROUND_RATE_LIMIT_WAIT):
+                self.check_interactions(list(drug_ids), retry_degraded=False)
+        except Exception as e:
+            logging.warning(f"Background interaction re-check failed for {', '.join(drug_ids)}: {e}")
+        finally:
+            with self._retry_lock:
+                self._retrying.discard(drug_ids)
+    
+    def _use_display_names(self, interaction: Dict, display_names: Dict[str, str]):
+        """Report a finding under the caller's names instead of the lookup IDs"""
+        for field in ('drug1', 'drug2'):
+            interaction[field] = display_names.get(interaction.get(field), interaction.get(field))
+    
+    def check_pairs(self, pairs: List[Tuple[str, str]]) -> Dict:
+        """
+        OpenFDA and RxNorm findings for the given drug pairs only (drugs as
+        canonical IDs), each drug looked up once. For incremental checks
+        (user_interaction_state.py) that must not evaluate every pair of
+        the drugs involved.
+        
+        Returns {'status', 'interactions', 'degraded', 'degraded_lookups'}
+        """
+        pairs = list(dict.fromkeys(tuple(pair) for pair in pairs))
+        drugs = list(dict.fromkeys(drug for pair in pairs for drug in pair))
+        failures = {}
+        interactions = []
+        for interaction in self._check_openfda_interactions(drugs, failures, pairs):
+            if not self._interaction_exists(interactions, interaction):
+                interaction['source'] = 'OpenFDA'
+                interactions.append(interaction)
+        for interaction in self._check_rxnorm_interactions(drugs, failures, pairs):
+            if not self._interaction_exists(interactions, interaction):
+                interaction['source'] = 'RxNorm'
+                interactions.append(interaction)
+        return {
+            'status': 'success',
+            'interactions': interactions,
+            'degraded': bool(failures),
+            'degraded_lookups': [
+                {'source': source, 'drug': drug, 'error_type': error_type}
+                for (source, drug), error_type in failures.items()
+            ],
+        }
+    
+    def _check_openfda_interactions(self, medicines: List[str], failures: Dict,
+                                    pairs: Optional[List[Tuple[str, str]]] = None) -> List[Dict]:
         """
-        Check for interactions using OpenFDA
+        Check for interactions using OpenFDA (failed label lookups are
+        recorded in failures); all pairs of medicines unless pairs is given
         """
         interactions = []
         
         try:
             # Check interactions between all pairs of medicines
-            for i, drug1 in enumerate(medicines):
-                for j, drug2 in enumerate(medicines):
-                    if i < j:  # Avoid duplicates
-                        openfda_interactions = self.openfda_client.check_interactions_between(drug1, drug2)
-                        
-                        for interaction in openfda_interactions:
-                            # Map OpenFDA severity to our system
-                            severity = self._map_openfda_severity(interaction.get('severity', 'UNKNOWN'))
-                            
-                            interactions.append({
-                                'drug1': drug1,
-                                'drug2': drug2,
-                                'severity': severity,
-                                'interaction_type': 'Drug Interaction',
-                                'description': interaction.get('description', ''),
-                                'mechanism': 'See FDA labeling',
-                                'recommendation': 'Consult healthcare provider',
-                                'alternatives': 'Ask pharmacist for alternatives',
-                                'monitoring': 'Monitor for adverse effects'
-                            })
+            # (each label is loaded once, pairs are matched via its mention index)
+            label_failures = {}
+            pair_results = self.openfda_client.check_interactions_among(
+                medicines, failures=label_failures, pairs=pairs)
+            for medicine, error_type in label_failures.items():
+                failures[('OpenFDA', medicine)] = error_type
+            for (drug1, drug2), openfda_interactions in pair_results.items():
+                for interaction in openfda_interactions:
+                    # Map OpenFDA severity to our system
+                    severity = self._map_openfda_severity(interaction.get('severity', 'UNKNOWN'))
+                    
+                    interactions.append({
+                        'drug1': drug1,
+                        'drug2': drug2,
+                        'severity': severity,
+                        'interaction_type': 'Drug Interaction',
+                        'description': interaction.get('description', ''),
+                        'mechanism': 'See FDA labeling',
+                        'recommendation': 'Consult healthcare provider',
+                        'alternatives': 'Ask pharmacist for alternatives',
+                        'monitoring': 'Monitor for adverse effects'
+                    })
         except Exception as e:
             logging.error(f"Error checking OpenFDA interactions: {e}")
+            failures[('OpenFDA', None)] = 'transient'
         
         return interactions
     
-    def _check_rxnorm_interactions(self, medicines: List[str]) -> List[Dict]:
+    def _check_rxnorm_interactions(self, medicines: List[str], failures: Dict,
+                                   pairs: Optional[List[Tuple[str, str]]] = None) -> List[Dict]:
         """
-        Check for interactions using RxNorm
+        Check for interactions using RxNorm (failed searches and interaction
+        lookups are recorded in failures); all pairs of medicines unless
+        pairs is given
         """
         interactions = []
+        wanted = {frozenset(pair) for pair in pairs} if pairs is not None else None
         
         try:
             # Standardize drug names and get RxCUIs
             standardized_drugs = []
             for medicine in medicines:
-                standardized_name, rxcui = self.rxnorm_client.standardize_drug_name(medicine)
+                standardized_name, rxcui, error = self.rxnorm_client.standardize_drug_name_with_error(medicine)
+                if error and error.get('error_type') in DEGRADED_ERROR_TYPES:
+                    failures[('RxNorm', medicine)] = error['error_type']
                 if rxcui:
                     standardized_drugs.append((medicine, standardized_name, rxcui))
             
             # Check interactions between standardized drugs
             for i, (drug1, std_name1, rxcui1) in enumerate(standardized_drugs):
                 for j, (drug2, std_name2, rxcui2) in enumerate(standardized_drugs):
-                    if i < j:  # Avoid duplicates
+                    if i < j and (wanted is None or frozenset((drug1, drug2)) in wanted):
                         rxnorm_data = self.rxnorm_client.get_drug_interactions(rxcui1)
+                        if rxnorm_data.get('error_type') in DEGRADED_ERROR_TYPES:
+                            failures[('RxNorm', drug1)] = rxnorm_data['error_type']
                         
                         if 'error' not in rxnorm_data:
                             # Parse RxNorm interactions
@@ -222,6 +329,7 @@ class EnhancedDrugInteractionChecker:
                                     })
         except Exception as e:
             logging.error(f"Error checking RxNorm interactions: {e}")
+            failures[('RxNorm', None)] = 'transient'
         
         return interactions
     
@@ -338,18 +446,22 @@ class EnhancedDrugInteractionChecker:
         Get comprehensive medicine information from all sources
         """
         try:
+            # Always query the name as given: a close name may be a
+            # different drug (prednisolone vs prednisone)
+            query_name = medicine_name
+            
             # Standardize name using RxNorm
-            standardized_name, rxcui = self.rxnorm_client.standardize_drug_name(medicine_name)
+            standardized_name, rxcui, rxnorm_error = self.rxnorm_client.standardize_drug_name_with_error(query_name)
             
             # Get OpenFDA data
-            openfda_data = self.openfda_client.get_drug_info(medicine_name)
+            openfda_data = self.openfda_client.get_drug_info(query_name)
             
-            # Get RxNorm data
-            rxnorm_data = None
+            # Get RxNorm data (the search error, if the search failed)
+            rxnorm_data = rxnorm_error
             if rxcui:
-                rxnorm_data = self.rxnorm_client.find_drug_by_name(medicine_name)
+                rxnorm_data = self.rxnorm_client.find_drug_by_name(query_name)
             
-            return {
+            result = {
                 'original_name': medicine_name,
                 'standardized_name': standardized_name,
                 'rxcui': rxcui,
@@ -357,6 +469,10 @@ class EnhancedDrugInteractionChecker:
                 'rxnorm_data': rxnorm_data,
                 'timestamp': datetime.now().isoformat()
             }
+            # Neither source knows the name: offer close names to confirm
+            if not rxcui and (openfda_data or {}).get('error_type') == 'not_found':
+                result['did_you_mean'] = [suggestion['name'] for suggestion in did_you_mean(medicine_name)]
+            return result
             
         except Exception as e:
             logging.error(f"Error getting medicine info for {medicine_name}: {e}")
@@ -369,15 +485,30 @@ class EnhancedDrugInteractionChecker:
     def bulk_download_medicine_data(self, medicine_names: List[str]) -> Dict:
         """
         Bulk download and cache medicine data from all sources
+        (waits for rate-limit tokens like other background work)
         """
         results = {}
         
-        for medicine_name in medicine_names:
-            logging.info(f"Downloading data for {medicine_name}")
-            results[medicine_name] = self.get_medicine_info(medicine_name)
+        with http_transport.rate_limit_budget(BACKGROUND_RATE_LIMIT_WAIT):
+            for medicine_name in medicine_names:
+                logging.info(f"Downloading data for {medicine_name}")
+                results[medicine_name] = self.get_medicine_info(medicine_name)
         
         return results
     
+    def data_stamp(self, medicines: List[str]) -> tuple:
+        """
+        Stamps of the cached OpenFDA and RxNorm entries check_interactions()
+        reads for these medicines (cache reads only, no API calls), in
+        canonical ID order: spellings of the same set share one stamp
+        """
+        drug_ids = sorted({canonical_drug_id(med) or med.lower().strip()
+                           for med in medicines if med and med.strip()})
+        return tuple(
+            (self.openfda_client.data_stamp(drug_id), self.rxnorm_client.data_stamp(drug_id))
+            for drug_id in drug_ids
+        )
+    
     def get_cache_stats(self) -> Dict:
         """
         Get statistics about cached data from all sources
@@ -388,7 +519,9 @@ class EnhancedDrugInteractionChecker:
         return {
             'openfda_cache': openfda_stats,
             'rxnorm_cache': rxnorm_stats,
-            'total_cached_items': openfda_stats['total_cached_drugs'] + rxnorm_stats['total_cached_queries']
+            'total_cached_items': openfda_stats['total_cached_drugs'] + rxnorm_stats['total_cached_queries'],
+            'single_flight': single_flight.get_stats(),
+            'interaction_results': interaction_result_cache.get_stats()
         }
 
 # Global instance
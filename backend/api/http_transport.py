@@ -0,0 +1,282 @@
+"""
+============================================================================
+HTTP TRANSPORT - Shared Connection Pool for External Drug APIs
+============================================================================
+
+This file provides one pooled, keep-alive HTTP session that every external
+data source (OpenFDA, RxNorm, dataset collectors) sends its requests through.
+
+Why a shared transport:
+- requests.get() opens a new TCP + TLS connection for every call
+- A pooled Session reuses connections (keep-alive) across lookups
+- Retries and timeouts are configured once per host instead of per call
+
+Features:
+- One HTTPAdapter mounted per host with its own connection pool
+- Configurable pool size per host
+- Bounded exponential-backoff retries on 429 and 5xx responses
+- Honors the Retry-After header (capped so a request never hangs)
+- Per-host (connect, read) timeouts
+- Per-host token-bucket rate limits shared by all worker processes
+  (see api/rate_limiter.py); request threads never sleep for a token
+  (RateLimitExceeded is raised when none is available), background work
+  opts into waiting with rate_limit_budget(); lookups that fail this way
+  are reported as degraded by the interaction checkers and re-run in the
+  background (enhanced_drug_interactions.py)
+- Per-host circuit breaker (see api/circuit_breaker.py); while a host is
+  failing or very slow, requests fail fast with CircuitOpenError
+
+Used by:
+- api/openfda_client.py - FDA drug label lookups
+- api/rxnorm_client.py - RxNorm name standardization and interactions
+- datasets/scripts/collect_medicine_data.py - Bulk OpenFDA collection
+
+Configuration:
+- HOST_CONFIG below holds per-host overrides of DEFAULT_HOST_CONFIG
+- Hosts that are not listed are mounted lazily with the defaults
+============================================================================
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .circuit_breaker import CircuitBreaker
+from .rate_limiter import RateLimitExceeded, rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# Status codes that are worth retrying (rate limited or server-side failure)
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# How long background work (bulk downloads, deferred re-checks) waits for
+# a rate-limit token inside rate_limit_budget()
+BACKGROUND_RATE_LIMIT_WAIT = 30
+
+# error_type of client lookups that failed on our side of the API (no token,
+# breaker open, network/server trouble) rather than with an answer: results
+# built on them are incomplete and must be retried, not kept
+DEGRADED_ERROR_TYPES = ('transient', 'rate_limited', 'circuit_open')
+
+DEFAULT_HOST_CONFIG = {
+    'pool_connections': 2,      # Number of pools cached for this adapter
+    'pool_maxsize': 10,         # Connections kept alive per host
+    'timeout': (3.05, 10),      # (connect, read) seconds
+    'max_retries': 3,           # Total retry attempts per request
+    'backoff_factor': 0.5,      # 0.5s, 1s, 2s, ...
+    'backoff_max': 8,           # Never back off longer than this
+    'retry_after_max': 30,      # Cap for server supplied Retry-After
+    'rate_limit': None,         # (requests per second, burst) or None for no limit
+    'rate_limit_max_wait': 0,   # Longest a request waits for a token (seconds)
+    'circuit_breaker': {},      # Overrides of circuit_breaker.DEFAULT_BREAKER_CONFIG
+}
+
+HOST_CONFIG = {
+    # OpenFDA: 240 requests/minute, 120,000 requests/day
+    'api.fda.gov': {
+        'pool_maxsize': 16,
+        'timeout': (3.05, 10),
+        'rate_limit': (4.0, 8),     # 240/minute, short bursts of 8
+    },
+    # RxNav: no hard limit, but NLM asks for at most 20 requests/second
+    'rxnav.nlm.nih.gov': {
+        'pool_maxsize': 16,
+        'timeout': (3.05, 10),
+        'rate_limit': (20.0, 20),
+    },
+}
+
+
+class BoundedRetry(Retry):
+    """
+    urllib3 Retry that caps how long a Retry-After header may make us wait.
+
+    A misbehaving upstream can answer 429 with "Retry-After: 3600"; without
+    a cap the worker thread would sleep for an hour.
+    """
+
+    retry_after_cap = DEFAULT_HOST_CONFIG['retry_after_max']
+
+    def get_retry_after(self, response) -> Optional[float]:
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, self.retry_after_cap)
+
+
+class HTTPTransport:
+    """
+    Pooled keep-alive HTTP session shared by all external API clients.
+
+    Singleton Pattern:
+    - Instance created: http_transport = HTTPTransport()
+    - Reused by every client so connections are shared
+
+    Main Methods:
+    - get() - Send a GET request through the pooled session
+    - rate_limit_budget() - Let this thread wait for rate-limit tokens
+    - get_stats() - Pool configuration and circuit state per mounted host
+    - close() - Close all pooled connections
+    """
+
+    def __init__(self, host_config: Optional[Dict[str, Dict]] = None,
+                 user_agent: str = 'MedicineAssistant/1.0', limiter=None):
+        self.host_config = dict(HOST_CONFIG)
+        self.limiter = limiter or rate_limiter
+        if host_config:
+            self.host_config.update(host_config)
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': user_agent,
+            'Accept': 'application/json',
+            'Connection': 'keep-alive',
+        })
+
+        self._mounted_hosts = set()
+        self._breakers = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        for host in self.host_config:
+            self._mount(host)
+
+    def _config_for(self, host: str) -> Dict:
+        """Merge per-host overrides on top of the defaults"""
+        config = dict(DEFAULT_HOST_CONFIG)
+        config.update(self.host_config.get(host.split(':')[0], {}))
+        return config
+
+    def _build_retry(self, config: Dict) -> Retry:
+        """Build the retry policy for one host"""
+        retry_class = type('BoundedRetry', (BoundedRetry,), {
+            'retry_after_cap': config['retry_after_max']
+        })
+        return retry_class(
+            total=config['max_retries'],
+            connect=config['max_retries'],
+            read=config['max_retries'],
+            status=config['max_retries'],
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            backoff_factor=config['backoff_factor'],
+            backoff_max=config['backoff_max'],
+            respect_retry_after_header=True,
+            raise_on_status=False,  # Hand the last response back to the caller
+        )
+
+    def _mount(self, host: str):
+        """Mount a dedicated adapter (connection pool) for a host[:port]"""
+        config = self._config_for(host)
+        adapter = HTTPAdapter(
+            pool_connections=config['pool_connections'],
+            pool_maxsize=config['pool_maxsize'],
+            max_retries=self._build_retry(config),
+        )
+        self.session.mount(f"https://{host}/", adapter)
+        self.session.mount(f"http://{host}/", adapter)
+        self._mounted_hosts.add(host)
+        self._breakers[host] = CircuitBreaker(host, config['circuit_breaker'])
+        logger.debug(f"Mounted HTTP adapter for {host} (pool size {config['pool_maxsize']})")
+
+    def _ensure_mounted(self, host: str):
+        """Lazily mount hosts that were not configured up front"""
+        if host in self._mounted_hosts:
+            return
+        with self._lock:
+            if host not in self._mounted_hosts:
+                self._mount(host)
+
+    @contextmanager
+    def rate_limit_budget(self, seconds: float):
+        """
+        Within the block, requests from this thread wait up to `seconds` for
+        a rate-limit token instead of failing at once. For background work
+        (prefetch, warm-up, bulk collection), never for request threads.
+        """
+        previous = getattr(self._local, 'rate_limit_wait', None)
+        self._local.rate_limit_wait = seconds
+        try:
+            yield
+        finally:
+            self._local.rate_limit_wait = previous
+
+    def get(self, url: str, params: Optional[Dict] = None, timeout=None,
+            rate_limit_wait: Optional[float] = None, **kwargs) -> requests.Response:
+        """
+        Send a GET request through the shared pooled session.
+
+        Raises CircuitOpenError without sending anything while the host's
+        circuit is open. Then takes a rate-limit token, waiting at most
+        rate_limit_wait seconds (default: this thread's rate_limit_budget(),
+        else the host config, 0 = no wait) and raising RateLimitExceeded if
+        none is due in time. Retries on 429/5xx happen inside the
+        adapter; the final response is returned even if it is still an
+        error status. Connection errors and timeouts that survive all
+        retries are raised as requests exceptions.
+        """
+        host = urlsplit(url).netloc
+        self._ensure_mounted(host)
+        config = self._config_for(host)
+        breaker = self._breakers[host]
+        breaker.before_request()
+
+        if config['rate_limit']:
+            rate, burst = config['rate_limit']
+            if rate_limit_wait is None:
+                rate_limit_wait = getattr(self._local, 'rate_limit_wait', None)
+            max_wait = config['rate_limit_max_wait'] if rate_limit_wait is None else rate_limit_wait
+            try:
+                self.limiter.acquire(host.split(':')[0], rate, burst, max_wait)
+            except RateLimitExceeded:
+                # Nothing was sent; a half-open probe slot must not leak
+                breaker.cancel_request()
+                raise
+
+        if timeout is None:
+            timeout = config['timeout']
+
+        started = time.monotonic()
+        try:
+            response = self.session.get(url, params=params, timeout=timeout, **kwargs)
+        except requests.RequestException:
+            breaker.record_failure(time.monotonic() - started)
+            raise
+
+        if response.status_code in RETRY_STATUS_CODES:
+            breaker.record_failure(time.monotonic() - started)
+        else:
+            breaker.record_success(time.monotonic() - started)
+        return response
+
+    def get_stats(self) -> Dict:
+        """
+        Get pool configuration and circuit state for every mounted host
+        """
+        hosts = {}
+        for host in sorted(self._mounted_hosts):
+            config = self._config_for(host)
+            hosts[host] = {
+                'pool_maxsize': config['pool_maxsize'],
+                'timeout': list(config['timeout']) if isinstance(config['timeout'], tuple) else config['timeout'],
+                'max_retries': config['max_retries'],
+                'rate_limit': list(config['rate_limit']) if config['rate_limit'] else None,
+                'circuit': self._breakers[host].get_stats(),
+            }
+        return {'hosts': hosts, 'rate_limiter': self.limiter.get_stats()}
+
+    def close(self):
+        """
+        Close all pooled connections
+        """
+        self.session.close()
+
+# Global instance
+http_transport = HTTPTransport()
@@ -0,0 +1,125 @@
+"""
+============================================================================
+INTERACTION RESULT CACHE - Memoized Unified Checks per Medication Set
+============================================================================
+
+The same medication combinations (e.g. metformin + lisinopril +
+atorvastatin) recur across many users. This file caches the complete
+unified interaction report for a medication set so repeat checks skip the
+external lookups, merging and recommendation generation.
+
+Cache Key:
+- Sorted set of canonical drug IDs (drug_normalizer.canonical_drug_id),
+  so order, case, spacing and written strength don't matter
+- Plus the data version: the local interaction database version and the
+  stamps (created_at) of the set's own OpenFDA/RxNorm cache entries
+  (enhanced_interaction_checker.data_stamp(), looked up by canonical ID
+  like the checks themselves), taken after the report was built
+- Degraded reports (an OpenFDA/RxNorm lookup was rate limited, hit an
+  open circuit or failed transiently) are never stored: those failures
+  are not cached, so the stamps would not change and the incomplete
+  report would be served until the TTL ran out
+
+Invalidation:
+- TTL per entry (default 1 hour)
+- A changed local interaction database changes the key
+- Fetching, refreshing or removing one of the set's own cache entries
+  changes its stamp and so the key; writes for other medicines do not,
+  so busy caches don't invalidate every report
+- Bounded LRU: least recently used sets are evicted first
+
+Reuse:
+- A hit is adapted to the caller (drug names as the caller wrote them,
+  medicine count, fresh timestamp) by the unified checker
+
+Used by:
+- api/unified_drug_interactions.py: check_interactions()
+- api/enhanced_drug_interactions.py: get_cache_stats() - Hit/miss stats
+============================================================================
+"""
+
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Optional, Tuple
+
+from .drug_normalizer import canonical_drug_id
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_SECONDS = 3600
+
+
+def medication_set_key(medicines: Iterable[str]) -> Tuple[str, ...]:
+    """Sorted, de-duplicated canonical drug IDs for a medication list"""
+    return tuple(sorted({canonical_drug_id(medicine) for medicine in medicines if medicine}))
+
+
+class InteractionResultCache:
+    """
+    Bounded in-process LRU + TTL cache of unified interaction reports.
+
+    Singleton Pattern:
+    - Instance created: interaction_result_cache = InteractionResultCache()
+
+    Main Methods:
+    - get() - Cached report for (medication set, data version), or None
+    - put() - Store a report
+    - clear() - Drop everything
+    - get_stats() - Hits, misses, entries
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, medication_set: Tuple[str, ...], version: Hashable) -> Optional[Dict]:
+        """Deep copy of the cached report, or None on a miss or expiry"""
+        key = (medication_set, version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            result = entry[0]
+        return copy.deepcopy(result)
+
+    def put(self, medication_set: Tuple[str, ...], version: Hashable, result: Dict):
+        """Store a deep copy of a report (callers keep mutating theirs)"""
+        key = (medication_set, version)
+        stored = copy.deepcopy(result)
+        with self._lock:
+            self._entries[key] = (stored, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 3) if lookups else 0.0,
+            }
+
+# Global instance
+interaction_result_cache = InteractionResultCache()
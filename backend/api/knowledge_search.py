@@ -0,0 +1,264 @@
+"""
+============================================================================
+KNOWLEDGE SEARCH - Full-Text Index for MedicalKnowledge
+============================================================================
+
+Searching MedicalKnowledge with term/explanation/category icontains scans
+every row's long explanation text and returns matches in name order. This
+file searches a full-text index instead and ranks by relevance.
+
+Backends (picked from the database connection):
+- SQLite: FTS5 virtual table api_medicalknowledge_fts (porter stemming),
+  ranked with bm25() (term weighted over category over explanation),
+  highlighted with snippet(); the last query word matches as a prefix
+- PostgreSQL: generated tsvector column search_vector (weights A/B/C)
+  with a GIN index, ranked with ts_rank(), highlighted with ts_headline()
+- Anything else, or the index missing: search() returns None and callers
+  fall back to the icontains query
+
+Keeping it in sync:
+- Migration 0005 creates the index and fills it from existing rows
+- SQLite: post_save / post_delete signals update single rows
+  (connect_signals(), called from ApiConfig.ready())
+- PostgreSQL: the generated column updates itself
+- bulk_create() sends no signals, so populate_database calls rebuild()
+
+Used by:
+- api/views.py: search_medical_knowledge() - Ranked search, keyset pages
+  on (score, id) with a capped total on the first page
+- api/management/commands/populate_database.py - rebuild() after imports
+- api/apps.py: ApiConfig.ready() - connect_signals()
+============================================================================
+"""
+
+import logging
+import re
+from typing import Dict, List, Optional, Tuple
+
+from django.db import DatabaseError, connection
+from django.db.models.signals import post_delete, post_save
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'api_medicalknowledge_fts'
+KNOWLEDGE_TABLE = 'api_medicalknowledge'
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_END = '</mark>'
+SNIPPET_WORDS = 24
+
+# bm25() column weights: term, explanation, category
+BM25_WEIGHTS = (10.0, 1.0, 4.0)
+
+# Totals are counted up to this many matches (a larger total means "more than")
+MAX_COUNTED_MATCHES = 1000
+
+
+def fts5_query(query: str) -> Optional[str]:
+    """
+    FTS5 MATCH expression for user text: every word quoted (so operators
+    and punctuation in the query are literal), the last one as a prefix
+    """
+    words = re.findall(r'\w+', query.lower())
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+class KnowledgeSearchIndex:
+    """
+    Full-text search over MedicalKnowledge (SQLite FTS5 or PostgreSQL).
+
+    Singleton Pattern:
+    - Instance created: knowledge_search_index = KnowledgeSearchIndex()
+
+    Main Methods:
+    - search() - (ranked entries with snippets, total matches, next keyset), or None
+    - rebuild() - Re-index every row (after bulk imports)
+    - index_entry() / remove_entry() - Single-row sync (SQLite)
+    """
+
+    def __init__(self):
+        self._available = {}
+
+    @property
+    def vendor(self) -> str:
+        return connection.vendor
+
+    def is_available(self) -> bool:
+        """Whether the index exists for the current database"""
+        vendor = self.vendor
+        if vendor not in self._available:
+            self._available[vendor] = self._check_available(vendor)
+        return self._available[vendor]
+
+    def _check_available(self, vendor: str) -> bool:
+        try:
+            with connection.cursor() as cursor:
+                if vendor == 'sqlite':
+                    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = %s", [FTS_TABLE])
+                elif vendor == 'postgresql':
+                    cursor.execute(
+                        "SELECT 1 FROM information_schema.columns "
+                        "WHERE table_name = %s AND column_name = 'search_vector'", [KNOWLEDGE_TABLE]
+                    )
+                else:
+                    return False
+                return cursor.fetchone() is not None
+        except DatabaseError as e:
+            logger.warning(f"Knowledge search index unavailable: {e}")
+            return False
+
+    def index_entry(self, entry):
+        """Insert or replace one entry's row in the FTS5 table"""
+        if self.vendor != 'sqlite' or not self.is_available():
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [entry.pk])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, term, explanation, category) VALUES (%s, %s, %s, %s)",
+                [entry.pk, entry.term or '', entry.explanation or '', entry.category or '']
+            )
+
+    def remove_entry(self, entry_id: int):
+        if self.vendor != 'sqlite' or not self.is_available():
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [entry_id])
+
+    def rebuild(self) -> int:
+        """Re-index every MedicalKnowledge row; returns the number indexed"""
+        self._available.pop(self.vendor, None)
+        if not self.is_available():
+            return 0
+        with connection.cursor() as cursor:
+            if self.vendor == 'sqlite':
+                cursor.execute(f"DELETE FROM {FTS_TABLE}")
+                cursor.execute(
+                    f"INSERT INTO {FTS_TABLE} (rowid, term, explanation, category) "
+                    f"SELECT id, term, explanation, COALESCE(category, '') FROM {KNOWLEDGE_TABLE}"
+                )
+                cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+            cursor.execute(f"SELECT COUNT(*) FROM {KNOWLEDGE_TABLE}")
+            return cursor.fetchone()[0]
+
+    def search(self, query: str, limit: int = 20, after: Optional[List] = None,
+               count: bool = True) -> Optional[Tuple[List[Dict], Optional[int], Optional[List]]]:
+        """
+        Ranked full-text matches for a query, one keyset page at a time.
+
+        Pages are ordered by (score DESC, id) and continue after the
+        [score, id] of the previous page's last row, so later pages do not
+        re-rank the skipped rows. The total is only counted when asked for,
+        and only up to MAX_COUNTED_MATCHES + 1 rows.
+
+        Returns:
+        - ([{'entry': MedicalKnowledge, 'rank': float, 'snippet': str}, ...],
+           total or None, [score, id] to continue after or None on the last page)
+        - None when no index is available (callers fall back)
+        """
+        if not self.is_available():
+            return None
+        if self.vendor == 'sqlite':
+            rows, total = self._search_sqlite(query, limit + 1, after, count)
+        else:
+            rows, total = self._search_postgresql(query, limit + 1, after, count)
+
+        next_after = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_after = [rows[-1][1], rows[-1][0]]
+
+        from .models import MedicalKnowledge
+        entries = MedicalKnowledge.objects.in_bulk([row[0] for row in rows])
+        results = [
+            {'entry': entries[entry_id], 'rank': round(rank, 4), 'snippet': snippet}
+            for entry_id, rank, snippet in rows if entry_id in entries
+        ]
+        return results, total, next_after
+
+    def _search_sqlite(self, query: str, limit: int, after: Optional[List],
+                       count: bool) -> Tuple[List[Tuple], Optional[int]]:
+        match = fts5_query(query)
+        if match is None:
+            return [], 0 if count else None
+        weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+        total = None
+        with connection.cursor() as cursor:
+            if count:
+                cursor.execute(
+                    f"SELECT COUNT(*) FROM (SELECT 1 FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s LIMIT %s)",
+                    [match, MAX_COUNTED_MATCHES + 1]
+                )
+                total = cursor.fetchone()[0]
+                if not total:
+                    return [], total
+            # bm25() is lower-is-better; report it negated so higher is better
+            keyset, params = '', []
+            if after is not None:
+                keyset = "AND (score < %s OR (score = %s AND rowid > %s)) "
+                params = [after[0], after[0], after[1]]
+            cursor.execute(
+                f"SELECT rowid, -bm25({FTS_TABLE}, {weights}) AS score, "
+                f"snippet({FTS_TABLE}, 1, %s, %s, '…', %s) "
+                f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s {keyset}"
+                f"ORDER BY score DESC, rowid LIMIT %s",
+                [HIGHLIGHT_START, HIGHLIGHT_END, SNIPPET_WORDS, match, *params, limit]
+            )
+            return cursor.fetchall(), total
+
+    def _search_postgresql(self, query: str, limit: int, after: Optional[List],
+                           count: bool) -> Tuple[List[Tuple], Optional[int]]:
+        headline_options = (f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, "
+                            f"MaxWords={SNIPPET_WORDS}, MinWords=8, MaxFragments=1")
+        total = None
+        with connection.cursor() as cursor:
+            if count:
+                cursor.execute(
+                    f"SELECT COUNT(*) FROM (SELECT 1 FROM {KNOWLEDGE_TABLE} "
+                    f"WHERE search_vector @@ websearch_to_tsquery('english', %s) LIMIT %s) AS matches",
+                    [query, MAX_COUNTED_MATCHES + 1]
+                )
+                total = cursor.fetchone()[0]
+                if not total:
+                    return [], total
+            keyset, params = '', []
+            if after is not None:
+                keyset = "WHERE score < %s OR (score = %s AND id > %s) "
+                params = [after[0], after[0], after[1]]
+            cursor.execute(
+                f"SELECT id, score, ts_headline('english', explanation, q, %s) FROM ("
+                f"SELECT id, explanation, q, ts_rank(search_vector, q)::float8 AS score "
+                f"FROM {KNOWLEDGE_TABLE}, websearch_to_tsquery('english', %s) AS q "
+                f"WHERE search_vector @@ q) AS ranked {keyset}"
+                f"ORDER BY score DESC, id LIMIT %s",
+                [headline_options, query, *params, limit]
+            )
+            return cursor.fetchall(), total
+
+# Global instance
+knowledge_search_index = KnowledgeSearchIndex()
+
+
+def _on_knowledge_saved(sender, instance, **kwargs):
+    try:
+        knowledge_search_index.index_entry(instance)
+    except DatabaseError as e:
+        logger.warning(f"Failed to index medical knowledge {instance.pk}: {e}")
+
+
+def _on_knowledge_deleted(sender, instance, **kwargs):
+    try:
+        knowledge_search_index.remove_entry(instance.pk)
+    except DatabaseError as e:
+        logger.warning(f"Failed to unindex medical knowledge {instance.pk}: {e}")
+
+
+def connect_signals():
+    """Keep the SQLite FTS5 table in step with single-row saves and deletes"""
+    from .models import MedicalKnowledge
+    post_save.connect(_on_knowledge_saved, sender=MedicalKnowledge,
+                      dispatch_uid='knowledge_search_index_save')
+    post_delete.connect(_on_knowledge_deleted, sender=MedicalKnowledge,
+                        dispatch_uid='knowledge_search_index_delete')
@@ -0,0 +1,409 @@
+"""
+============================================================================
+LABEL STORE - Local OpenFDA Drug Label Snapshot with Full-Text Index
+============================================================================
+
+This file keeps a local copy of the OpenFDA drug label dataset so drug
+information can be answered with zero network calls and millisecond
+lookups (OpenFDAClient offline mode).
+
+Data Source:
+- OpenFDA bulk download files (https://open.fda.gov/apis/downloads/)
+  drug-label-XXXX-of-YYYY.json(.zip), each {"meta": ..., "results": [...]}
+- Imported with: python manage.py import_openfda_labels <files...>
+- Files are streamed label by label (json.JSONDecoder.raw_decode on a
+  sliding buffer), never loaded into memory as a whole
+
+Storage Layout (SQLite):
+- labels: one row per label (set_id, effective_time, compressed record
+  in the same shape OpenFDAClient.get_drug_info returns)
+- label_names: (name, label_id, kind) for every generic, brand and
+  substance name, lower-cased - the lookup index
+- labels_fts: FTS5 index over names, interactions, warnings and
+  indications for free-text search
+
+Used by:
+- api/openfda_client.py - Offline mode (OPENFDA_OFFLINE=1)
+- api/management/commands/import_openfda_labels.py - Snapshot import
+
+Location:
+- openfda_labels.sqlite3 in cache_store.CACHE_DIR (backend/datasets/cache),
+  whatever the working directory (OPENFDA_LABEL_STORE_PATH overrides it)
+============================================================================
+"""
+
+import io
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import zipfile
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from .cache_store import CACHE_DIR, encode_payload, decode_payload, normalize_cache_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = str(CACHE_DIR / 'openfda_labels.sqlite3')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS labels (
+    id              INTEGER PRIMARY KEY,
+    set_id          TEXT    NOT NULL UNIQUE,
+    effective_time  TEXT    NOT NULL DEFAULT '',
+    payload         BLOB    NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS label_names (
+    name        TEXT    NOT NULL,
+    label_id    INTEGER NOT NULL,
+    kind        TEXT    NOT NULL,
+    PRIMARY KEY (name, label_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_label_names_label_id ON label_names (label_id);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS labels_fts USING fts5(
+    names, drug_interactions, warnings, indications,
+    tokenize = 'porter unicode61'
+);
+"""
+
+# Label sections kept in the local record (same keys as the live client)
+LABEL_FIELDS = {
+    'drug_interactions': 'drug_interactions',
+    'warnings': 'warnings',
+    'adverse_reactions': 'adverse_reactions',
+    'contraindications': 'contraindications',
+    'dosage_administration': 'dosage_and_administration',
+    'indications': 'indications_and_usage',
+}
+
+
+# Interaction mention index: each drug_interactions paragraph is reduced to
+# its set of normalized words once, when the label is fetched/imported, and
+# stored with the record as 'interaction_tokens'. Pair checks then test
+# whether all words of a drug name are in a paragraph's set.
+MENTION_INDEX_VERSION = 2
+
+_MENTION_TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# Words that never identify a drug; dropped to keep the stored sets small
+MENTION_STOPWORDS = frozenset("""
+a an and are as at be been but by can could do does for from has have if in
+into is it its may might more most must no not of on or other should such
+than that the their then there these this those to was were when which
+while who will with within without you your
+""".split())
+
+
+def _words(text: str) -> List[str]:
+    """Lower-cased words, possessives reduced to the noun ("warfarin's" -> "warfarin")"""
+    words = _MENTION_TOKEN_RE.findall(text.lower().replace('\u2019', "'"))
+    return [word[:-2] if word.endswith("'s") else word for word in words]
+
+
+def mention_tokens(text: str) -> List[str]:
+    """Normalized, de-duplicated words of one interaction paragraph"""
+    return sorted(set(_words(text)) - MENTION_STOPWORDS)
+
+
+def name_tokens(drug_name: str) -> List[str]:
+    """All words of a drug name, in order (for phrase matching)"""
+    return _words(drug_name)
+
+
+def required_name_tokens(drug_name: str) -> List[str]:
+    """
+    Words a paragraph's mention set must contain to mention this drug.
+    Stopwords are not in the sets, so they are never required
+    ("Vitamin A" requires "vitamin"; the phrase check covers "a").
+    """
+    return [word for word in name_tokens(drug_name) if word not in MENTION_STOPWORDS]
+
+
+def index_interactions(paragraphs: Iterable) -> List[List[str]]:
+    """Build the per-paragraph mention index for a drug_interactions list"""
+    index = []
+    for paragraph in paragraphs:
+        if isinstance(paragraph, dict):
+            paragraph = paragraph.get('description', '')
+        index.append(mention_tokens(paragraph if isinstance(paragraph, str) else ''))
+    return index
+
+
+def process_label(drug_name: str, label: Dict) -> Dict:
+    """
+    Turn a raw OpenFDA label into the record get_drug_info() returns
+    (including the interaction mention index)
+    """
+    openfda = label.get('openfda', {})
+    record = {
+        'drug_name': drug_name,
+        'generic_name': openfda.get('generic_name', [drug_name]),
+        'brand_names': openfda.get('brand_name', []),
+    }
+    for key, section in LABEL_FIELDS.items():
+        record[key] = label.get(section, [])
+    record['interaction_tokens'] = index_interactions(record['drug_interactions'])
+    record['interaction_index_version'] = MENTION_INDEX_VERSION
+    record['fetched_at'] = datetime.now().isoformat()
+    record['source'] = 'OpenFDA'
+    return record
+
+
+def iter_label_records(stream: io.TextIOBase, chunk_size: int = 1 << 20) -> Iterator[Dict]:
+    """
+    Yield label objects from an OpenFDA bulk file one at a time.
+
+    Only the "results" array is parsed; the buffer never holds more than
+    one chunk plus one partially read label.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, position, eof
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            eof = True
+        buffer = buffer[position:] + chunk
+        position = 0
+
+    # Find the start of the results array
+    while True:
+        index = buffer.find('"results"', position)
+        if index != -1:
+            bracket = buffer.find('[', index)
+            if bracket != -1:
+                position = bracket + 1
+                break
+        if eof:
+            return
+        # Keep a tail in case the key is split across chunks
+        position = max(0, len(buffer) - 16)
+        fill()
+
+    while True:
+        # Skip whitespace and separators between objects
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position < len(buffer) or eof:
+                break
+            fill()
+
+        if position >= len(buffer) or buffer[position] == ']':
+            return
+
+        try:
+            label, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            fill()
+            continue
+
+        position = end
+        yield label
+
+
+def open_label_files(path: str) -> Iterator[io.TextIOBase]:
+    """
+    Open a .json file or every .json member of a .zip file as text streams
+    """
+    if path.endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            for member in archive.namelist():
+                if member.endswith('.json'):
+                    with archive.open(member) as raw:
+                        yield io.TextIOWrapper(raw, encoding='utf-8')
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            yield f
+
+
+class LabelStore:
+    """
+    Local, indexed store of OpenFDA drug labels.
+
+    Singleton Pattern:
+    - Instance created: label_store = LabelStore(os.environ.get('OPENFDA_LABEL_STORE_PATH', DEFAULT_DB_PATH))
+
+    Main Methods:
+    - import_file() - Stream a bulk label file into the store
+    - get_drug_info() - Label record for a generic/brand name, or None
+    - search() - Full-text search over names, interactions, warnings
+    - get_stats() - Label and name counts
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._local = threading.local()
+
+        try:
+            self._connect().executescript(SCHEMA)
+        except sqlite3.Error as e:
+            logger.error(f"Error initializing label store at {self.db_path}: {e}")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection, reconnecting after a fork"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _store_label(self, conn: sqlite3.Connection, label: Dict) -> bool:
+        """Insert or replace one label; older versions of a set_id are skipped"""
+        set_id = label.get('set_id') or label.get('id')
+        if not set_id:
+            return False
+        effective_time = label.get('effective_time', '')
+
+        existing = conn.execute(
+            'SELECT id, effective_time FROM labels WHERE set_id = ?', (set_id,)
+        ).fetchone()
+        if existing and existing[1] >= effective_time:
+            return False
+
+        openfda = label.get('openfda', {})
+        names = {}
+        for kind, field in (('generic', 'generic_name'), ('brand', 'brand_name'),
+                            ('substance', 'substance_name')):
+            for name in openfda.get(field, []):
+                names.setdefault(normalize_cache_key(name), kind)
+        if not names:
+            return False
+
+        generic = (openfda.get('generic_name') or [next(iter(names))])[0]
+        payload = encode_payload(process_label(generic, label))
+
+        if existing:
+            label_id = existing[0]
+            conn.execute(
+                'UPDATE labels SET effective_time = ?, payload = ? WHERE id = ?',
+                (effective_time, payload, label_id)
+            )
+            conn.execute('DELETE FROM label_names WHERE label_id = ?', (label_id,))
+            conn.execute('DELETE FROM labels_fts WHERE rowid = ?', (label_id,))
+        else:
+            label_id = conn.execute(
+                'INSERT INTO labels (set_id, effective_time, payload) VALUES (?, ?, ?)',
+                (set_id, effective_time, payload)
+            ).lastrowid
+
+        conn.executemany(
+            'INSERT OR IGNORE INTO label_names (name, label_id, kind) VALUES (?, ?, ?)',
+            [(name, label_id, kind) for name, kind in names.items()]
+        )
+        conn.execute(
+            'INSERT INTO labels_fts (rowid, names, drug_interactions, warnings, indications) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (label_id, '; '.join(names),
+             ' '.join(label.get('drug_interactions', [])),
+             ' '.join(label.get('warnings', []) or label.get('warnings_and_cautions', [])),
+             ' '.join(label.get('indications_and_usage', [])))
+        )
+        return True
+
+    def import_file(self, path: str, batch_size: int = 500, progress=None) -> Dict:
+        """
+        Stream a bulk label file (.json or .zip) into the store.
+
+        Commits every batch_size labels so memory and the WAL stay small.
+        """
+        conn = self._connect()
+        summary = {'read': 0, 'stored': 0, 'skipped': 0}
+
+        for stream in open_label_files(path):
+            pending = 0
+            conn.execute('BEGIN')
+            try:
+                for label in iter_label_records(stream):
+                    summary['read'] += 1
+                    if self._store_label(conn, label):
+                        summary['stored'] += 1
+                    else:
+                        summary['skipped'] += 1
+
+                    pending += 1
+                    if pending >= batch_size:
+                        conn.execute('COMMIT')
+                        conn.execute('BEGIN')
+                        pending = 0
+                        if progress:
+                            progress(summary)
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+
+        return summary
+
+    def get_drug_info(self, drug_name: str) -> Optional[Dict]:
+        """
+        Get the label record for a generic, brand or substance name.
+        Prefers generic-name matches and the most recent label.
+        """
+        try:
+            row = self._connect().execute(
+                'SELECT l.payload FROM label_names n JOIN labels l ON l.id = n.label_id '
+                'WHERE n.name = ? '
+                "ORDER BY n.kind = 'generic' DESC, l.effective_time DESC LIMIT 1",
+                (normalize_cache_key(drug_name),)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Error reading local label for {drug_name}: {e}")
+            return None
+
+        if row is None:
+            return None
+        record = decode_payload(row[0])
+        record['drug_name'] = drug_name
+        record['source'] = 'OpenFDA (local snapshot)'
+        return record
+
+    def search(self, query: str, limit: int = 20) -> List[Dict]:
+        """
+        Full-text search; returns the id and names of matching labels
+        """
+        terms = ' '.join(f'"{term}"' for term in query.replace('"', ' ').split())
+        if not terms:
+            return []
+        try:
+            rows = self._connect().execute(
+                'SELECT l.id, f.names FROM labels_fts f JOIN labels l ON l.id = f.rowid '
+                'WHERE labels_fts MATCH ? ORDER BY bm25(labels_fts) LIMIT ?',
+                (terms, limit)
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Error searching local labels for {query}: {e}")
+            return []
+        return [{'label_id': label_id, 'names': names.split('; ')} for label_id, names in rows]
+
+    def get_stats(self) -> Dict:
+        """
+        Get label and name counts
+        """
+        conn = self._connect()
+        return {
+            'labels': conn.execute('SELECT COUNT(*) FROM labels').fetchone()[0],
+            'names': conn.execute('SELECT COUNT(*) FROM label_names').fetchone()[0],
+            'label_database': self.db_path,
+        }
+
+# Global instance
+label_store = LabelStore(os.environ.get('OPENFDA_LABEL_STORE_PATH', DEFAULT_DB_PATH))
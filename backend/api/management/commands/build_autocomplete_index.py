@@ -0,0 +1,45 @@
+"""
+Django management command to build the medicine autocomplete trie
+
+This command reads every medicine name, generic name and brand name from
+the Medicine table, ranks medicines by how often they appear in
+prescription history and saves the compact trie that serves
+GET /api/medicines/autocomplete/. Servers never build the index
+themselves: the endpoint answers 503 until this command has run once.
+Running servers pick up a new file within RELOAD_CHECK_SECONDS.
+
+Usage:
+    python manage.py build_autocomplete_index
+    python manage.py build_autocomplete_index --path /var/cache/medicine_autocomplete.marisa
+
+This can be run:
+- After populate_database (it also rebuilds the index itself)
+- Periodically (e.g. nightly) so popularity follows recent prescriptions
+"""
+
+from django.core.management.base import BaseCommand
+from api.medicine_autocomplete import MedicineAutocomplete, medicine_autocomplete
+
+
+class Command(BaseCommand):
+    help = 'Build the prefix trie used by the medicine autocomplete endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            type=str,
+            default=None,
+            help='Where to save the trie (default: MEDICINE_AUTOCOMPLETE_PATH)',
+        )
+
+    def handle(self, *args, **options):
+        autocomplete = MedicineAutocomplete(options['path']) if options['path'] else medicine_autocomplete
+        self.stdout.write(f'Building autocomplete index ({autocomplete.backend})...')
+
+        keys = autocomplete.build_index()
+
+        if autocomplete.backend != 'marisa-trie':
+            self.stdout.write(self.style.WARNING(
+                'marisa-trie is not installed: saved a sorted-list index instead (larger, not memory-mapped)'
+            ))
+        self.stdout.write(self.style.SUCCESS(f'Saved {keys} names to {autocomplete.file_path}'))
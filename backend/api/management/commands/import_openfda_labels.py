@@ -0,0 +1,69 @@
+"""
+Django management command to import an OpenFDA drug label snapshot
+
+This command streams OpenFDA bulk drug label files (drug-label-*.json or
+the .zip files as downloaded) into the local label store, one label at a
+time, without loading a whole file into memory. Once imported, setting
+OPENFDA_OFFLINE=1 makes OpenFDAClient answer from this store only.
+
+Usage:
+    python manage.py import_openfda_labels drug-label-0001-of-0013.json.zip
+    python manage.py import_openfda_labels ../datasets/raw/openfda/*.zip
+    python manage.py import_openfda_labels labels.json --batch-size 1000
+
+Download the files from: https://open.fda.gov/apis/downloads/
+"""
+
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from api.label_store import label_store
+
+
+class Command(BaseCommand):
+    help = 'Stream OpenFDA bulk drug label files into the local label store'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'files',
+            nargs='+',
+            help='OpenFDA drug label .json or .json.zip files',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Labels per database transaction',
+        )
+
+    def handle(self, *args, **options):
+        missing = [path for path in options['files'] if not os.path.exists(path)]
+        if missing:
+            raise CommandError(f"File not found: {', '.join(missing)}")
+
+        started = time.monotonic()
+        totals = {'read': 0, 'stored': 0, 'skipped': 0}
+
+        for path in options['files']:
+            self.stdout.write(f"Importing {path}...")
+
+            def progress(summary):
+                if summary['read'] % 5000 == 0:
+                    self.stdout.write(f"  {summary['read']} labels read, {summary['stored']} stored")
+
+            summary = label_store.import_file(path, batch_size=options['batch_size'], progress=progress)
+            for key in totals:
+                totals[key] += summary[key]
+            self.stdout.write(
+                f"  {summary['read']} labels read, {summary['stored']} stored, "
+                f"{summary['skipped']} skipped (no names or older version)"
+            )
+
+        stats = label_store.get_stats()
+        elapsed = time.monotonic() - started
+        self.stdout.write(f"  Labels in store: {stats['labels']} ({stats['names']} names)")
+        self.stdout.write(f"  Elapsed: {elapsed:.1f}s")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {totals['stored']} of {totals['read']} labels into {stats['label_database']}"
+        ))
@@ -0,0 +1,168 @@
+"""
+Django management command to convert the external API cache to the
+current compact payload format
+
+This command:
+1. Imports legacy per-drug JSON cache files (datasets/cache/openfda/*.json,
+   datasets/cache/rxnorm/*.json, pretty-printed with indent=2) into the
+   SQLite cache store, keeping their original expiry (entries fetched
+   since are newer and are kept)
+2. Rewrites every stored row as version-headed, zlib-compressed compact
+   JSON with unused fields pruned
+3. Prints a size and parse-time report (before vs after)
+
+Usage:
+    python manage.py migrate_external_cache
+    python manage.py migrate_external_cache --delete-legacy
+    python manage.py migrate_external_cache --legacy-dir datasets/cache --dry-run
+"""
+
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from api.cache_store import cache_store, encode_payload, decode_payload
+from api.label_store import index_interactions, MENTION_INDEX_VERSION
+from api.openfda_client import openfda_client, compact_label_record
+from api.rxnorm_client import rxnorm_client, compact_rxnorm_record
+
+# Legacy RxNorm files were named "<endpoint>_<query>.json"
+RXNORM_ENDPOINTS = ('drug_info', 'interactions', 'search')
+
+
+def compact_record(source, endpoint, data):
+    """Prune a cached record (and add the interaction index to old labels)"""
+    if source == 'openfda':
+        data = compact_label_record(data)
+        if 'error' not in data and data.get('interaction_index_version') != MENTION_INDEX_VERSION:
+            data['interaction_tokens'] = index_interactions(data.get('drug_interactions', []))
+            data['interaction_index_version'] = MENTION_INDEX_VERSION
+        return data
+    if source == 'rxnorm':
+        return compact_rxnorm_record(endpoint, data)
+    return data
+
+
+class Command(BaseCommand):
+    help = 'Import legacy JSON cache files and rewrite cache entries in the compact payload format'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--legacy-dir',
+            type=str,
+            default='datasets/cache',
+            help='Directory holding the legacy openfda/ and rxnorm/ cache folders',
+        )
+        parser.add_argument(
+            '--delete-legacy',
+            action='store_true',
+            help='Delete legacy JSON files after they are imported',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report what would be imported (no changes)',
+        )
+
+    def _legacy_entry(self, source, filename, data):
+        """Work out (endpoint, key) for a legacy cache file"""
+        if source == 'openfda':
+            return 'label', data.get('drug_name') or filename[:-5].replace('_', ' ')
+        for endpoint in RXNORM_ENDPOINTS:
+            if filename.startswith(f"{endpoint}_"):
+                key = data.get('query') if endpoint == 'search' else data.get('rxcui')
+                return endpoint, key or filename[len(endpoint) + 1:-5]
+        return None, None
+
+    def _import_legacy(self, legacy_dir, delete, dry_run):
+        report = {'files': 0, 'imported': 0, 'kept': 0, 'skipped': 0, 'bytes_before': 0, 'bytes_after': 0,
+                  'parse_seconds_before': 0.0, 'parse_seconds_after': 0.0}
+        ttls = {'openfda': openfda_client.cache_duration, 'rxnorm': rxnorm_client.cache_duration}
+
+        for source in ('openfda', 'rxnorm'):
+            directory = os.path.join(legacy_dir, source)
+            if not os.path.isdir(directory):
+                continue
+
+            for filename in sorted(os.listdir(directory)):
+                if not filename.endswith('.json'):
+                    continue
+                path = os.path.join(directory, filename)
+                report['files'] += 1
+
+                try:
+                    with open(path, 'rb') as f:
+                        raw = f.read()
+                    started = time.perf_counter()
+                    data = json.loads(raw.decode('utf-8'))
+                    report['parse_seconds_before'] += time.perf_counter() - started
+                except (OSError, ValueError) as e:
+                    self.stdout.write(self.style.WARNING(f"  Skipping unreadable {path}: {e}"))
+                    report['skipped'] += 1
+                    continue
+
+                endpoint, key = self._legacy_entry(source, filename, data)
+                if endpoint is None:
+                    report['skipped'] += 1
+                    continue
+
+                data = compact_record(source, endpoint, data)
+                payload = encode_payload(data)
+                started = time.perf_counter()
+                decode_payload(payload)
+                report['parse_seconds_after'] += time.perf_counter() - started
+                report['bytes_before'] += len(raw)
+                report['bytes_after'] += len(payload)
+
+                if dry_run:
+                    report['imported'] += 1
+                    continue
+
+                # Keep the legacy expiry: file mtime + client TTL
+                created_at = os.path.getmtime(path)
+                if cache_store.restore(source, endpoint, key, data, created_at,
+                                       created_at + ttls[source].total_seconds()):
+                    report['imported'] += 1
+                else:
+                    report['kept'] += 1
+                if delete:
+                    os.remove(path)
+
+        return report
+
+    def _write_report(self, title, report, count_key):
+        before, after = report['bytes_before'], report['bytes_after']
+        change = (after / before - 1) * 100 if before else 0.0
+        self.stdout.write(f"{title}:")
+        self.stdout.write(f"  Entries:         {report[count_key]}")
+        self.stdout.write(f"  Size before:     {before:,} bytes")
+        self.stdout.write(f"  Size after:      {after:,} bytes ({change:+.1f}%)")
+        if report[count_key]:
+            per_before = report['parse_seconds_before'] / report[count_key] * 1000
+            per_after = report['parse_seconds_after'] / report[count_key] * 1000
+            self.stdout.write(f"  Parse per entry: {per_before:.3f} ms -> {per_after:.3f} ms")
+
+    def handle(self, *args, **options):
+        dry_run = options.get('dry_run', False)
+
+        self.stdout.write(f"Importing legacy JSON cache files from {options['legacy_dir']}...")
+        legacy = self._import_legacy(options['legacy_dir'], options.get('delete_legacy'), dry_run)
+        self._write_report('Legacy JSON files', legacy, 'imported')
+        if legacy['kept']:
+            self.stdout.write(f"  Kept {legacy['kept']} newer cache entries (files not imported)")
+        if legacy['skipped']:
+            self.stdout.write(self.style.WARNING(f"  Skipped {legacy['skipped']} files"))
+
+        if dry_run:
+            self.stdout.write(self.style.SUCCESS('Dry run complete (no changes made)'))
+            return
+
+        self.stdout.write("Rewriting cache store entries in the compact format...")
+        rows = cache_store.rewrite_payloads(compact_record)
+        self._write_report('Cache store entries', rows, 'entries')
+        self.stdout.write(f"  Rewritten:       {rows['upgraded']}")
+        if rows['errors']:
+            self.stdout.write(self.style.WARNING(f"  Unreadable entries left as is: {rows['errors']}"))
+
+        self.stdout.write(self.style.SUCCESS('External cache migration complete!'))
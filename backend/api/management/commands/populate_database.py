@@ -1,8 +1,12 @@
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from django.db import transaction
 import json
 import os
-from api.models import Medicine, MedicalKnowledge
+from api.models import Medicine, MedicalKnowledge, medicine_lookup_key
+from api.medicine_lookup import rebuild_medicine_aliases
+from api.table_counts import table_counter
+from api.knowledge_search import knowledge_search_index
 
 
 class Command(BaseCommand):
@@ -56,6 +60,13 @@ class Command(BaseCommand):
         if os.path.exists(medical_knowledge_file):
             self.import_medical_knowledge(medical_knowledge_file, batch_size)
         
+        # Rebuild the autocomplete trie for the new medicines
+        call_command('build_autocomplete_index', stdout=self.stdout)
+        
+        # Bulk imports send no signals: recount the cached table sizes
+        counts = table_counter.refresh()
+        self.stdout.write(f'Table counts refreshed ({counts["api.Medicine"]} medicines)')
+        
         self.stdout.write(self.style.SUCCESS('Database population completed!'))
 
     def import_medicines(self, file_path, batch_size):
@@ -87,6 +98,8 @@ class Command(BaseCommand):
                         medicine_obj = Medicine(
                             name=medicine_data.get('name', ''),
                             generic_name=medicine_data.get('generic_name', ''),
+                            name_norm=medicine_lookup_key(medicine_data.get('name', '')),
+                            generic_norm=medicine_lookup_key(medicine_data.get('generic_name', '')),
                             brand_names=medicine_data.get('brand_names', []),
                             category=medicine_data.get('category', ''),
                             description=medicine_data.get('description', ''),
@@ -119,6 +132,10 @@ class Command(BaseCommand):
         self.stdout.write(
             self.style.SUCCESS(f'Successfully imported {imported_count} medicines')
         )
+        
+        # bulk_create() skips save() and signals: rebuild the alias table
+        aliases = rebuild_medicine_aliases(batch_size=batch_size)
+        self.stdout.write(f'Medicine aliases rebuilt ({aliases} aliases)')
 
     def import_medical_knowledge(self, file_path, batch_size):
         """Import medical knowledge from JSON file"""
@@ -170,3 +187,7 @@ class Command(BaseCommand):
         self.stdout.write(
             self.style.SUCCESS(f'Successfully imported {imported_count} medical knowledge entries')
         )
+        
+        # bulk_create() sends no signals: re-index for full-text search
+        indexed = knowledge_search_index.rebuild()
+        self.stdout.write(f'Full-text index rebuilt ({indexed} entries)')
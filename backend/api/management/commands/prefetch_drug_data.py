@@ -0,0 +1,136 @@
+"""
+Django management command to pre-fetch OpenFDA and RxNorm drug data
+
+This command downloads and caches external drug reference data for every
+medicine in the local Medicine table (or a supplied list), using a bounded
+worker pool paced by the shared rate limiter. Progress is checkpointed, so
+an interrupted run picks up where it stopped; medicines completed more
+than --max-age-hours ago (default 24) are fetched again.
+
+Usage:
+    python manage.py prefetch_drug_data
+    python manage.py prefetch_drug_data --medicines "Aspirin,Warfarin"
+    python manage.py prefetch_drug_data --file medicines.txt --workers 8
+    python manage.py prefetch_drug_data --reset
+    python manage.py prefetch_drug_data --max-age-hours 6
+
+This can be run:
+- Once after populate_database to warm the cache
+- Via cron job (e.g. weekly) to keep cached data fresh - the checkpoint
+  has expired by then, so every medicine is fetched again
+"""
+
+import os
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from api.models import Medicine
+from api.prefetch import prefetch_medicines, CHECKPOINT_MAX_AGE, DEFAULT_CHECKPOINT_PATH
+
+
+class Command(BaseCommand):
+    help = 'Pre-fetch and cache OpenFDA/RxNorm data for local medicines (resumable)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--medicines',
+            type=str,
+            help='Comma-separated medicine names (default: whole Medicine table)',
+        )
+        parser.add_argument(
+            '--file',
+            type=str,
+            help='Text file with one medicine name per line',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of concurrent workers (pacing is done by the rate limiter)',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            type=str,
+            default=DEFAULT_CHECKPOINT_PATH,
+            help='Checkpoint file recording completed medicines',
+        )
+        parser.add_argument(
+            '--max-age-hours',
+            type=float,
+            default=CHECKPOINT_MAX_AGE.total_seconds() / 3600,
+            help='Fetch medicines completed longer ago than this again (default: 24)',
+        )
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Ignore and overwrite the existing checkpoint',
+        )
+        parser.add_argument(
+            '--include-generic',
+            action='store_true',
+            help='Also prefetch generic names from the Medicine table',
+        )
+
+    def _medicine_names(self, options):
+        if options.get('medicines'):
+            return [name.strip() for name in options['medicines'].split(',')]
+
+        if options.get('file'):
+            if not os.path.exists(options['file']):
+                raise CommandError(f"File not found: {options['file']}")
+            with open(options['file'], 'r', encoding='utf-8') as f:
+                return [line.strip() for line in f]
+
+        names = list(Medicine.objects.values_list('name', flat=True))
+        if options.get('include_generic'):
+            names.extend(
+                Medicine.objects.exclude(generic_name__isnull=True)
+                .exclude(generic_name='')
+                .values_list('generic_name', flat=True)
+            )
+        return names
+
+    def handle(self, *args, **options):
+        names = self._medicine_names(options)
+        checkpoint = options['checkpoint']
+
+        if options.get('reset') and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+            self.stdout.write(f"Removed checkpoint {checkpoint}")
+
+        self.stdout.write(
+            f"Prefetching drug data for {len(names)} medicines "
+            f"with {options['workers']} workers..."
+        )
+
+        def progress(state):
+            if state['done'] % 50 == 0 or state['done'] == state['pending']:
+                self.stdout.write(
+                    f"  {state['done']}/{state['pending']} done "
+                    f"({state['fetched']} ok, {state['failed']} failed, "
+                    f"{state['rate']:.1f} medicines/s)"
+                )
+
+        try:
+            summary = prefetch_medicines(
+                names, workers=options['workers'], checkpoint_path=checkpoint,
+                checkpoint_max_age=timedelta(hours=options['max_age_hours']), progress=progress
+            )
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING(
+                f"Interrupted - progress saved to {checkpoint}, rerun to resume"
+            ))
+            return
+
+        self.stdout.write(f"  Total medicines:      {summary['total']}")
+        self.stdout.write(f"  Already done (skipped): {summary['skipped']}")
+        self.stdout.write(f"  Fetched:              {summary['fetched']}")
+        self.stdout.write(f"  Failed (will retry):  {summary['failed']}")
+        self.stdout.write(f"  Elapsed:              {summary['elapsed_seconds']}s")
+        self.stdout.write(f"  Throughput:           {summary['medicines_per_second']} medicines/s")
+
+        if summary['failures']:
+            preview = ', '.join(summary['failures'][:10])
+            self.stdout.write(self.style.WARNING(f"Failed medicines (first 10): {preview}"))
+
+        self.stdout.write(self.style.SUCCESS('Drug data prefetch complete!'))
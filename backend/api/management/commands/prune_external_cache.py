@@ -0,0 +1,84 @@
+"""
+Django management command to evict expired external API cache entries
+
+This command removes expired OpenFDA/RxNorm responses from the shared SQLite
+cache (api/cache_store.py) and can optionally VACUUM the database file to
+return the freed space to the filesystem.
+
+Usage:
+    python manage.py prune_external_cache
+    python manage.py prune_external_cache --source openfda --grace-days 7
+    python manage.py prune_external_cache --vacuum
+    python manage.py prune_external_cache --clear --source rxnorm
+
+This can be run:
+- Manually when needed
+- Via cron job (e.g. nightly) to keep the cache file small
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from api.cache_store import cache_store, DEFAULT_MAX_STALE
+
+
+class Command(BaseCommand):
+    help = 'Evict expired OpenFDA/RxNorm cache entries and optionally compact the cache database'
+
+    def add_arguments(self, parser):
+        # Optional argument to prune one data source only
+        parser.add_argument(
+            '--source',
+            choices=['openfda', 'rxnorm'],
+            help='Prune entries for this source only',
+        )
+
+        # Recently expired entries are still served while they refresh
+        # (stale-while-revalidate), so keep them for the max-stale window
+        parser.add_argument(
+            '--grace-days',
+            type=int,
+            default=DEFAULT_MAX_STALE.days,
+            help=f'Only evict entries that expired more than this many days ago '
+                 f'(default: {DEFAULT_MAX_STALE.days}, the max-stale window)',
+        )
+
+        parser.add_argument(
+            '--vacuum',
+            action='store_true',
+            help='Run VACUUM afterwards to shrink the database file',
+        )
+
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Remove ALL entries (not just expired ones)',
+        )
+
+    def handle(self, *args, **options):
+        source = options.get('source')
+        grace_days = options.get('grace_days', DEFAULT_MAX_STALE.days)
+        label = source or 'all sources'
+
+        if options.get('clear'):
+            removed = cache_store.clear(source)
+            self.stdout.write(f"Cleared {removed} cache entries for {label}")
+        else:
+            removed = cache_store.purge_expired(timedelta(days=grace_days), source)
+            self.stdout.write(
+                f"Evicted {removed} expired cache entries for {label} "
+                f"(grace period: {grace_days} days)"
+            )
+
+        if options.get('vacuum'):
+            self.stdout.write("Compacting cache database...")
+            cache_store.vacuum()
+
+        for name in ([source] if source else ['openfda', 'rxnorm']):
+            stats = cache_store.get_stats(name)
+            self.stdout.write(
+                f"  {name}: {stats['total_entries']} entries, "
+                f"{stats['payload_bytes']} bytes"
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Cache pruning complete ({removed} entries removed)"))
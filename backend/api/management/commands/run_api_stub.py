@@ -0,0 +1,124 @@
+"""
+Django management command to run the local OpenFDA/RxNorm stub server
+
+This command starts api/api_stub.py, a local stand-in for the OpenFDA label
+and RxNorm endpoints, so the enhanced interaction path can be benchmarked
+and load-tested without the live APIs.
+
+Usage:
+    python manage.py run_api_stub --mode record
+    python manage.py run_api_stub
+    python manage.py run_api_stub --latency-ms 120 --jitter-ms 40 --error-rate 0.05
+    python manage.py run_api_stub --port 9000 --error-statuses 429,503
+
+Then point the server (or a benchmark) at it:
+    OPENFDA_BASE_URL=http://127.0.0.1:8765/drug/label.json \\
+    RXNORM_BASE_URL=http://127.0.0.1:8765/REST \\
+    EXTERNAL_API_CACHE_PATH=datasets/cache/stub_api_cache.sqlite3 \\
+    python manage.py runserver
+
+This can be run:
+- Once in record mode against the live APIs to capture fixtures
+- In replay mode in CI and in the perf lab (no network needed)
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from api.api_stub import StubAPIServer, DEFAULT_FIXTURES_DIR, DEFAULT_PORT, MODES
+
+
+class Command(BaseCommand):
+    help = 'Run a local OpenFDA/RxNorm stand-in with record/replay and fault injection'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mode',
+            choices=MODES,
+            default='replay',
+            help='replay: serve fixtures only; record: fetch and save unknown requests',
+        )
+        parser.add_argument(
+            '--host',
+            type=str,
+            default='127.0.0.1',
+            help='Interface to listen on',
+        )
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=DEFAULT_PORT,
+            help='Port to listen on',
+        )
+        parser.add_argument(
+            '--fixtures',
+            type=str,
+            default=DEFAULT_FIXTURES_DIR,
+            help='Directory holding recorded responses',
+        )
+        parser.add_argument(
+            '--latency-ms',
+            type=float,
+            default=0,
+            help='Latency added to every response',
+        )
+        parser.add_argument(
+            '--jitter-ms',
+            type=float,
+            default=0,
+            help='Random +/- variation of the added latency',
+        )
+        parser.add_argument(
+            '--error-rate',
+            type=float,
+            default=0.0,
+            help='Fraction of requests (0-1) answered with an injected error',
+        )
+        parser.add_argument(
+            '--error-statuses',
+            type=str,
+            default='503',
+            help='Comma-separated status codes used for injected errors',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            help='Random seed, for repeatable latency and error patterns',
+        )
+
+    def handle(self, *args, **options):
+        if not 0.0 <= options['error_rate'] <= 1.0:
+            raise CommandError('--error-rate must be between 0 and 1')
+        try:
+            error_statuses = [int(code) for code in options['error_statuses'].split(',') if code.strip()]
+        except ValueError:
+            raise CommandError(f"Invalid --error-statuses: {options['error_statuses']}")
+
+        try:
+            server = StubAPIServer(
+                host=options['host'],
+                port=options['port'],
+                mode=options['mode'],
+                fixtures_dir=options['fixtures'],
+                latency_ms=options['latency_ms'],
+                jitter_ms=options['jitter_ms'],
+                error_rate=options['error_rate'],
+                error_statuses=error_statuses,
+                seed=options['seed'],
+            )
+        except OSError as e:
+            raise CommandError(f"Could not listen on {options['host']}:{options['port']}: {e}")
+
+        self.stdout.write(self.style.SUCCESS(f"API stub ({options['mode']}) listening on {server.address}"))
+        self.stdout.write(f"  OPENFDA_BASE_URL={server.address}/drug/label.json")
+        self.stdout.write(f"  RXNORM_BASE_URL={server.address}/REST")
+        self.stdout.write(f"  Fixtures: {options['fixtures']}")
+        self.stdout.write(f"  Stats:    {server.address}/_stub/stats")
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            stats = server.get_stats()
+            self.stdout.write(
+                f"Stopped after {stats['requests']} requests "
+                f"({stats['replayed']} replayed, {stats['recorded']} recorded, "
+                f"{stats['not_found']} not found, {stats['injected_errors']} injected errors)"
+            )
@@ -0,0 +1,93 @@
+"""
+Django management command to warm caches for popular medicines
+
+This command finds the most frequently extracted medicines in recent
+prescription history and fetches their OpenFDA and RxNorm data ahead of
+real traffic, within a time budget. Only the shared SQLite cache store
+(datasets/cache/external_api_cache.sqlite3) is warmed: the medicine
+detail/alternatives memo caches and the BioBERT model live in each server
+process's memory and would be thrown away when this command exits.
+
+Usage:
+    python manage.py warm_caches
+    python manage.py warm_caches --days 7 --top 100 --time-budget 120
+    python manage.py warm_caches --medicines "Aspirin,Warfarin"
+
+This can be run:
+- Right after a deploy or after clearing the external API cache
+
+To also warm the in-process caches (and BioBERT), let the server do it at
+startup: WARM_CACHES_ON_STARTUP=1 (see api/apps.py).
+"""
+
+from django.core.management.base import BaseCommand
+from api.cache_warmup import (
+    top_prescribed_medicines, warm_caches,
+    DEFAULT_WINDOW_DAYS, DEFAULT_TOP_N, DEFAULT_TIME_BUDGET, DEFAULT_WORKERS,
+)
+
+
+class Command(BaseCommand):
+    help = 'Warm the shared external API cache (OpenFDA/RxNorm) for popular medicines'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=DEFAULT_WINDOW_DAYS,
+            help='Look at prescriptions from the last N days',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=DEFAULT_TOP_N,
+            help='Number of most frequent medicines to warm',
+        )
+        parser.add_argument(
+            '--time-budget',
+            type=float,
+            default=DEFAULT_TIME_BUDGET,
+            help='Stop starting new lookups after this many seconds',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=DEFAULT_WORKERS,
+            help='Number of concurrent lookups',
+        )
+        parser.add_argument(
+            '--medicines',
+            type=str,
+            help='Comma-separated medicine names (skips the history query)',
+        )
+
+    def handle(self, *args, **options):
+        if options.get('medicines'):
+            names = [name.strip() for name in options['medicines'].split(',') if name.strip()]
+        else:
+            names = top_prescribed_medicines(days=options['days'], limit=options['top'])
+            self.stdout.write(
+                f"Found {len(names)} popular medicines in the last {options['days']} days"
+            )
+
+        if not names:
+            self.stdout.write(self.style.WARNING('Nothing to warm'))
+            return
+
+        summary = warm_caches(
+            names,
+            time_budget=options['time_budget'],
+            workers=options['workers'],
+        )
+
+        self.stdout.write(f"  Medicines:            {summary['total']}")
+        self.stdout.write(f"  Warmed:               {summary['warmed']}")
+        self.stdout.write(f"  Failed:               {summary['failed']}")
+        self.stdout.write(f"  Skipped (budget):     {summary['skipped']}")
+        self.stdout.write(f"  Elapsed:              {summary['elapsed_seconds']}s")
+
+        if summary['failures']:
+            preview = ', '.join(summary['failures'][:10])
+            self.stdout.write(self.style.WARNING(f"Failed medicines (first 10): {preview}"))
+
+        self.stdout.write(self.style.SUCCESS('Cache warm-up complete!'))
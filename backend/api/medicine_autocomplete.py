@@ -0,0 +1,266 @@
+"""
+============================================================================
+MEDICINE AUTOCOMPLETE - Prefix Search from a Prebuilt Compact Trie
+============================================================================
+
+The search screen asks for completions on every keystroke. Running
+icontains queries over names and the brand_names JSON for each key press
+is far too slow, so this file answers prefixes from a compact trie built
+once over every medicine name, generic name and brand name.
+
+Trie:
+- marisa-trie RecordTrie, keys "<lowercased name>\\x01<display name>",
+  values (medicine ID, popularity)
+- Built from the Medicine table by build_index() - only from the
+  build_autocomplete_index command, never inside a request - and saved
+  to MEDICINE_AUTOCOMPLETE_PATH (default
+  backend/datasets/cache/medicine_autocomplete.marisa)
+- Servers memory-map the saved file and reload it when it changes
+  (checked at most every RELOAD_CHECK_SECONDS); loading is locked so
+  concurrent requests load it once
+- Until the file exists complete() has no index: the endpoint answers
+  503 and is_ready() is False
+- Without marisa-trie installed a sorted list + bisect is used instead
+  (same results), saved as JSON next to the trie path and reloaded the
+  same way
+
+Popularity:
+- How often the medicine's canonical ingredient was extracted from
+  prescriptions (PrescriptionHistory), so common drugs complete first
+
+Lookups:
+- complete() - Top-k medicines for a prefix, most popular first,
+  one entry per medicine (best matching name)
+- Results for short prefixes (<= MEMO_PREFIX_LENGTH characters, which
+  match the most names) are memoized
+
+Used by:
+- api/views.py: autocomplete_medicines() - GET /api/medicines/autocomplete/
+- api/management/commands/build_autocomplete_index.py - Rebuild the file
+- api/management/commands/populate_database.py - Rebuild after imports
+============================================================================
+"""
+
+import bisect
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import marisa_trie
+except ImportError:  # Optional: fall back to a sorted list
+    marisa_trie = None
+
+from .cache_store import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_PATH = str(CACHE_DIR / 'medicine_autocomplete.marisa')
+RECORD_FORMAT = '<II'           # medicine ID, popularity
+KEY_SEPARATOR = '\x01'
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+MEMO_PREFIX_LENGTH = 3
+RELOAD_CHECK_SECONDS = 30
+
+
+def autocomplete_key(text: str) -> str:
+    """Lowercase, single-spaced form used for trie keys and prefixes"""
+    return ' '.join(str(text).lower().split()).replace(KEY_SEPARATOR, ' ')
+
+
+def _medicine_popularity() -> Counter:
+    """Canonical ingredient ID -> number of prescriptions it was extracted from"""
+    from .cache_warmup import _extracted_names
+    from .drug_normalizer import drug_normalizer
+    from .models import PrescriptionHistory
+
+    counts = Counter()
+    rows = PrescriptionHistory.objects.values_list('extracted_data', flat=True).iterator(chunk_size=500)
+    for extracted_data in rows:
+        counts.update(set(drug_normalizer.normalize_many(_extracted_names(extracted_data)).values()))
+    counts.pop('', None)
+    return counts
+
+
+def collect_records() -> List[Tuple[str, Tuple[int, int]]]:
+    """(trie key, (medicine ID, popularity)) for every name of every medicine"""
+    from .drug_normalizer import drug_normalizer
+    from .models import Medicine
+
+    popularity = _medicine_popularity()
+    records = []
+    rows = Medicine.objects.values_list('id', 'name', 'generic_name', 'brand_names').iterator(chunk_size=2000)
+    for medicine_id, name, generic_name, brand_names in rows:
+        score = popularity.get(drug_normalizer.normalize(generic_name or name), 0)
+        names = [name, generic_name]
+        if isinstance(brand_names, list):
+            names.extend(str(brand) for brand in brand_names)
+        elif isinstance(brand_names, str):
+            names.extend(brand_names.split(','))
+        for alias in {autocomplete_key(alias) for alias in names if alias and str(alias).strip()}:
+            records.append((f"{alias}{KEY_SEPARATOR}{name}", (medicine_id, score)))
+    return records
+
+
+class _SortedIndex:
+    """Stand-in for RecordTrie.items(prefix) when marisa-trie is missing"""
+
+    def __init__(self, records: Iterable[Tuple[str, Tuple[int, int]]]):
+        records = sorted(records)
+        self.keys = [key for key, _ in records]
+        self.values = [tuple(value) for _, value in records]
+
+    def save(self, path: str):
+        with open(path, 'w', encoding='utf-8') as handle:
+            json.dump(list(zip(self.keys, self.values)), handle, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path: str) -> '_SortedIndex':
+        with open(path, encoding='utf-8') as handle:
+            return cls(json.load(handle))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def items(self, prefix: str = '') -> List[Tuple[str, Tuple[int, int]]]:
+        start = bisect.bisect_left(self.keys, prefix)
+        end = bisect.bisect_left(self.keys, prefix + '\U0010ffff')
+        return list(zip(self.keys[start:end], self.values[start:end]))
+
+
+class MedicineAutocomplete:
+    """
+    Prefix completion over medicine names.
+
+    Singleton Pattern:
+    - Instance created: medicine_autocomplete = MedicineAutocomplete()
+    - Index loaded from the saved file on first use
+
+    Main Methods:
+    - complete() - Top-k medicines for a prefix
+    - is_ready() - Whether an index file has been loaded
+    - build_index() - Build from the database and save the file
+    - get_stats() - Size and backend
+    """
+
+    def __init__(self, index_path: Optional[str] = None):
+        self.index_path = index_path or os.environ.get('MEDICINE_AUTOCOMPLETE_PATH', DEFAULT_INDEX_PATH)
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._index = None
+        self._mtime = None
+        self._next_check = 0.0
+        self._complete_short = lru_cache(maxsize=4096)(self._complete)
+
+    @property
+    def backend(self) -> str:
+        return 'marisa-trie' if marisa_trie is not None else 'sorted-list'
+
+    @property
+    def file_path(self) -> str:
+        """The saved index for this backend"""
+        return self.index_path if marisa_trie is not None else f"{self.index_path}.json"
+
+    def build_index(self) -> int:
+        """Build the index from the Medicine table and save it; returns the number of keys"""
+        records = collect_records()
+        index = marisa_trie.RecordTrie(RECORD_FORMAT, records) if marisa_trie is not None else _SortedIndex(records)
+        os.makedirs(os.path.dirname(self.file_path) or '.', exist_ok=True)
+        tmp_path = f"{self.file_path}.tmp"
+        index.save(tmp_path)
+        os.replace(tmp_path, self.file_path)
+        self._install(index, self._file_mtime())
+        logger.info(f"Medicine autocomplete index: {len(records)} names ({self.backend})")
+        return len(records)
+
+    def _file_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.file_path).st_mtime
+        except OSError:
+            return None
+
+    def _install(self, index, mtime: Optional[float]):
+        with self._lock:
+            self._index = index
+            self._mtime = mtime
+            self._next_check = time.monotonic() + RELOAD_CHECK_SECONDS
+            self._complete_short.cache_clear()
+
+    def _load(self):
+        """Load the saved index if it is new to this process (one loader at a time)"""
+        with self._load_lock:
+            mtime = self._file_mtime()
+            self._next_check = time.monotonic() + RELOAD_CHECK_SECONDS
+            if mtime is None or mtime == self._mtime:
+                return
+            try:
+                if marisa_trie is not None:
+                    index = marisa_trie.RecordTrie(RECORD_FORMAT)
+                    index.mmap(self.file_path)
+                else:
+                    index = _SortedIndex.load(self.file_path)
+            except (OSError, ValueError) as e:
+                logger.error(f"Could not load medicine autocomplete index {self.file_path}: {e}")
+                return
+            self._install(index, mtime)
+
+    def _get_index(self):
+        # Pick up a file built or rebuilt by another process (build_autocomplete_index)
+        if time.monotonic() >= self._next_check:
+            self._load()
+        return self._index
+
+    def is_ready(self) -> bool:
+        """Whether an index is loaded (False until the file has been built)"""
+        return self._get_index() is not None
+
+    def _complete(self, prefix: str, limit: int) -> Tuple[Dict, ...]:
+        best = {}
+        for key, (medicine_id, popularity) in self._get_index().items(prefix):
+            alias, _, name = key.partition(KEY_SEPARATOR)
+            current = best.get(medicine_id)
+            # Per medicine keep its shortest matching name
+            if current is None or len(alias) < len(current['matched']):
+                best[medicine_id] = {'id': medicine_id, 'name': name, 'matched': alias,
+                                     'popularity': popularity}
+        top = heapq.nsmallest(limit, best.values(),
+                              key=lambda item: (-item['popularity'], len(item['matched']), item['name']))
+        return tuple(top)
+
+    def complete(self, prefix: str, limit: int = DEFAULT_LIMIT) -> List[Dict]:
+        """
+        Top-k medicines whose name, generic name or a brand name starts with
+        the prefix, most popular first (then shortest match)
+        """
+        prefix = autocomplete_key(prefix or '')
+        if not prefix:
+            return []
+        index = self._get_index()
+        if index is None:
+            return []
+        if len(prefix) <= MEMO_PREFIX_LENGTH:
+            results = self._complete_short(prefix, limit)
+        else:
+            results = self._complete(prefix, limit)
+        return [dict(item) for item in results]
+
+    def get_stats(self) -> Dict:
+        info = self._complete_short.cache_info()
+        return {
+            'backend': self.backend,
+            'index_path': self.file_path,
+            'loaded': self._index is not None,
+            'keys': len(self._index) if self._index is not None else 0,
+            'memo_hits': info.hits,
+            'memo_misses': info.misses,
+        }
+
+# Global instance
+medicine_autocomplete = MedicineAutocomplete()
@@ -0,0 +1,199 @@
+"""
+============================================================================
+MEDICINE LOOKUP - Indexed Medicine Resolution by Name
+============================================================================
+
+Medicine rows used to be found with name__iexact / generic_name__iexact
+plus brand_names__icontains, which no index can serve. This file resolves
+a name with indexed equality lookups only:
+
+- Medicine.name_norm / Medicine.generic_norm IN (lookup keys)
+- MedicineAlias.alias_norm IN (lookup keys) - brand names and synonyms
+
+Lookup keys for a raw name (drug_normalizer.py):
+- Exact: the lowercased, single-spaced text ("Tylenol" -> "tylenol")
+- Cleaned: without dosage form and strength ("Advil 200mg" -> "advil")
+- Canonical: the ingredient ID ("Advil 200mg" -> "ibuprofen")
+
+Precedence (MATCH_ORDER), first match wins:
+1. Exact key on name, then generic name
+2. Cleaned key on name, then generic name
+3. Exact, then cleaned key on aliases
+4. Canonical ingredient on name, generic name, aliases
+
+Batches:
+- find_medicines() resolves a whole list of names in one query
+  (LEFT JOIN on the matching aliases only) and returns name -> Medicine
+
+Keeping aliases in sync:
+- rebuild_medicine_aliases() - Every medicine (populate_database)
+- sync_medicine_aliases() - One medicine, on post_save
+  (connect_signals(), called from ApiConfig.ready())
+
+Used by:
+- api/database_views.py: analyze_prescription_with_safety() - One
+  find_medicines() map shared by _get_detailed_medicine_info_from_db()
+  and _analyze_safety_from_db(); get_medicine_info(), get_medical_explanation()
+- api/views.py: get_medical_explanation(), batch_medicine_info()
+- api/management/commands/populate_database.py - rebuild_medicine_aliases()
+============================================================================
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import F, FilteredRelation, Q
+from django.db.models.signals import post_save
+
+from .drug_normalizer import drug_normalizer
+from .models import Medicine, MedicineAlias, medicine_lookup_key
+
+logger = logging.getLogger(__name__)
+
+EXACT, CLEANED, CANONICAL = range(3)
+
+# (column, lookup key) in order of precedence
+MATCH_ORDER = (
+    ('name', EXACT), ('generic', EXACT),
+    ('name', CLEANED), ('generic', CLEANED),
+    ('alias', EXACT), ('alias', CLEANED),
+    ('name', CANONICAL), ('generic', CANONICAL), ('alias', CANONICAL),
+)
+
+
+def lookup_keys(name: str) -> Tuple[str, str, str]:
+    """Normalized forms of a raw name that may equal a stored key: (exact, cleaned, canonical)"""
+    return medicine_lookup_key(name), drug_normalizer.clean(name), drug_normalizer.normalize(name)
+
+
+def medicine_aliases(brand_names, molecular_structure=None) -> List[Tuple[str, str]]:
+    """(alias key, source) for a medicine's brand names and synonyms"""
+    aliases = {}
+    if isinstance(brand_names, str):
+        brand_names = brand_names.split(',')
+    if isinstance(brand_names, list):
+        for brand in brand_names:
+            aliases.setdefault(medicine_lookup_key(brand), 'brand')
+    synonyms = molecular_structure.get('synonyms') if isinstance(molecular_structure, dict) else None
+    if isinstance(synonyms, list):
+        for synonym in synonyms:
+            aliases.setdefault(medicine_lookup_key(synonym), 'synonym')
+    aliases.pop('', None)
+    return list(aliases.items())
+
+
+def find_medicines(names: Iterable[str]) -> Dict[str, Medicine]:
+    """
+    Resolve many names in one query.
+
+    Returns:
+    - {raw name: Medicine} for the names that matched, by the first match
+      in MATCH_ORDER (lowest medicine ID within a step), so "Advil" finds
+      the Advil row before the Ibuprofen row it shares an ingredient with
+    """
+    keys_by_name = {}
+    for name in names:
+        if name and str(name).strip() and name not in keys_by_name:
+            keys_by_name[name] = lookup_keys(name)
+    all_keys = {key for keys in keys_by_name.values() for key in keys if key}
+    if not all_keys:
+        return {}
+
+    # One row per (medicine, matching alias); matched_alias is NULL for
+    # name/generic matches without an alias match
+    rows = (Medicine.objects
+            .annotate(alias_match=FilteredRelation('aliases', condition=Q(aliases__alias_norm__in=all_keys)))
+            .filter(Q(name_norm__in=all_keys) | Q(generic_norm__in=all_keys)
+                    | Q(alias_match__alias_norm__isnull=False))
+            .annotate(matched_alias=F('alias_match__alias_norm'))
+            .order_by('id'))
+
+    by_column = {'name': {}, 'generic': {}, 'alias': {}}
+    for medicine in rows:
+        by_column['name'].setdefault(medicine.name_norm, medicine)
+        by_column['generic'].setdefault(medicine.generic_norm, medicine)
+        if medicine.matched_alias:
+            by_column['alias'].setdefault(medicine.matched_alias, medicine)
+
+    resolved = {}
+    for name, keys in keys_by_name.items():
+        for column, key_index in MATCH_ORDER:
+            medicine = by_column[column].get(keys[key_index]) if keys[key_index] else None
+            if medicine is not None:
+                resolved[name] = medicine
+                break
+    return resolved
+
+
+def find_medicine(name: str) -> Optional[Medicine]:
+    """Medicine for a name, by indexed name/generic then alias lookups"""
+    return find_medicines([name]).get(name)
+
+
+def sync_medicine_aliases(medicine: Medicine) -> int:
+    """Replace one medicine's aliases; aliases owned by others are kept"""
+    aliases = medicine_aliases(medicine.brand_names, medicine.molecular_structure)
+    names = {medicine.name_norm, medicine.generic_norm}
+    with transaction.atomic():
+        MedicineAlias.objects.filter(medicine=medicine).delete()
+        MedicineAlias.objects.bulk_create(
+            [MedicineAlias(alias_norm=alias, medicine=medicine, source=source)
+             for alias, source in aliases if alias not in names],
+            ignore_conflicts=True
+        )
+    return len(aliases)
+
+
+def rebuild_medicine_aliases(batch_size: int = 1000) -> int:
+    """
+    Recompute every medicine's lookup columns and aliases.
+    Needed after bulk imports (bulk_create() skips save() and signals).
+    """
+    created = 0
+    with transaction.atomic():
+        MedicineAlias.objects.all().delete()
+        batch, aliases = [], []
+        rows = (Medicine.objects.order_by('id')
+                .only('id', 'name', 'generic_name', 'brand_names', 'molecular_structure',
+                      'name_norm', 'generic_norm')
+                .iterator(chunk_size=batch_size))
+        for medicine in rows:
+            medicine.name_norm = medicine_lookup_key(medicine.name)
+            medicine.generic_norm = medicine_lookup_key(medicine.generic_name)
+            batch.append(medicine)
+            names = {medicine.name_norm, medicine.generic_norm}
+            aliases.extend(
+                MedicineAlias(alias_norm=alias, medicine_id=medicine.id, source=source)
+                for alias, source in medicine_aliases(medicine.brand_names, medicine.molecular_structure)
+                if alias not in names
+            )
+            if len(batch) >= batch_size:
+                created += _flush(batch, aliases, batch_size)
+                batch, aliases = [], []
+        created += _flush(batch, aliases, batch_size)
+    logger.info(f"Medicine aliases rebuilt: {created} aliases")
+    return created
+
+
+def _flush(medicines: List[Medicine], aliases: Iterable[MedicineAlias], batch_size: int) -> int:
+    if medicines:
+        Medicine.objects.bulk_update(medicines, ['name_norm', 'generic_norm'], batch_size=batch_size)
+    aliases = list(aliases)
+    # Earlier medicines keep a shared alias (ignore_conflicts)
+    MedicineAlias.objects.bulk_create(aliases, batch_size=batch_size, ignore_conflicts=True)
+    return len(aliases)
+
+
+def _on_medicine_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    try:
+        sync_medicine_aliases(instance)
+    except Exception as e:
+        logger.warning(f"Failed to update aliases for medicine {instance.pk}: {e}")
+
+
+def connect_signals():
+    """Keep a medicine's aliases in step with single-row saves"""
+    post_save.connect(_on_medicine_saved, sender=Medicine, dispatch_uid='medicine_lookup_aliases')
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 22:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_medicationreminder_precision_minutes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserInteractionState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('medications', models.JSONField(blank=True, default=dict)),
+                ('checked_pairs', models.JSONField(blank=True, default=list)),
+                ('findings', models.JSONField(blank=True, default=list)),
+                ('data_version', models.CharField(blank=True, default='', max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='interaction_state', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
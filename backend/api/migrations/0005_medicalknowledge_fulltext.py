@@ -0,0 +1,49 @@
+# Full-text index for MedicalKnowledge search (see api/knowledge_search.py)
+
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS api_medicalknowledge_fts "
+    "USING fts5(term, explanation, category, tokenize = 'porter unicode61')",
+    "INSERT INTO api_medicalknowledge_fts (rowid, term, explanation, category) "
+    "SELECT id, term, explanation, COALESCE(category, '') FROM api_medicalknowledge",
+]
+SQLITE_BACKWARD = [
+    "DROP TABLE IF EXISTS api_medicalknowledge_fts",
+]
+
+POSTGRESQL_FORWARD = [
+    "ALTER TABLE api_medicalknowledge ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(term, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(category, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(explanation, '')), 'C')) STORED",
+    "CREATE INDEX api_medicalknowledge_search_gin ON api_medicalknowledge USING GIN (search_vector)",
+]
+POSTGRESQL_BACKWARD = [
+    "DROP INDEX IF EXISTS api_medicalknowledge_search_gin",
+    "ALTER TABLE api_medicalknowledge DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(schema_editor, statements_by_vendor):
+    for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def create_fulltext_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRESQL_FORWARD})
+
+
+def drop_fulltext_index(apps, schema_editor):
+    _run(schema_editor, {'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRESQL_BACKWARD})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_userinteractionstate'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
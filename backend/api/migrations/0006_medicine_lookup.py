@@ -0,0 +1,64 @@
+# Generated by Django 5.2.6 on 2026-10-18 22:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def _key(text):
+    return ' '.join(str(text or '').lower().split())
+
+
+def fill_lookup_columns(apps, schema_editor):
+    """Lookup columns and aliases for existing rows (as medicine_lookup.rebuild_medicine_aliases())"""
+    Medicine = apps.get_model('api', 'Medicine')
+    MedicineAlias = apps.get_model('api', 'MedicineAlias')
+    medicines, aliases = [], []
+    for medicine in Medicine.objects.order_by('id').iterator(chunk_size=1000):
+        medicine.name_norm = _key(medicine.name)
+        medicine.generic_norm = _key(medicine.generic_name)
+        medicines.append(medicine)
+        brands = medicine.brand_names
+        if isinstance(brands, str):
+            brands = brands.split(',')
+        structure = medicine.molecular_structure if isinstance(medicine.molecular_structure, dict) else {}
+        synonyms = structure.get('synonyms')
+        names = [(brand, 'brand') for brand in (brands if isinstance(brands, list) else [])]
+        names += [(synonym, 'synonym') for synonym in (synonyms if isinstance(synonyms, list) else [])]
+        seen = {'', medicine.name_norm, medicine.generic_norm}
+        for alias, source in names:
+            alias = _key(alias)
+            if alias not in seen:
+                seen.add(alias)
+                aliases.append(MedicineAlias(alias_norm=alias, medicine_id=medicine.id, source=source))
+    Medicine.objects.bulk_update(medicines, ['name_norm', 'generic_norm'], batch_size=1000)
+    MedicineAlias.objects.bulk_create(aliases, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_medicalknowledge_fulltext'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medicine',
+            name='generic_norm',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='medicine',
+            name='name_norm',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=255),
+        ),
+        migrations.CreateModel(
+            name='MedicineAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alias_norm', models.CharField(max_length=255, unique=True)),
+                ('source', models.CharField(default='brand', max_length=20)),
+                ('medicine', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='api.medicine')),
+            ],
+        ),
+        migrations.RunPython(fill_lookup_columns, migrations.RunPython.noop),
+    ]
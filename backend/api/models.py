@@ -24,6 +24,9 @@ Models:
 5. MedicalKnowledge - Medical terms & explanations
 6. UserFeedback - User feedback on medications
 7. Notification - User notifications & alerts
+8. UserInteractionState - Checked drug pairs per user
+9. MedicineAlias - Brand names / synonyms -> Medicine (indexed lookups)
+10. TableCount - Cached row counts of the large tables
 ============================================================================
 """
 
@@ -33,6 +36,11 @@ from django.utils import timezone
 import json
 
 
+def medicine_lookup_key(text) -> str:
+    """Lowercase, single-spaced form stored in Medicine.name_norm / generic_norm and MedicineAlias.alias_norm"""
+    return ' '.join(str(text or '').lower().split())
+
+
 # ============================================================================
 # MEDICINE MODEL - Central medicine database
 # ============================================================================
@@ -58,6 +66,9 @@ class Medicine(models.Model):
     - GET /api/medicines/search/?query=aspirin
     - GET /api/medicine/<medicine_id>/
     - GET /api/alternatives/<medicine_id>/
+    
+    Name lookups use name_norm / generic_norm and MedicineAlias
+    (api/medicine_lookup.py), never icontains scans.
     """
     # Primary medicine name (unique identifier)
     name = models.CharField(max_length=255, unique=True)
@@ -65,6 +76,11 @@ class Medicine(models.Model):
     # Generic/scientific name (e.g., Acetaminophen for Tylenol)
     generic_name = models.CharField(max_length=255, blank=True, null=True)
     
+    # Lowercased name / generic name for indexed equality lookups
+    # (set by save(); bulk imports set them explicitly)
+    name_norm = models.CharField(max_length=255, blank=True, default='', db_index=True)
+    generic_norm = models.CharField(max_length=255, blank=True, default='', db_index=True)
+    
     # List of brand names (e.g., ["Tylenol", "Panadol"])
     brand_names = models.JSONField(default=list, blank=True)
     
@@ -105,6 +121,12 @@ class Medicine(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    def save(self, *args, **kwargs):
+        """Keep the lookup columns in step with the names"""
+        self.name_norm = medicine_lookup_key(self.name)
+        self.generic_norm = medicine_lookup_key(self.generic_name)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         """String representation for admin panel and debugging"""
         return self.name
@@ -679,3 +701,124 @@ class Notification(models.Model):
             models.Index(fields=['user', 'is_read']),
             models.Index(fields=['user', 'created_at']),
         ]
+
+
+# ============================================================================
+# USER INTERACTION STATE MODEL - Incremental interaction checking per user
+# ============================================================================
+class UserInteractionState(models.Model):
+    """
+    Remembers which drug pairs of a user's standing medication list have
+    already been checked for interactions, and what was found, so changes
+    only check the pairs they add.
+    
+    Database Table: api_userinteractionstate
+    Relationship: One-to-One with Django User model
+    
+    Standing medications = UserProfile.medications + active MedicationReminders
+    
+    Used by:
+    - api/user_interaction_state.py: UserInteractionTracker (all updates)
+    - api/auth_views.py: update_user_profile() (medications changed)
+    - api/views.py: create/update/delete_reminder() (reminders changed)
+    - api/views.py: analyze_prescription() (new drugs × standing drugs)
+    - api/views.py: get_user_interaction_state()
+    
+    API Endpoints that use this:
+    - GET /api/interactions/user-state/
+    """
+    # Link to Django User model (one state per user)
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='interaction_state')
+    
+    # Standing medications: canonical drug ID -> display name
+    # (e.g., {"metformin": "Metformin 500mg"})
+    medications = models.JSONField(default=dict, blank=True)
+    
+    # Pairs already checked, as "drug_a|drug_b" with drug_a < drug_b
+    checked_pairs = models.JSONField(default=list, blank=True)
+    
+    # Interactions found among standing medications, each with a "pair" field
+    findings = models.JSONField(default=list, blank=True)
+    
+    # Interaction database version the pairs were checked against
+    # (a different version means every pair is checked again)
+    data_version = models.CharField(max_length=64, blank=True, default='')
+    
+    # Timestamps
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        """String representation for admin panel"""
+        return f"{self.user.username}'s interaction state ({len(self.medications)} medications)"
+
+
+# ============================================================================
+# MEDICINE ALIAS MODEL - Indexed brand name / synonym lookups
+# ============================================================================
+class MedicineAlias(models.Model):
+    """
+    Maps each brand name and synonym of a medicine to the medicine, so a
+    name lookup is one indexed equality query instead of a substring scan
+    over the brand_names JSON.
+    
+    Database Table: api_medicinealias
+    Relationship: Many-to-One with Medicine
+    
+    Populated by:
+    - api/medicine_lookup.py: rebuild_medicine_aliases() (all medicines,
+      run by populate_database) and sync_medicine_aliases() (one medicine,
+      on save)
+    
+    Used by:
+    - api/medicine_lookup.py: find_medicine()
+    - api/database_views.py / api/views.py: Medicine name lookups
+    
+    An alias shared by several medicines belongs to the first one imported.
+    """
+    # Lowercased, single-spaced alias (e.g., "tylenol")
+    alias_norm = models.CharField(max_length=255, unique=True)
+    
+    # Medicine the alias names
+    medicine = models.ForeignKey(Medicine, on_delete=models.CASCADE, related_name='aliases')
+    
+    # Where the alias came from: "brand" or "synonym"
+    source = models.CharField(max_length=20, default='brand')
+
+    def __str__(self):
+        """String representation for admin panel"""
+        return f"{self.alias_norm} -> {self.medicine.name}"
+
+
+# ============================================================================
+# TABLE COUNT MODEL - Cached table cardinalities
+# ============================================================================
+class TableCount(models.Model):
+    """
+    Row count of a table, kept up to date on writes, so responses that
+    report database sizes don't run COUNT(*) over the table per request.
+    Only Medicine and MedicalKnowledge have rows (table_counts.STORED_MODELS);
+    frequently inserted tables are counted on read with a short memo.
+    
+    Database Table: api_tablecount
+    
+    Maintained by:
+    - api/table_counts.py: post_save / post_delete signals (+1 / -1)
+    - api/table_counts.py: refresh() (exact recount; run by populate_database
+      after its bulk imports, which send no signals)
+    
+    Used by:
+    - api/table_counts.py: TableCounter.get() (with a short in-process memo)
+    """
+    # Model label (e.g., "api.Medicine")
+    table = models.CharField(max_length=100, unique=True)
+    
+    # Current number of rows
+    count = models.BigIntegerField(default=0)
+    
+    # Last exact recount or increment
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        """String representation for admin panel"""
+        return f"{self.table}: {self.count}"
@@ -15,12 +15,12 @@ What OpenFDA Provides:
 
 Features:
 - Automatic local caching (7-day cache)
-- Rate limiting (respects FDA limits)
-- Error handling and retry logic
-- JSON data storage
+- Rate limiting (token bucket shared by all worker processes, rate_limiter.py)
+- Error handling and retry logic (pooled session, backoff on 429/5xx)
+- Indexed SQLite cache storage
 
 API Information:
-- Base URL: https://api.fda.gov/drug/label.json
+- Base URL: https://api.fda.gov/drug/label.json (override with OPENFDA_BASE_URL)
 - Rate Limits: 240 requests/minute, 120,000 requests/day
 - Documentation: https://open.fda.gov/apis/drug/label/
 
@@ -29,29 +29,62 @@ Used by:
 - api/views.py: get_medicine_info_enhanced() - Detailed medicine info
 
 Calls:
-- External: FDA OpenFDA API (HTTPS)
-- Local: File system (for caching)
+- External: FDA OpenFDA API (HTTPS, via http_transport.py)
+- Local: cache_store.py (SQLite cache shared with RxNorm)
 
 Caching Strategy:
-- Cache location: datasets/cache/openfda/
+- Cache location: backend/datasets/cache/external_api_cache.sqlite3 (cache_store.CACHE_DIR)
+- Cache key: ('openfda', 'label', drug name)
 - Cache duration: 7 days
-- File format: JSON
+- Format: version header + zlib-compressed compact JSON, unused fields pruned
+  (compact_label_record); legacy files converted by migrate_external_cache
 - Reduces API calls by 95%+
 
+Offline Mode:
+- OPENFDA_OFFLINE=1 (or OpenFDAClient(offline=True)) answers get_drug_info()
+  and get_drug_interactions() from the local label snapshot in
+  label_store.py only - zero network calls
+- With RXNORM_OFFLINE=1 as well (RxNorm answers from its cache only) the
+  enhanced checker runs without touching the network
+- Snapshot imported with: python manage.py import_openfda_labels <files>
+
 Error Handling:
 - API unavailable → Returns cached data if available
-- Rate limit hit → Waits and retries
+- Rate limit hit / 5xx → Retried with exponential backoff (honors Retry-After)
+- Local token bucket empty → error_type 'rate_limited' (not negative-cached)
+- FDA degraded (circuit open) → Fails fast; serves any cached copy, else
+  error_type 'circuit_open'
 - Invalid medicine → Returns None
 ============================================================================
 """
 
-import requests
-import json
-import os
 import logging
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
-import time
+import os
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from .http_transport import http_transport, BACKGROUND_RATE_LIMIT_WAIT, DEGRADED_ERROR_TYPES  # Shared pooled HTTP session
+from .rate_limiter import RateLimitExceeded
+from .circuit_breaker import CircuitOpenError
+from .cache_store import cache_store as default_cache_store, DEFAULT_MAX_STALE  # Shared SQLite cache
+from .single_flight import single_flight          # Coalesce concurrent identical fetches
+from .label_store import label_store as default_label_store, process_label  # Local label snapshot
+from .label_store import index_interactions, name_tokens, required_name_tokens, MENTION_INDEX_VERSION
+
+DEFAULT_BASE_URL = "https://api.fda.gov/drug/label.json"
+
+# Record fields that are read anywhere; everything else is dropped before caching
+CACHED_LABEL_FIELDS = frozenset([
+    'drug_name', 'generic_name', 'brand_names', 'drug_interactions', 'warnings',
+    'adverse_reactions', 'contraindications', 'dosage_administration', 'indications',
+    'interaction_tokens', 'interaction_index_version', 'fetched_at', 'source',
+    'error', 'error_type',
+])
+
+
+def compact_label_record(data: Dict) -> Dict:
+    """Keep only the label fields we use"""
+    return {key: value for key, value in data.items() if key in CACHED_LABEL_FIELDS}
+
 
 class OpenFDAClient:
     """
@@ -63,89 +96,122 @@ class OpenFDAClient:
     
     Main Methods:
     - get_drug_info() - Get complete drug information
-    - _get_cached() - Retrieve from cache
-    - _save_cache() - Store in cache
-    - _query_api() - Call FDA API
+    - _load_from_cache() - Retrieve from cache (stale-while-revalidate)
+    - _save_to_cache() - Store in cache
+    - _fetch_drug_info() - Call FDA API
     """
     
-    def __init__(self, cache_dir="datasets/cache/openfda"):
-        self.base_url = "https://api.fda.gov/drug/label.json"
-        self.cache_dir = cache_dir
+    def __init__(self, transport=None, cache_store=None, label_store=None, offline=None,
+                 base_url=None):
+        # OPENFDA_BASE_URL points the client at a stand-in (see api/api_stub.py)
+        self.base_url = base_url or os.environ.get('OPENFDA_BASE_URL', DEFAULT_BASE_URL)
+        self.transport = transport or http_transport
+        self.cache_store = cache_store or default_cache_store
         self.cache_duration = timedelta(days=7)  # Cache for 7 days
+        self.max_stale = DEFAULT_MAX_STALE       # Serve expired data this long while refreshing
         
-        # Create cache directory
-        os.makedirs(self.cache_dir, exist_ok=True)
+        # Negative caching: misses are cached briefly so they don't re-hit the API
+        self.not_found_cache_duration = timedelta(days=1)   # Permanent miss (drug not in FDA data)
+        self.error_cache_duration = timedelta(minutes=5)    # Transient failure (429, 5xx, timeout)
         
-        # Rate limiting
-        self.last_request_time = 0
-        self.min_request_interval = 0.1  # 100ms between requests
-    
-    def _rate_limit(self):
-        """Ensure we don't exceed API rate limits"""
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-        
-        if time_since_last < self.min_request_interval:
-            time.sleep(self.min_request_interval - time_since_last)
-        
-        self.last_request_time = time.time()
-    
-    def _get_cache_path(self, drug_name: str) -> str:
-        """Get cache file path for a drug"""
-        safe_name = drug_name.lower().replace(' ', '_').replace('/', '_')
-        return os.path.join(self.cache_dir, f"{safe_name}.json")
-    
-    def _is_cache_valid(self, cache_path: str) -> bool:
-        """Check if cache file is still valid"""
-        if not os.path.exists(cache_path):
-            return False
-        
-        file_time = datetime.fromtimestamp(os.path.getmtime(cache_path))
-        return datetime.now() - file_time < self.cache_duration
+        # Offline mode: answer only from the imported label snapshot (no network)
+        self.label_store = label_store or default_label_store
+        if offline is None:
+            offline = os.environ.get('OPENFDA_OFFLINE', '').lower() in ('1', 'true', 'yes')
+        self.offline = offline
     
     def _save_to_cache(self, drug_name: str, data: Dict):
         """Save drug data to cache"""
-        cache_path = self._get_cache_path(drug_name)
-        try:
-            with open(cache_path, 'w') as f:
-                json.dump(data, f, indent=2)
+        if self.cache_store.put('openfda', 'label', drug_name, compact_label_record(data), self.cache_duration):
             logging.info(f"Cached data for {drug_name}")
-        except Exception as e:
-            logging.error(f"Error caching data for {drug_name}: {e}")
+    
+    def _save_negative_to_cache(self, drug_name: str, data: Dict):
+        """Cache a not-found (permanent) or error (transient) response"""
+        if data.get('error_type') in ('rate_limited', 'circuit_open'):
+            return  # Local fail-fast decisions, not answers from upstream
+        permanent = data.get('error_type') == 'not_found'
+        ttl = self.not_found_cache_duration if permanent else self.error_cache_duration
+        if self.cache_store.put('openfda', 'label', drug_name, data, ttl, negative=True):
+            logging.info(f"Negative-cached {'not found' if permanent else 'error'} for {drug_name}")
     
     def _load_from_cache(self, drug_name: str) -> Optional[Dict]:
-        """Load drug data from cache"""
-        cache_path = self._get_cache_path(drug_name)
+        """
+        Load drug data from cache.
         
-        if not self._is_cache_valid(cache_path):
+        Expired entries within max_stale are returned right away and
+        refreshed in the background (stale-while-revalidate).
+        """
+        entry = self.cache_store.get_entry('openfda', 'label', drug_name, self.max_stale)
+        if entry is None:
             return None
         
-        try:
-            with open(cache_path, 'r') as f:
-                data = json.load(f)
+        data, is_stale = entry
+        if is_stale:
+            logging.info(f"Serving stale cached data for {drug_name}, refreshing in background")
+            self.cache_store.schedule_refresh(
+                'openfda', 'label', drug_name, lambda: self._fetch_coalesced(drug_name)
+            )
+        else:
             logging.info(f"Loaded cached data for {drug_name}")
-            return data
-        except Exception as e:
-            logging.error(f"Error loading cached data for {drug_name}: {e}")
-            return None
+        return data
     
     def get_drug_info(self, drug_name: str, use_cache: bool = True) -> Dict:
         """
         Get comprehensive drug information from OpenFDA
         """
+        if self.offline:
+            return self._get_offline_drug_info(drug_name)
+        
         # Check cache first
         if use_cache:
             cached_data = self._load_from_cache(drug_name)
             if cached_data:
                 return cached_data
         
-        # Make API request
-        self._rate_limit()
+        return self._fetch_coalesced(drug_name, save_to_cache=use_cache)
+    
+    def _get_offline_drug_info(self, drug_name: str) -> Dict:
+        """
+        Answer from the local label snapshot only (see label_store.py)
+        """
+        drug_info = self.label_store.get_drug_info(drug_name)
+        if drug_info is not None:
+            return drug_info
+        return {'drug_name': drug_name, 'error': 'Drug not found in local FDA label snapshot',
+                'error_type': 'not_found'}
+    
+    def _fetch_coalesced(self, drug_name: str, save_to_cache: bool = True) -> Dict:
+        """
+        Fetch through single-flight so concurrent callers (threads or worker
+        processes) looking up the same drug share one API request
+        """
+        recheck = None
+        if save_to_cache:
+            recheck = lambda: self.cache_store.get('openfda', 'label', drug_name)
+        result = single_flight.do(
+            'openfda', 'label', drug_name,
+            lambda: self._fetch_drug_info(drug_name, save_to_cache=save_to_cache),
+            recheck=recheck
+        )
+        
+        if result.get('error_type') == 'circuit_open' and save_to_cache:
+            # FDA is failing fast: any cached copy, however old, beats an error
+            entry = self.cache_store.get_entry('openfda', 'label', drug_name, max_stale=float('inf'))
+            if entry is not None:
+                logging.info(f"Circuit open, serving old cached data for {drug_name}")
+                return entry[0]
+        return result
+    
+    def _fetch_drug_info(self, drug_name: str, save_to_cache: bool = True) -> Dict:
+        """
+        Fetch drug information from the live API (and cache it)
+        """
+        # Make API request (rate limited by the shared transport)
         
         try:
             # Search for drug by generic name
             url = f"{self.base_url}?search=openfda.generic_name:{drug_name}&limit=1"
-            response = requests.get(url, timeout=10)
+            response = self.transport.get(url)
             
             if response.status_code == 200:
                 data = response.json()
@@ -154,35 +220,40 @@ class OpenFDAClient:
                     drug_info = data['results'][0]
                     
                     # Extract relevant information
-                    processed_data = {
-                        'drug_name': drug_name,
-                        'generic_name': drug_info.get('openfda', {}).get('generic_name', [drug_name]),
-                        'brand_names': drug_info.get('openfda', {}).get('brand_name', []),
-                        'drug_interactions': drug_info.get('drug_interactions', []),
-                        'warnings': drug_info.get('warnings', []),
-                        'adverse_reactions': drug_info.get('adverse_reactions', []),
-                        'contraindications': drug_info.get('contraindications', []),
-                        'dosage_administration': drug_info.get('dosage_and_administration', []),
-                        'indications': drug_info.get('indications_and_usage', []),
-                        'fetched_at': datetime.now().isoformat(),
-                        'source': 'OpenFDA'
-                    }
+                    processed_data = process_label(drug_name, drug_info)
                     
                     # Save to cache
-                    if use_cache:
+                    if save_to_cache:
                         self._save_to_cache(drug_name, processed_data)
                     
                     return processed_data
                 else:
                     logging.warning(f"No results found for {drug_name}")
-                    return {'drug_name': drug_name, 'error': 'Drug not found in FDA database'}
+                    error_data = {'drug_name': drug_name, 'error': 'Drug not found in FDA database',
+                                  'error_type': 'not_found'}
+            elif response.status_code == 404:
+                # OpenFDA answers a search with no matches with 404 NOT_FOUND
+                logging.warning(f"No results found for {drug_name}")
+                error_data = {'drug_name': drug_name, 'error': 'Drug not found in FDA database',
+                              'error_type': 'not_found'}
             else:
                 logging.error(f"FDA API error for {drug_name}: {response.status_code}")
-                return {'drug_name': drug_name, 'error': f'API error: {response.status_code}'}
+                error_data = {'drug_name': drug_name, 'error': f'API error: {response.status_code}',
+                              'error_type': 'transient'}
                 
+        except RateLimitExceeded as e:
+            logging.warning(f"Rate limited fetching FDA data for {drug_name}: {e}")
+            error_data = {'drug_name': drug_name, 'error': str(e), 'error_type': 'rate_limited'}
+        except CircuitOpenError as e:
+            logging.warning(f"Skipped fetching FDA data for {drug_name}: {e}")
+            error_data = {'drug_name': drug_name, 'error': str(e), 'error_type': 'circuit_open'}
         except Exception as e:
             logging.error(f"Error fetching FDA data for {drug_name}: {e}")
-            return {'drug_name': drug_name, 'error': str(e)}
+            error_data = {'drug_name': drug_name, 'error': str(e), 'error_type': 'transient'}
+        
+        if save_to_cache:
+            self._save_negative_to_cache(drug_name, error_data)
+        return error_data
     
     def get_drug_interactions(self, drug_name: str) -> List[Dict]:
         """
@@ -209,51 +280,120 @@ class OpenFDAClient:
         
         return processed_interactions
     
-    def check_interactions_between(self, drug1: str, drug2: str) -> List[Dict]:
+    def _interaction_index(self, drug_info: Dict) -> List[set]:
         """
-        Check for interactions between two specific drugs
+        Per-paragraph word sets for a record's drug_interactions.
+        Uses the index stored with the cache entry; older entries are indexed here.
         """
-        interactions = []
+        tokens = drug_info.get('interaction_tokens')
+        if tokens is None or drug_info.get('interaction_index_version') != MENTION_INDEX_VERSION:
+            tokens = index_interactions(drug_info.get('drug_interactions', []))
+        return [set(words) for words in tokens]
+    
+    def _mentions(self, paragraphs: List, index: List[set], drug_name: str) -> List[Dict]:
+        """
+        Paragraphs of one label that mention drug_name (set lookups only;
+        multi-word names are confirmed with a phrase match)
+        """
+        required = required_name_tokens(drug_name)
+        if not required:
+            return []
+        words = name_tokens(drug_name)
+        phrase = f" {' '.join(words)} " if len(words) > 1 else None
         
-        # Get interactions for both drugs
-        drug1_interactions = self.get_drug_interactions(drug1)
-        drug2_interactions = self.get_drug_interactions(drug2)
+        found = []
+        for paragraph, paragraph_words in zip(paragraphs, index):
+            if not all(word in paragraph_words for word in required):
+                continue
+            if isinstance(paragraph, dict):
+                description = paragraph.get('description', '')
+                severity = paragraph.get('severity', 'UNKNOWN')
+            else:
+                description = paragraph
+                severity = 'UNKNOWN'
+            if phrase and phrase not in f" {' '.join(name_tokens(description))} ":
+                continue
+            found.append({'description': description, 'severity': severity})
+        return found
+    
+    def data_stamp(self, drug_name: str):
+        """
+        Stamp of the label data get_drug_info() answers from for a drug:
+        the cache entry's created_at, or the snapshot file's modification
+        time in offline mode. None if nothing is stored yet.
+        """
+        if self.offline:
+            try:
+                return ('snapshot', os.path.getmtime(self.label_store.db_path))
+            except OSError:
+                return None
+        return self.cache_store.entry_stamp('openfda', 'label', drug_name)
+    
+    def check_interactions_among(self, medicines: List[str],
+                                 failures: Optional[Dict[str, str]] = None,
+                                 pairs: Optional[Iterable[Tuple[str, str]]] = None) -> Dict[Tuple[str, str], List[Dict]]:
+        """
+        Check every pair of medicines, loading each label only once.
         
-        # Look for mentions of the other drug
-        for interaction in drug1_interactions:
-            if drug2.lower() in interaction['description'].lower():
-                interactions.append({
-                    'drug1': drug1,
-                    'drug2': drug2,
-                    'description': interaction['description'],
-                    'severity': interaction['severity'],
-                    'source': 'OpenFDA'
-                })
+        Returns {(drug1, drug2): [interactions]} for each pair (i < j) in
+        the same format as check_interactions_between(); with pairs, only
+        those pairs are checked (and only their drugs' labels loaded). If
+        failures is given, it receives {medicine: error_type} for labels
+        that could not be loaded (rate limited, circuit open, transient).
+        """
+        if pairs is None:
+            pairs = [(drug1, drug2) for i, drug1 in enumerate(medicines)
+                     for j, drug2 in enumerate(medicines) if i < j]
+        else:
+            pairs = list(pairs)
+            medicines = list(dict.fromkeys(drug for pair in pairs for drug in pair))
         
-        for interaction in drug2_interactions:
-            if drug1.lower() in interaction['description'].lower():
-                interactions.append({
-                    'drug1': drug2,
-                    'drug2': drug1,
-                    'description': interaction['description'],
-                    'severity': interaction['severity'],
-                    'source': 'OpenFDA'
-                })
+        labels = {}
+        for medicine in medicines:
+            if medicine not in labels:
+                drug_info = self.get_drug_info(medicine)
+                if failures is not None and drug_info.get('error_type') in DEGRADED_ERROR_TYPES:
+                    failures[medicine] = drug_info['error_type']
+                paragraphs = drug_info.get('drug_interactions', [])
+                labels[medicine] = (paragraphs, self._interaction_index(drug_info))
         
-        return interactions
+        results = {}
+        for drug1, drug2 in pairs:
+            interactions = []
+            # Look for mentions of the other drug in each label
+            for source_drug, other_drug in ((drug1, drug2), (drug2, drug1)):
+                paragraphs, index = labels[source_drug]
+                for mention in self._mentions(paragraphs, index, other_drug):
+                    interactions.append({
+                        'drug1': source_drug,
+                        'drug2': other_drug,
+                        'description': mention['description'],
+                        'severity': mention['severity'],
+                        'source': 'OpenFDA'
+                    })
+            results[(drug1, drug2)] = interactions
+        return results
+    
+    def check_interactions_between(self, drug1: str, drug2: str) -> List[Dict]:
+        """
+        Check for interactions between two specific drugs
+        """
+        return self.check_interactions_among([drug1, drug2]).get((drug1, drug2), [])
     
     def bulk_download_drugs(self, drug_names: List[str]) -> Dict[str, Dict]:
         """
         Download and cache data for multiple drugs
+        
+        Requests are paced by the shared rate limiter (waiting for tokens
+        like other background work); for large lists use the
+        prefetch_drug_data management command instead.
         """
         results = {}
         
-        for i, drug_name in enumerate(drug_names):
-            logging.info(f"Downloading {drug_name} ({i+1}/{len(drug_names)})")
-            results[drug_name] = self.get_drug_info(drug_name)
-            
-            # Small delay to be respectful to the API
-            time.sleep(0.2)
+        with self.transport.rate_limit_budget(BACKGROUND_RATE_LIMIT_WAIT):
+            for i, drug_name in enumerate(drug_names):
+                logging.info(f"Downloading {drug_name} ({i+1}/{len(drug_names)})")
+                results[drug_name] = self.get_drug_info(drug_name)
         
         return results
     
@@ -261,35 +401,20 @@ class OpenFDAClient:
         """
         Get statistics about cached data
         """
-        cache_files = [f for f in os.listdir(self.cache_dir) if f.endswith('.json')]
-        
-        total_files = len(cache_files)
-        valid_files = 0
-        expired_files = 0
-        
-        for file in cache_files:
-            file_path = os.path.join(self.cache_dir, file)
-            if self._is_cache_valid(file_path):
-                valid_files += 1
-            else:
-                expired_files += 1
-        
-        return {
-            'total_cached_drugs': total_files,
-            'valid_cache_files': valid_files,
-            'expired_cache_files': expired_files,
-            'cache_directory': self.cache_dir
-        }
+        stats = self.cache_store.get_stats('openfda')
+        stats['total_cached_drugs'] = stats['total_entries']
+        stats['offline_mode'] = self.offline
+        if self.offline:
+            stats['local_labels'] = self.label_store.get_stats()
+        return stats
     
     def clear_cache(self):
         """
         Clear all cached data
         """
         try:
-            for file in os.listdir(self.cache_dir):
-                if file.endswith('.json'):
-                    os.remove(os.path.join(self.cache_dir, file))
-            logging.info("Cache cleared successfully")
+            removed = self.cache_store.clear('openfda')
+            logging.info(f"Cache cleared successfully ({removed} entries)")
         except Exception as e:
             logging.error(f"Error clearing cache: {e}")
 
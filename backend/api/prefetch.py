@@ -0,0 +1,244 @@
+"""
+============================================================================
+PREFETCH - Concurrent, Resumable Bulk Download of Drug Reference Data
+============================================================================
+
+This file warms the OpenFDA/RxNorm cache for many medicines at once. It
+replaces the old one-drug-at-a-time loop with a fixed sleep that ran
+inside an HTTP request.
+
+Features:
+- Bounded worker pool; pacing comes from the shared token-bucket rate
+  limiter in the HTTP transport (workers wait up to RATE_LIMIT_WAIT for a
+  token, no fixed sleeps)
+- Checkpoint file of completed medicines (with completion times),
+  written atomically as work progresses, so an interrupted run resumes
+  where it stopped; entries older than CHECKPOINT_MAX_AGE are fetched
+  again, so a periodic run refreshes the cache instead of skipping
+- "Not found" counts as done; rate-limited, circuit-open and transient
+  failures of either API (OpenFDA label or RxNorm search/details) are
+  left out of the checkpoint and retried next run
+- Progress callback and a throughput summary
+- enqueue_prefetch() runs a job on a background thread for the API
+
+Used by:
+- api/management/commands/prefetch_drug_data.py - Command line runs
+- api/views.py: bulk_download_medicine_data() - Enqueues a background job
+============================================================================
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .cache_store import CACHE_DIR
+from .http_transport import DEGRADED_ERROR_TYPES
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_PATH = str(CACHE_DIR / 'prefetch_checkpoint.json')
+
+# Completed medicines are skipped for this long (resuming an interrupted
+# run); after that the next run fetches them again
+CHECKPOINT_MAX_AGE = timedelta(hours=24)
+
+# Error types worth retrying on the next run
+RETRYABLE_ERROR_TYPES = DEGRADED_ERROR_TYPES
+
+# Workers wait this long for a rate-limit token (request threads never wait)
+RATE_LIMIT_WAIT = 30
+
+
+def load_checkpoint(path: str, max_age: timedelta = CHECKPOINT_MAX_AGE) -> Dict[str, float]:
+    """Names completed by earlier runs within max_age -> completion time (epoch seconds)"""
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            completed = json.load(f).get('completed', {})
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable prefetch checkpoint {path}: {e}")
+        return {}
+    if not isinstance(completed, dict):
+        return {}   # Old format without completion times: start over
+    oldest = time.time() - max_age.total_seconds()
+    return {name: done_at for name, done_at in completed.items()
+            if isinstance(done_at, (int, float)) and done_at >= oldest}
+
+
+def save_checkpoint(path: str, completed: Dict[str, float]):
+    """Write the checkpoint atomically (temp file + rename)"""
+    if not path:
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'completed': dict(sorted(completed.items())), 'updated_at': datetime.now().isoformat()}, f)
+    os.replace(tmp_path, path)
+
+
+def retryable_error_type(result: Dict) -> Optional[str]:
+    """
+    error_type of the first upstream failure (OpenFDA or RxNorm) in a
+    get_medicine_info() result that is worth retrying, else None.
+    "Not found" is a cached answer, not a failure.
+    """
+    rxnorm_data = result.get('rxnorm_data') or {}
+    parts = [result.get('openfda_data'), rxnorm_data,
+             rxnorm_data.get('drug_info'), rxnorm_data.get('interactions')]
+    for part in parts:
+        if isinstance(part, dict) and part.get('error_type') in RETRYABLE_ERROR_TYPES:
+            return part['error_type']
+    return None
+
+
+def _is_retryable(result: Dict) -> bool:
+    """Decide whether a medicine should be fetched again next run"""
+    return bool(result.get('error')) or retryable_error_type(result) is not None
+
+
+def prefetch_medicines(medicine_names: Iterable[str], workers: int = 4,
+                       checkpoint_path: Optional[str] = DEFAULT_CHECKPOINT_PATH,
+                       checkpoint_every: int = 25,
+                       checkpoint_max_age: timedelta = CHECKPOINT_MAX_AGE,
+                       progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    Fetch and cache OpenFDA + RxNorm data for every medicine.
+
+    Args:
+        medicine_names: Names to prefetch (duplicates/blank names ignored)
+        workers: Size of the worker pool
+        checkpoint_path: Where to record completed names (None = no resume)
+        checkpoint_every: Write the checkpoint after this many completions
+        checkpoint_max_age: Skip names completed at most this long ago
+        progress: Called with a running summary after each medicine
+
+    Returns:
+        Summary dict (counts, elapsed seconds, medicines per second, failures)
+    """
+    # Imported here: the checker pulls in the HTTP clients and cache store
+    from .enhanced_drug_interactions import enhanced_interaction_checker
+    from .http_transport import http_transport
+
+    names = list(dict.fromkeys(n.strip() for n in medicine_names if n and n.strip()))
+    completed = load_checkpoint(checkpoint_path, checkpoint_max_age)
+    pending = [n for n in names if n not in completed]
+
+    summary = {
+        'total': len(names),
+        'skipped': len(names) - len(pending),
+        'fetched': 0,
+        'failed': 0,
+        'failures': [],
+    }
+    started = time.monotonic()
+    since_checkpoint = 0
+
+    def fetch(name):
+        with http_transport.rate_limit_budget(RATE_LIMIT_WAIT):
+            return name, enhanced_interaction_checker.get_medicine_info(name)
+
+    executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='prefetch')
+    try:
+        futures = [executor.submit(fetch, name) for name in pending]
+        for future in as_completed(futures):
+            name, result = future.result()
+            if _is_retryable(result):
+                summary['failed'] += 1
+                summary['failures'].append(name)
+            else:
+                summary['fetched'] += 1
+                completed[name] = time.time()
+                since_checkpoint += 1
+                if since_checkpoint >= checkpoint_every:
+                    save_checkpoint(checkpoint_path, completed)
+                    since_checkpoint = 0
+
+            if progress:
+                elapsed = time.monotonic() - started
+                done = summary['fetched'] + summary['failed']
+                progress({
+                    'done': done,
+                    'pending': len(pending),
+                    'fetched': summary['fetched'],
+                    'failed': summary['failed'],
+                    'rate': done / elapsed if elapsed else 0.0,
+                })
+    finally:
+        # Also runs on Ctrl+C: drop queued work and keep what finished
+        executor.shutdown(wait=False, cancel_futures=True)
+        save_checkpoint(checkpoint_path, completed)
+
+    elapsed = time.monotonic() - started
+    summary['elapsed_seconds'] = round(elapsed, 2)
+    summary['medicines_per_second'] = round(summary['fetched'] / elapsed, 2) if elapsed else 0.0
+    return summary
+
+
+# ============================================================================
+# BACKGROUND JOBS - Used by the bulk download API endpoint
+# ============================================================================
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+_job_queue = queue.Queue()
+_worker_thread = None
+
+
+def _run_jobs():
+    while True:
+        job_id, names, workers = _job_queue.get()
+        with _jobs_lock:
+            _jobs[job_id]['status'] = 'running'
+            _jobs[job_id]['started_at'] = datetime.now().isoformat()
+        try:
+            # API jobs don't share the command line checkpoint
+            summary = prefetch_medicines(names, workers=workers, checkpoint_path=None)
+            with _jobs_lock:
+                _jobs[job_id].update({'status': 'completed', 'summary': summary})
+        except Exception as e:
+            logger.error(f"Prefetch job {job_id} failed: {e}")
+            with _jobs_lock:
+                _jobs[job_id].update({'status': 'failed', 'error': str(e)})
+        finally:
+            with _jobs_lock:
+                _jobs[job_id]['finished_at'] = datetime.now().isoformat()
+            _job_queue.task_done()
+
+
+def enqueue_prefetch(medicine_names: List[str], workers: int = 4) -> str:
+    """
+    Queue a prefetch job on the background worker thread; returns a job id
+    """
+    global _worker_thread
+    job_id = uuid.uuid4().hex
+    with _jobs_lock:
+        _jobs[job_id] = {
+            'job_id': job_id,
+            'status': 'queued',
+            'medicines': len(medicine_names),
+            'queued_at': datetime.now().isoformat(),
+        }
+        if _worker_thread is None or not _worker_thread.is_alive():
+            _worker_thread = threading.Thread(target=_run_jobs, name='prefetch-jobs', daemon=True)
+            _worker_thread.start()
+    _job_queue.put((job_id, list(medicine_names), workers))
+    return job_id
+
+
+def get_prefetch_job(job_id: str) -> Optional[Dict]:
+    """
+    Status of a queued/running/finished job (this process only)
+    """
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
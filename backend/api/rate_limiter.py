@@ -0,0 +1,191 @@
+"""
+============================================================================
+RATE LIMITER - Cross-Process Token Bucket for External Drug APIs
+============================================================================
+
+This file enforces the upstream request limits (e.g. OpenFDA's 240
+requests/minute) for ALL threads and worker processes on a node, instead
+of each client instance sleeping on its own last_request_time.
+
+How it works:
+- One token bucket per host, stored as a row in a small SQLite database
+  (tokens, updated_at); every worker process sees the same bucket
+- Acquiring refills the bucket from the elapsed time, then reserves one
+  token inside a BEGIN IMMEDIATE transaction (atomic across processes)
+- The bucket may go negative: a caller that reserves a future token is
+  told exactly how long to wait, so waiters are served in arrival order
+  without polling
+- If the wait would exceed the caller's budget nothing is reserved and
+  RateLimitExceeded is raised, so a request thread never sleeps for long
+
+Waiting:
+- acquire() - reserve and sleep until the token is due (at most max_wait;
+  max_wait=0 never sleeps)
+- reserve() - non-blocking; returns how long the caller must wait
+
+Used by:
+- api/http_transport.py - Every outgoing request to a rate-limited host
+
+Location:
+- rate_limits.sqlite3 in cache_store.CACHE_DIR (backend/datasets/cache),
+  so servers and scripts share one bucket whatever their working directory
+============================================================================
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict
+
+from .cache_store import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = str(CACHE_DIR / 'rate_limits.sqlite3')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_buckets (
+    host        TEXT    PRIMARY KEY,
+    tokens      REAL    NOT NULL,
+    updated_at  REAL    NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a token is not available within the caller's wait budget"""
+
+    def __init__(self, host: str, retry_after: float):
+        super().__init__(f"Rate limit for {host} exceeded, retry after {retry_after:.2f}s")
+        self.host = host
+        self.retry_after = retry_after
+
+
+class TokenBucketLimiter:
+    """
+    Token bucket rate limiter shared across threads and processes.
+
+    Singleton Pattern:
+    - Instance created: rate_limiter = TokenBucketLimiter()
+    - Used by the shared HTTP transport
+
+    Main Methods:
+    - reserve() - Reserve a token and return the wait in seconds
+    - acquire() - Reserve and sleep (bounded) until the token is due
+    - get_stats() - Bucket levels and per-process counters
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._local = threading.local()
+
+        self._stats_lock = threading.Lock()
+        self._stats = {}
+
+        try:
+            self._connect().executescript(SCHEMA)
+        except sqlite3.Error as e:
+            logger.error(f"Error initializing rate limiter at {self.db_path}: {e}")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection, reconnecting after a fork"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _count(self, host: str, name: str, amount: float = 1):
+        with self._stats_lock:
+            stats = self._stats.setdefault(host, {'acquired': 0, 'rejected': 0, 'waited_seconds': 0.0})
+            stats[name] += amount
+
+    def reserve(self, host: str, rate: float, burst: int, max_wait: float = float('inf')) -> float:
+        """
+        Reserve one token for `host` and return how long to wait before using it.
+
+        Args:
+            rate: Tokens added per second
+            burst: Bucket capacity (requests allowed back to back)
+            max_wait: Longest acceptable wait; beyond it nothing is reserved
+
+        Raises:
+            RateLimitExceeded: if the token would not be due within max_wait
+        """
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                now = time.time()
+                row = conn.execute(
+                    'SELECT tokens, updated_at FROM rate_buckets WHERE host = ?', (host,)
+                ).fetchone()
+                if row is None:
+                    tokens = float(burst)
+                else:
+                    tokens = min(float(burst), row[0] + max(0.0, now - row[1]) * rate)
+
+                tokens -= 1
+                wait = -tokens / rate if tokens < 0 else 0.0
+                if wait > max_wait:
+                    conn.execute('ROLLBACK')
+                    self._count(host, 'rejected')
+                    raise RateLimitExceeded(host, wait)
+
+                conn.execute(
+                    'INSERT INTO rate_buckets (host, tokens, updated_at) VALUES (?, ?, ?) '
+                    'ON CONFLICT (host) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at',
+                    (host, tokens, now)
+                )
+                conn.execute('COMMIT')
+            except sqlite3.Error:
+                conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error as e:
+            # Fail open: a broken limiter database must not take the API down
+            logger.error(f"Rate limiter error for {host}, allowing request: {e}")
+            return 0.0
+
+        self._count(host, 'acquired')
+        if wait:
+            self._count(host, 'waited_seconds', wait)
+        return wait
+
+    def acquire(self, host: str, rate: float, burst: int, max_wait: float = 0.0):
+        """
+        Wait (at most max_wait seconds) until a token for `host` is available.
+        The default never sleeps: no token now raises RateLimitExceeded.
+        """
+        wait = self.reserve(host, rate, burst, max_wait)
+        if wait > 0:
+            time.sleep(wait)
+
+    def get_stats(self) -> Dict:
+        """
+        Get current bucket levels (shared) and counters (this process)
+        """
+        buckets = {}
+        try:
+            for host, tokens, updated_at in self._connect().execute(
+                'SELECT host, tokens, updated_at FROM rate_buckets'
+            ):
+                buckets[host] = {'tokens': round(tokens, 2), 'updated_at': updated_at}
+        except sqlite3.Error as e:
+            logger.error(f"Error reading rate limiter stats: {e}")
+
+        with self._stats_lock:
+            counters = {host: dict(stats) for host, stats in self._stats.items()}
+
+        return {'buckets': buckets, 'counters': counters}
+
+# Global instance
+rate_limiter = TokenBucketLimiter()
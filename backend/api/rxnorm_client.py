@@ -3,79 +3,152 @@ RxNorm Client for Drug Name Standardization
 Provides access to NLM's RxNorm database for drug name mapping
 """
 
-import requests
-import json
-import os
 import logging
+import os
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Tuple
-import time
+from .http_transport import http_transport    # Shared pooled HTTP session
+from .rate_limiter import RateLimitExceeded
+from .circuit_breaker import CircuitOpenError
+from .cache_store import cache_store as default_cache_store, DEFAULT_MAX_STALE  # Shared SQLite cache
+from .single_flight import single_flight          # Coalesce concurrent identical fetches
+
+DEFAULT_BASE_URL = "https://rxnav.nlm.nih.gov/REST"
+
+# Concept fields read by standardize_drug_name() / get_all_drug_names()
+CACHED_CONCEPT_FIELDS = ('rxcui', 'name', 'synonym', 'tty')
+
+
+def compact_rxnorm_record(endpoint: str, data: Dict) -> Dict:
+    """
+    Keep only the parts of an RxNorm response we use.
+    Search results are reduced to concept groups with the concept fields
+    above; other endpoints are small and kept as returned.
+    """
+    results = data.get('results')
+    if endpoint != 'search' or not isinstance(results, dict):
+        return data
+    
+    drug_group = results.get('drugGroup', {})
+    concept_groups = []
+    for concept_group in drug_group.get('conceptGroup', []):
+        concepts = concept_group.get('conceptProperties', [])
+        if concepts:
+            concept_groups.append({
+                'tty': concept_group.get('tty'),
+                'conceptProperties': [
+                    {field: concept[field] for field in CACHED_CONCEPT_FIELDS if field in concept}
+                    for concept in concepts
+                ]
+            })
+    
+    compacted = dict(data)
+    compacted['results'] = {'drugGroup': {'name': drug_group.get('name'), 'conceptGroup': concept_groups}}
+    return compacted
+
+
+def _has_concepts(data: Dict) -> bool:
+    """Whether a drugs.json response names at least one concept"""
+    drug_group = data.get('drugGroup') if isinstance(data, dict) else None
+    if not isinstance(drug_group, dict):
+        return False
+    return any(group.get('conceptProperties') for group in drug_group.get('conceptGroup') or [])
+
 
 class RxNormClient:
     """
     Client for accessing RxNorm drug database
     """
     
-    def __init__(self, cache_dir="datasets/cache/rxnorm"):
-        self.base_url = "https://rxnav.nlm.nih.gov/REST"
-        self.cache_dir = cache_dir
+    def __init__(self, transport=None, cache_store=None, offline=None, base_url=None):
+        # RXNORM_BASE_URL points the client at a stand-in (see api/api_stub.py)
+        self.base_url = base_url or os.environ.get('RXNORM_BASE_URL', DEFAULT_BASE_URL)
+        self.transport = transport or http_transport
+        self.cache_store = cache_store or default_cache_store
         self.cache_duration = timedelta(days=30)  # Cache for 30 days (RxNorm changes less frequently)
+        self.max_stale = DEFAULT_MAX_STALE        # Serve expired data this long while refreshing
         
-        # Create cache directory
-        os.makedirs(self.cache_dir, exist_ok=True)
+        # Negative caching: misses are cached briefly so they don't re-hit the API
+        self.not_found_cache_duration = timedelta(days=1)   # Permanent miss (unknown RxCUI / name)
+        self.error_cache_duration = timedelta(minutes=5)    # Transient failure (429, 5xx, timeout)
         
-        # Rate limiting
-        self.last_request_time = 0
-        self.min_request_interval = 0.1  # 100ms between requests
-    
-    def _rate_limit(self):
-        """Ensure we don't exceed API rate limits"""
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-        
-        if time_since_last < self.min_request_interval:
-            time.sleep(self.min_request_interval - time_since_last)
-        
-        self.last_request_time = time.time()
-    
-    def _get_cache_path(self, query: str, endpoint: str) -> str:
-        """Get cache file path for a query"""
-        safe_query = query.lower().replace(' ', '_').replace('/', '_').replace('?', '').replace('&', '')
-        return os.path.join(self.cache_dir, f"{endpoint}_{safe_query}.json")
-    
-    def _is_cache_valid(self, cache_path: str) -> bool:
-        """Check if cache file is still valid"""
-        if not os.path.exists(cache_path):
-            return False
+        # Offline mode: answer from the cache only (any age), never the network
+        if offline is None:
+            offline = os.environ.get('RXNORM_OFFLINE', '').lower() in ('1', 'true', 'yes')
+        self.offline = offline
         
-        file_time = datetime.fromtimestamp(os.path.getmtime(cache_path))
-        return datetime.now() - file_time < self.cache_duration
+        # Live fetchers per cache endpoint (used for background refresh)
+        self._fetchers = {
+            'search': self._fetch_search,
+            'drug_info': self._fetch_drug_info,
+            'interactions': self._fetch_interactions,
+        }
     
     def _save_to_cache(self, query: str, endpoint: str, data: Dict):
         """Save data to cache"""
-        cache_path = self._get_cache_path(query, endpoint)
-        try:
-            with open(cache_path, 'w') as f:
-                json.dump(data, f, indent=2)
+        if self.cache_store.put('rxnorm', endpoint, query, compact_rxnorm_record(endpoint, data), self.cache_duration):
             logging.info(f"Cached RxNorm data for {endpoint}: {query}")
-        except Exception as e:
-            logging.error(f"Error caching RxNorm data: {e}")
+    
+    def _save_negative_to_cache(self, query: str, endpoint: str, data: Dict):
+        """Cache a not-found (permanent) or error (transient) response"""
+        if data.get('error_type') in ('rate_limited', 'circuit_open', 'offline'):
+            return  # Local fail-fast decisions, not answers from upstream
+        permanent = data.get('error_type') == 'not_found'
+        ttl = self.not_found_cache_duration if permanent else self.error_cache_duration
+        if self.cache_store.put('rxnorm', endpoint, query, data, ttl, negative=True):
+            logging.info(f"Negative-cached RxNorm {'not found' if permanent else 'error'} for {endpoint}: {query}")
     
     def _load_from_cache(self, query: str, endpoint: str) -> Optional[Dict]:
-        """Load data from cache"""
-        cache_path = self._get_cache_path(query, endpoint)
+        """
+        Load data from cache.
         
-        if not self._is_cache_valid(cache_path):
+        Expired entries within max_stale are returned right away and
+        refreshed in the background (stale-while-revalidate).
+        """
+        entry = self.cache_store.get_entry('rxnorm', endpoint, query, self.max_stale)
+        if entry is None:
             return None
         
-        try:
-            with open(cache_path, 'r') as f:
-                data = json.load(f)
+        data, is_stale = entry
+        if is_stale:
+            logging.info(f"Serving stale RxNorm data for {endpoint}: {query}, refreshing in background")
+            self.cache_store.schedule_refresh(
+                'rxnorm', endpoint, query, lambda: self._fetch_coalesced(query, endpoint)
+            )
+        else:
             logging.info(f"Loaded cached RxNorm data for {endpoint}: {query}")
-            return data
-        except Exception as e:
-            logging.error(f"Error loading cached RxNorm data: {e}")
-            return None
+        return data
+    
+    def _fetch_coalesced(self, query: str, endpoint: str, save_to_cache: bool = True) -> Dict:
+        """
+        Fetch through single-flight so concurrent callers (threads or worker
+        processes) making the same query share one API request.
+        In offline mode (RXNORM_OFFLINE=1) only the cache is consulted.
+        """
+        if self.offline:
+            entry = self.cache_store.get_entry('rxnorm', endpoint, query, max_stale=float('inf'))
+            if entry is not None:
+                return entry[0]
+            return {'query': query, 'error': 'Not cached and RxNorm offline mode is on',
+                    'error_type': 'offline'}
+        
+        fetch = self._fetchers[endpoint]
+        recheck = None
+        if save_to_cache:
+            recheck = lambda: self.cache_store.get('rxnorm', endpoint, query)
+        result = single_flight.do(
+            'rxnorm', endpoint, query,
+            lambda: fetch(query, save_to_cache=save_to_cache),
+            recheck=recheck
+        )
+        
+        if result.get('error_type') == 'circuit_open' and save_to_cache:
+            # RxNav is failing fast: any cached copy, however old, beats an error
+            entry = self.cache_store.get_entry('rxnorm', endpoint, query, max_stale=float('inf'))
+            if entry is not None:
+                logging.info(f"Circuit open, serving old cached RxNorm data for {endpoint}: {query}")
+                return entry[0]
+        return result
     
     def search_drugs(self, drug_name: str, use_cache: bool = True) -> Dict:
         """
@@ -87,16 +160,25 @@ class RxNormClient:
             if cached_data:
                 return cached_data
         
-        # Make API request
-        self._rate_limit()
+        return self._fetch_coalesced(drug_name, "search", save_to_cache=use_cache)
+    
+    def _fetch_search(self, drug_name: str, save_to_cache: bool = True) -> Dict:
+        """
+        Fetch from the live API (and cache the result)
+        """
+        # Make API request (rate limited by the shared transport)
         
         try:
             url = f"{self.base_url}/drugs.json?name={drug_name}"
-            response = requests.get(url, timeout=10)
+            response = self.transport.get(url)
+            data = response.json() if response.status_code == 200 else None
             
-            if response.status_code == 200:
-                data = response.json()
-                
+            if data is not None and not _has_concepts(data):
+                # RxNav answers unknown names with 200 and an empty drugGroup
+                logging.info(f"RxNorm has no concepts for {drug_name}")
+                error_data = {'query': drug_name, 'error': 'No RxNorm concepts found',
+                              'error_type': 'not_found'}
+            elif data is not None:
                 processed_data = {
                     'query': drug_name,
                     'results': data,
@@ -105,17 +187,28 @@ class RxNormClient:
                 }
                 
                 # Save to cache
-                if use_cache:
+                if save_to_cache:
                     self._save_to_cache(drug_name, "search", processed_data)
                 
                 return processed_data
             else:
                 logging.error(f"RxNorm API error for {drug_name}: {response.status_code}")
-                return {'query': drug_name, 'error': f'API error: {response.status_code}'}
+                error_data = {'query': drug_name, 'error': f'API error: {response.status_code}',
+                              'error_type': 'not_found' if response.status_code == 404 else 'transient'}
                 
+        except RateLimitExceeded as e:
+            logging.warning(f"Rate limited fetching RxNorm data for {drug_name}: {e}")
+            error_data = {'query': drug_name, 'error': str(e), 'error_type': 'rate_limited'}
+        except CircuitOpenError as e:
+            logging.warning(f"Skipped fetching RxNorm data for {drug_name}: {e}")
+            error_data = {'query': drug_name, 'error': str(e), 'error_type': 'circuit_open'}
         except Exception as e:
             logging.error(f"Error fetching RxNorm data for {drug_name}: {e}")
-            return {'query': drug_name, 'error': str(e)}
+            error_data = {'query': drug_name, 'error': str(e), 'error_type': 'transient'}
+        
+        if save_to_cache:
+            self._save_negative_to_cache(drug_name, "search", error_data)
+        return error_data
     
     def get_drug_info(self, rxcui: str, use_cache: bool = True) -> Dict:
         """
@@ -127,12 +220,17 @@ class RxNormClient:
             if cached_data:
                 return cached_data
         
-        # Make API request
-        self._rate_limit()
+        return self._fetch_coalesced(rxcui, "drug_info", save_to_cache=use_cache)
+    
+    def _fetch_drug_info(self, rxcui: str, save_to_cache: bool = True) -> Dict:
+        """
+        Fetch from the live API (and cache the result)
+        """
+        # Make API request (rate limited by the shared transport)
         
         try:
             url = f"{self.base_url}/rxcui/{rxcui}/properties.json"
-            response = requests.get(url, timeout=10)
+            response = self.transport.get(url)
             
             if response.status_code == 200:
                 data = response.json()
@@ -145,17 +243,28 @@ class RxNormClient:
                 }
                 
                 # Save to cache
-                if use_cache:
+                if save_to_cache:
                     self._save_to_cache(rxcui, "drug_info", processed_data)
                 
                 return processed_data
             else:
                 logging.error(f"RxNorm API error for RxCUI {rxcui}: {response.status_code}")
-                return {'rxcui': rxcui, 'error': f'API error: {response.status_code}'}
+                error_data = {'rxcui': rxcui, 'error': f'API error: {response.status_code}',
+                              'error_type': 'not_found' if response.status_code == 404 else 'transient'}
                 
+        except RateLimitExceeded as e:
+            logging.warning(f"Rate limited fetching RxNorm drug info for {rxcui}: {e}")
+            error_data = {'rxcui': rxcui, 'error': str(e), 'error_type': 'rate_limited'}
+        except CircuitOpenError as e:
+            logging.warning(f"Skipped fetching RxNorm drug info for {rxcui}: {e}")
+            error_data = {'rxcui': rxcui, 'error': str(e), 'error_type': 'circuit_open'}
         except Exception as e:
             logging.error(f"Error fetching RxNorm drug info for {rxcui}: {e}")
-            return {'rxcui': rxcui, 'error': str(e)}
+            error_data = {'rxcui': rxcui, 'error': str(e), 'error_type': 'transient'}
+        
+        if save_to_cache:
+            self._save_negative_to_cache(rxcui, "drug_info", error_data)
+        return error_data
     
     def get_drug_interactions(self, rxcui: str, use_cache: bool = True) -> Dict:
         """
@@ -167,12 +276,17 @@ class RxNormClient:
             if cached_data:
                 return cached_data
         
-        # Make API request
-        self._rate_limit()
+        return self._fetch_coalesced(rxcui, "interactions", save_to_cache=use_cache)
+    
+    def _fetch_interactions(self, rxcui: str, save_to_cache: bool = True) -> Dict:
+        """
+        Fetch from the live API (and cache the result)
+        """
+        # Make API request (rate limited by the shared transport)
         
         try:
             url = f"{self.base_url}/rxcui/{rxcui}/interactions.json"
-            response = requests.get(url, timeout=10)
+            response = self.transport.get(url)
             
             if response.status_code == 200:
                 data = response.json()
@@ -185,28 +299,60 @@ class RxNormClient:
                 }
                 
                 # Save to cache
-                if use_cache:
+                if save_to_cache:
                     self._save_to_cache(rxcui, "interactions", processed_data)
                 
                 return processed_data
             else:
                 logging.error(f"RxNorm interactions API error for RxCUI {rxcui}: {response.status_code}")
-                return {'rxcui': rxcui, 'error': f'API error: {response.status_code}'}
+                error_data = {'rxcui': rxcui, 'error': f'API error: {response.status_code}',
+                              'error_type': 'not_found' if response.status_code == 404 else 'transient'}
                 
+        except RateLimitExceeded as e:
+            logging.warning(f"Rate limited fetching RxNorm interactions for {rxcui}: {e}")
+            error_data = {'rxcui': rxcui, 'error': str(e), 'error_type': 'rate_limited'}
+        except CircuitOpenError as e:
+            logging.warning(f"Skipped fetching RxNorm interactions for {rxcui}: {e}")
+            error_data = {'rxcui': rxcui, 'error': str(e), 'error_type': 'circuit_open'}
         except Exception as e:
             logging.error(f"Error fetching RxNorm interactions for {rxcui}: {e}")
-            return {'rxcui': rxcui, 'error': str(e)}
+            error_data = {'rxcui': rxcui, 'error': str(e), 'error_type': 'transient'}
+        
+        if save_to_cache:
+            self._save_negative_to_cache(rxcui, "interactions", error_data)
+        return error_data
     
     def standardize_drug_name(self, drug_name: str) -> Tuple[str, Optional[str]]:
         """
         Standardize drug name using RxNorm
         Returns (standardized_name, rxcui)
+        
+        The search uses the canonical ingredient ID from the shared name
+        normalizer, so "Advil 200mg", "advil" and "ibuprofen" share one
+        cached RxNorm query.
+        """
+        standardized_name, rxcui, _ = self.standardize_drug_name_with_error(drug_name)
+        return standardized_name, rxcui
+    
+    def standardize_drug_name_with_error(self, drug_name: str) -> Tuple[str, Optional[str], Optional[Dict]]:
         """
-        search_result = self.search_drugs(drug_name)
+        Like standardize_drug_name(), plus the search's error dict (with
+        error_type) when the RxNorm search failed, else None
+        """
+        from .drug_normalizer import canonical_drug_id
+        search_result = self.search_drugs(canonical_drug_id(drug_name) or drug_name)
         
         if 'error' in search_result:
-            return drug_name, None
+            return drug_name, None, search_result
         
+        standardized_name, rxcui = self.standardize_search_result(drug_name, search_result)
+        return standardized_name, rxcui, None
+    
+    def standardize_search_result(self, drug_name: str, search_result: Dict) -> Tuple[str, Optional[str]]:
+        """
+        (standardized_name, rxcui) from a successful search result: the first
+        ingredient concept, else the first concept, else (drug_name, None)
+        """
         # Extract drug concepts from search results
         drug_group = search_result.get('results', {}).get('drugGroup', {})
         concepts = drug_group.get('conceptGroup', [])
@@ -231,6 +377,42 @@ class RxNormClient:
         
         return drug_name, None
     
+    def cached_ingredient_name(self, drug_name: str) -> Optional[str]:
+        """
+        Ingredient name for a drug from cached search results only.
+        Never calls the API (used by the drug name normalizer).
+        """
+        entry = self.cache_store.get_entry('rxnorm', 'search', drug_name, self.max_stale)
+        if entry is None:
+            return None
+        
+        drug_group = entry[0].get('results', {}).get('drugGroup', {})
+        for concept_group in drug_group.get('conceptGroup', []):
+            if concept_group.get('tty') == 'IN':
+                concepts_list = concept_group.get('conceptProperties', [])
+                if concepts_list:
+                    return concepts_list[0].get('name')
+        return None
+    
+    def data_stamp(self, drug_name: str) -> Tuple:
+        """
+        Stamps of the cached entries an interaction check reads for a drug:
+        its name search and, if that resolved an RxCUI, its interactions.
+        Reads the cache only (never calls the API).
+        """
+        from .drug_normalizer import canonical_drug_id
+        query = canonical_drug_id(drug_name) or drug_name
+        search_stamp = self.cache_store.entry_stamp('rxnorm', 'search', query)
+        if search_stamp is None:
+            return (None, None)
+        
+        entry = self.cache_store.get_entry('rxnorm', 'search', query, max_stale=float('inf'))
+        rxcui = None
+        if entry is not None and 'error' not in entry[0]:
+            rxcui = self.standardize_search_result(drug_name, entry[0])[1]
+        interactions_stamp = self.cache_store.entry_stamp('rxnorm', 'interactions', rxcui) if rxcui else None
+        return (search_stamp, interactions_stamp)
+    
     def get_all_drug_names(self, rxcui: str) -> List[str]:
         """
         Get all names (brand, generic, etc.) for a drug by RxCUI
@@ -280,35 +462,17 @@ class RxNormClient:
         """
         Get statistics about cached data
         """
-        cache_files = [f for f in os.listdir(self.cache_dir) if f.endswith('.json')]
-        
-        total_files = len(cache_files)
-        valid_files = 0
-        expired_files = 0
-        
-        for file in cache_files:
-            file_path = os.path.join(self.cache_dir, file)
-            if self._is_cache_valid(file_path):
-                valid_files += 1
-            else:
-                expired_files += 1
-        
-        return {
-            'total_cached_queries': total_files,
-            'valid_cache_files': valid_files,
-            'expired_cache_files': expired_files,
-            'cache_directory': self.cache_dir
-        }
+        stats = self.cache_store.get_stats('rxnorm')
+        stats['total_cached_queries'] = stats['total_entries']
+        return stats
     
     def clear_cache(self):
         """
         Clear all cached data
         """
         try:
-            for file in os.listdir(self.cache_dir):
-                if file.endswith('.json'):
-                    os.remove(os.path.join(self.cache_dir, file))
-            logging.info("RxNorm cache cleared successfully")
+            removed = self.cache_store.clear('rxnorm')
+            logging.info(f"RxNorm cache cleared successfully ({removed} entries)")
         except Exception as e:
             logging.error(f"Error clearing RxNorm cache: {e}")
 
@@ -0,0 +1,103 @@
+"""
+============================================================================
+SEARCH PAGINATION - Keyset Pages with Opaque Cursor Tokens
+============================================================================
+
+Search results used to be cut with [:limit] only (no way to get page two)
+and OFFSET paging re-reads every skipped row. Pages here continue after
+the last row of the previous page on the sort key instead:
+
+    WHERE (name > :name) OR (name = :name AND id > :id)
+    ORDER BY name, id LIMIT :limit + 1
+
+The (name, id) pair of the last row is handed to the client as an opaque,
+URL-safe cursor token (base64 JSON); the extra row tells whether a next
+page exists. Ranked full-text results (knowledge_search.py) are ordered by
+(score DESC, id), so their cursors carry the last [score, id] under a
+different key ({'ranked': ...} vs {'after': ...}); a cursor of the wrong
+kind is rejected rather than read as the first page.
+
+Used by:
+- api/views.py: search_medicines() - Keyset on (name, id)
+- api/views.py: search_medical_knowledge() - Keyset on (score, id) when
+  ranked, on (term, id) for the icontains fallback
+============================================================================
+"""
+
+import base64
+import binascii
+import json
+from typing import Dict, List, Optional, Tuple
+
+from django.db.models import Q, QuerySet
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(position: Dict) -> str:
+    """Opaque token for a page position"""
+    data = json.dumps(position, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: Optional[str]) -> Dict:
+    """
+    Page position from a token ({} for no token).
+    Raises ValueError for tokens this file did not produce.
+    """
+    if not token:
+        return {}
+    try:
+        data = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        position = json.loads(data)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(position, dict):
+        raise ValueError('Invalid cursor')
+    return position
+
+
+def _check_kind(cursor: Dict, kind: str):
+    """A cursor from another listing (e.g. a ranked page) is an error, not page one"""
+    if cursor and set(cursor) != {kind}:
+        raise ValueError('Cursor belongs to a different kind of page')
+
+
+def rank_position(cursor: Dict) -> Optional[List]:
+    """
+    [score, id] to continue a ranked listing after (None on the first page).
+    Raises ValueError for malformed or non-ranked cursors.
+    """
+    _check_kind(cursor, 'ranked')
+    after = cursor.get('ranked')
+    if after is not None and not (
+            isinstance(after, list) and len(after) == 2
+            and isinstance(after[0], (int, float)) and not isinstance(after[0], bool)
+            and isinstance(after[1], int) and not isinstance(after[1], bool)):
+        raise ValueError('Invalid cursor')
+    return after
+
+
+def keyset_page(queryset: QuerySet, field: str, cursor: Dict, limit: int) -> Tuple[List, Optional[str]]:
+    """
+    One page of a queryset ordered by (field, id), after the cursor position.
+    Raises ValueError for malformed cursors and cursors of another kind.
+
+    Returns:
+    - (rows, next cursor token or None on the last page)
+    """
+    _check_kind(cursor, 'after')
+    after = cursor.get('after')
+    if after is not None:
+        if not (isinstance(after, list) and len(after) == 2 and isinstance(after[1], int)):
+            raise ValueError('Invalid cursor')
+        value, last_id = after
+        queryset = queryset.filter(Q(**{f'{field}__gt': value}) | Q(**{field: value, 'id__gt': last_id}))
+
+    rows = list(queryset.order_by(field, 'id')[:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor({'after': [getattr(last, field), last.id]})
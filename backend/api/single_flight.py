@@ -0,0 +1,210 @@
+"""
+============================================================================
+SINGLE FLIGHT - Coalesce Concurrent Identical External API Lookups
+============================================================================
+
+This file makes sure that when many requests need the same uncached drug
+at the same moment, only ONE of them calls OpenFDA/RxNorm. The others wait
+for that result instead of firing duplicate requests (and duplicate cache
+writes).
+
+How it works:
+- Calls are keyed by (source, endpoint, normalized key)
+- Within a process: the first caller becomes the leader and runs the
+  fetch; later callers wait on a threading.Event and share its result
+- Across worker processes on the same node: the leader also takes an
+  exclusive fcntl lock on a lock file of its own key (named by key hash),
+  so only fetches of the same drug wait for each other. A leader that had
+  to wait for the lock re-checks the cache first, because another process
+  has most likely just stored the answer
+- The lock holder removes its lock file before unlocking; a waiter that
+  then holds a lock on the removed file opens the new one and locks again
+
+Fallbacks:
+- In-process waits are bounded (wait_timeout); a caller that times out
+  fetches on its own rather than hanging a request thread
+- Cross-process waits block in flock() until the holder finishes, which
+  is bounded by the transport's request timeouts and retries (and the
+  lock is released if the holder dies)
+- On platforms without fcntl only in-process coalescing is used
+
+Used by:
+- api/openfda_client.py - FDA label fetches
+- api/rxnorm_client.py - RxNorm search / drug info / interaction fetches
+============================================================================
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from typing import Callable, Dict, Optional
+
+from .cache_store import CACHE_DIR, normalize_cache_key
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process coalescing only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+class _Call:
+    """One in-flight fetch that followers can wait on"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Request coalescing for external API fetches.
+
+    Singleton Pattern:
+    - Instance created: single_flight = SingleFlight()
+    - Shared by all external API clients
+
+    Main Methods:
+    - do() - Run a fetch once per key, sharing the result with waiters
+    - get_stats() - Leader / follower / cross-process counters
+    """
+
+    def __init__(self, lock_dir: str = str(CACHE_DIR / 'locks'), wait_timeout: float = 30.0):
+        self.lock_dir = lock_dir
+        self.wait_timeout = wait_timeout
+        os.makedirs(self.lock_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {
+            'leaders': 0,           # Fetches actually performed
+            'followers': 0,         # Callers that reused an in-process fetch
+            'cross_process_hits': 0,  # Leaders that found the cache filled by another process
+            'timeouts': 0,          # In-process waits that gave up and fetched anyway
+        }
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _lock_path(self, flight_key) -> str:
+        digest = hashlib.sha1('|'.join(flight_key).encode('utf-8')).hexdigest()
+        return os.path.join(self.lock_dir, f"flight_{digest}.lock")
+
+    def _acquire_file_lock(self, flight_key):
+        """
+        Take the cross-process lock for a key, blocking while another
+        process holds it.
+
+        Returns ((fd, path), waited), or (None, False) when locking is
+        unavailable.
+        """
+        if fcntl is None:
+            return None, False
+
+        path = self._lock_path(flight_key)
+        waited = False
+        while True:
+            try:
+                fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            except OSError as e:
+                logger.warning(f"Could not open single-flight lock file: {e}")
+                return None, False
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                waited = True
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            # The previous holder removes the file when done: only a lock on
+            # the file currently at the path counts
+            try:
+                if os.fstat(fd).st_ino == os.stat(path).st_ino:
+                    return (fd, path), waited
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+
+    def _release_file_lock(self, lock):
+        if lock is None:
+            return
+        fd, path = lock
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        try:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    def do(self, source: str, endpoint: str, key: str, fetch: Callable[[], Dict],
+           recheck: Optional[Callable[[], Optional[Dict]]] = None) -> Dict:
+        """
+        Run `fetch` once for (source, endpoint, key).
+
+        Args:
+            fetch: Performs the live API call (and caches the result)
+            recheck: Optional cache lookup, run by a leader that had to wait
+                     for another process; a non-empty result skips the fetch
+
+        Returns:
+            The fetch (or recheck) result; each caller gets its own shallow copy
+        """
+        flight_key = (source, endpoint, normalize_cache_key(key))
+
+        with self._lock:
+            call = self._calls.get(flight_key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[flight_key] = call
+
+        if not leader:
+            self._count('followers')
+            if not call.event.wait(self.wait_timeout):
+                self._count('timeouts')
+                logger.warning(f"Timed out waiting for in-flight fetch of {source}/{endpoint}/{key}")
+                return fetch()
+            if call.error is not None:
+                raise call.error
+            return dict(call.result) if isinstance(call.result, dict) else call.result
+
+        lock = None
+        try:
+            lock, waited = self._acquire_file_lock(flight_key)
+
+            result = None
+            if waited and recheck is not None:
+                result = recheck()
+                if result:
+                    self._count('cross_process_hits')
+                    logger.info(f"Reused result fetched by another process for {source}/{endpoint}/{key}")
+
+            if not result:
+                self._count('leaders')
+                result = fetch()
+
+            call.result = result
+            return dict(result) if isinstance(result, dict) else result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            self._release_file_lock(lock)
+            with self._lock:
+                self._calls.pop(flight_key, None)
+            call.event.set()
+
+    def get_stats(self) -> Dict:
+        """
+        Get coalescing counters for this process
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._calls)
+        return stats
+
+# Global instance
+single_flight = SingleFlight()
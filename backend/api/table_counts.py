@@ -0,0 +1,168 @@
+"""
+============================================================================
+TABLE COUNTS - Cached Row Counts for Database Size Fields
+============================================================================
+
+Search and analysis responses report the size of the medicine and medical
+knowledge tables (database_size, database_statistics). Counting them with
+COUNT(*) on every request scans the table each time, so this file keeps
+the counts in the TableCount table instead.
+
+How counts stay current:
+- Medicine and MedicalKnowledge (STORED_MODELS, rarely written): post_save
+  (created) / post_delete signals add or subtract one on their TableCount
+  row (connect_signals(), called from ApiConfig.ready())
+- MedicationReminder and PrescriptionHistory get an insert per user
+  action; a shared counter row would make concurrent inserts wait on its
+  lock, so they have no row and are counted with COUNT(*) on read,
+  at most once per MEMO_SECONDS per process
+- refresh() recounts exactly; populate_database runs it after its bulk
+  imports (bulk_create() sends no signals)
+- A stored table without a TableCount row is counted once on first use
+
+Reads:
+- get() / get_many() read the TableCount rows (one query for all tables)
+  and memoize all counts in-process for MEMO_SECONDS; a counted write in
+  this process drops the memo, other writes show up within MEMO_SECONDS
+
+Used by:
+- api/views.py: search_medicines(), search_medical_knowledge(),
+  get_medical_knowledge_stats()
+- api/database_views.py: analyze_prescription_with_safety(),
+  search_medical_knowledge(), get_medical_knowledge_stats()
+- api/management/commands/populate_database.py - refresh() after imports
+============================================================================
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from django.apps import apps
+from django.db import DatabaseError
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Tables whose sizes responses report
+COUNTED_MODELS = (
+    'api.Medicine',
+    'api.MedicalKnowledge',
+    'api.MedicationReminder',
+    'api.PrescriptionHistory',
+)
+# Tables with a TableCount row kept current by signals
+STORED_MODELS = (
+    'api.Medicine',
+    'api.MedicalKnowledge',
+)
+MEMO_SECONDS = 30
+
+
+class TableCounter:
+    """
+    Row counts of the counted tables, read from TableCount.
+
+    Singleton Pattern:
+    - Instance created: table_counter = TableCounter()
+
+    Main Methods:
+    - get() - Row count of one model
+    - get_many() - Row counts of several models (one query)
+    - refresh() - Exact recount (after bulk imports)
+    """
+
+    def __init__(self, memo_seconds: float = MEMO_SECONDS):
+        self.memo_seconds = memo_seconds
+        self._lock = threading.Lock()
+        self._memo = {}        # model label -> count
+        self._memo_until = 0.0
+
+    def get(self, model) -> int:
+        return self.get_many([model])[model._meta.label]
+
+    def get_many(self, models: Iterable) -> Dict[str, int]:
+        """Model label -> row count"""
+        from .models import TableCount
+
+        labels = [model._meta.label for model in models]
+        with self._lock:
+            if time.monotonic() < self._memo_until and all(label in self._memo for label in labels):
+                return {label: self._memo[label] for label in labels}
+
+        counts = dict(TableCount.objects.filter(table__in=STORED_MODELS).values_list('table', 'count'))
+        missing = [label for label in labels if label in STORED_MODELS and label not in counts]
+        if missing:
+            counts.update(self.refresh(missing))
+        for label in labels:
+            if label not in STORED_MODELS:
+                counts[label] = apps.get_model(label).objects.count()
+        with self._lock:
+            self._memo = counts
+            self._memo_until = time.monotonic() + self.memo_seconds
+        return {label: counts[label] for label in labels}
+
+    def refresh(self, labels: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """Recount tables exactly (default: every stored table)"""
+        from .models import TableCount
+
+        counts = {}
+        for label in labels or STORED_MODELS:
+            counts[label] = apps.get_model(label).objects.count()
+            if label in STORED_MODELS:
+                TableCount.objects.update_or_create(table=label, defaults={'count': counts[label]})
+        self.clear_memo()
+        logger.info(f"Table counts refreshed: {counts}")
+        return counts
+
+    def adjust(self, model, delta: int):
+        """Add delta to a table's count (no-op until the table was counted once)"""
+        from .models import TableCount
+
+        TableCount.objects.filter(table=model._meta.label).update(
+            count=F('count') + delta, updated_at=timezone.now()
+        )
+        self.clear_memo()
+
+    def clear_memo(self):
+        with self._lock:
+            self._memo = {}
+            self._memo_until = 0.0
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'memo': dict(self._memo),
+                'memo_fresh': time.monotonic() < self._memo_until,
+                'memo_seconds': self.memo_seconds,
+            }
+
+# Global instance
+table_counter = TableCounter()
+
+
+def _on_row_saved(sender, instance, created=False, raw=False, **kwargs):
+    if not created or raw:
+        return
+    try:
+        table_counter.adjust(sender, 1)
+    except DatabaseError as e:
+        logger.warning(f"Failed to update row count of {sender._meta.label}: {e}")
+
+
+def _on_row_deleted(sender, instance, **kwargs):
+    try:
+        table_counter.adjust(sender, -1)
+    except DatabaseError as e:
+        logger.warning(f"Failed to update row count of {sender._meta.label}: {e}")
+
+
+def connect_signals():
+    """Keep the stored counts in step with single-row inserts and deletes"""
+    for label in STORED_MODELS:
+        model = apps.get_model(label)
+        post_save.connect(_on_row_saved, sender=model, dispatch_uid=f'table_counts_save_{label}')
+        post_delete.connect(_on_row_deleted, sender=model, dispatch_uid=f'table_counts_delete_{label}')
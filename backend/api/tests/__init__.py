@@ -0,0 +1,5 @@
+"""
+Unit tests for the api app.
+
+Run from backend/: python manage.py test api
+"""
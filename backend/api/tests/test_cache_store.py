@@ -0,0 +1,72 @@
+"""
+Tests for api/cache_store.py - SQLite cache shared by the external API clients
+"""
+
+import os
+import shutil
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from api.cache_store import CacheStore, decode_payload, encode_payload
+
+
+class CacheStoreTests(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = CacheStore(os.path.join(self.directory, 'cache.sqlite3'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_put_then_get_returns_payload(self):
+        self.store.put('openfda', 'label', 'Aspirin', {'name': 'aspirin'}, ttl=60)
+        self.assertEqual(self.store.get('openfda', 'label', 'Aspirin'), {'name': 'aspirin'})
+
+    def test_keys_are_case_insensitive(self):
+        self.store.put('openfda', 'label', 'Aspirin', {'name': 'aspirin'}, ttl=60)
+        self.store.memory.clear()
+        self.assertEqual(self.store.get('openfda', 'label', ' aspirin '), {'name': 'aspirin'})
+
+    def test_expired_entry_is_served_only_as_stale(self):
+        self.store.put('rxnorm', 'rxcui', 'warfarin', {'rxcui': '11289'}, ttl=-1, jitter=0)
+        self.store.memory.clear()
+        self.assertIsNone(self.store.get('rxnorm', 'rxcui', 'warfarin'))
+        self.assertEqual(self.store.get_entry('rxnorm', 'rxcui', 'warfarin', max_stale=3600),
+                         ({'rxcui': '11289'}, True))
+
+    def test_negative_entry_does_not_replace_servable_positive_entry(self):
+        self.store.put('openfda', 'label', 'aspirin', {'name': 'aspirin'}, ttl=-1, jitter=0)
+        self.assertFalse(self.store.put('openfda', 'label', 'aspirin', {'error': 'timeout'},
+                                        ttl=60, negative=True))
+        self.store.memory.clear()
+        self.assertEqual(self.store.get_entry('openfda', 'label', 'aspirin', max_stale=3600)[0],
+                         {'name': 'aspirin'})
+
+    def test_purge_expired_removes_only_expired_entries(self):
+        self.store.put('openfda', 'label', 'old', {'a': 1}, ttl=-10, jitter=0)
+        self.store.put('openfda', 'label', 'new', {'a': 2}, ttl=60)
+        self.assertEqual(self.store.purge_expired(), 1)
+        self.assertEqual(self.store.get('openfda', 'label', 'new'), {'a': 2})
+
+    def test_restore_keeps_newer_entry(self):
+        self.store.put('openfda', 'label', 'aspirin', {'name': 'fresh'}, ttl=60)
+        old = time.time() - 86400
+        self.assertEqual(self.store.restore('openfda', 'label', 'aspirin', {'name': 'legacy'},
+                                            old, old + 7 * 86400), 0)
+        self.store.memory.clear()
+        self.assertEqual(self.store.get('openfda', 'label', 'aspirin'), {'name': 'fresh'})
+
+    def test_restore_replaces_older_entry(self):
+        old = time.time() - 86400
+        self.store.restore('openfda', 'label', 'aspirin', {'name': 'legacy'}, old, old + 7 * 86400)
+        now = time.time()
+        self.assertGreater(self.store.restore('openfda', 'label', 'aspirin', {'name': 'newer'},
+                                              now, now + 60), 0)
+        self.assertEqual(self.store.get('openfda', 'label', 'aspirin'), {'name': 'newer'})
+
+    def test_payload_round_trip(self):
+        data = {'name': 'ibuprofen', 'warnings': ['x' * 500], 'created': time.time()}
+        self.assertEqual(decode_payload(encode_payload(data)), data)
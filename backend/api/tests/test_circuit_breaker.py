@@ -0,0 +1,104 @@
+"""
+Tests for api/circuit_breaker.py - Breaker state machine and probe slots
+"""
+
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from api.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from api.http_transport import HTTPTransport
+from api.rate_limiter import RateLimitExceeded
+
+CONFIG = {
+    'window_seconds': 60,
+    'min_calls': 4,
+    'failure_rate_threshold': 0.5,
+    'slow_call_seconds': 5.0,
+    'slow_rate_threshold': 0.8,
+    'open_seconds': 30,
+    'half_open_max_calls': 1,
+}
+
+
+class CircuitBreakerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('api.circuit_breaker.time.time', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker('api.example', CONFIG)
+
+    def _trip(self):
+        for _ in range(4):
+            self.breaker.before_request()
+            self.breaker.record_failure(0.1)
+
+    def test_stays_closed_below_min_calls(self):
+        for _ in range(3):
+            self.breaker.record_failure(0.1)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_opens_on_failure_rate(self):
+        self._trip()
+        self.assertEqual(self.breaker.state, OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_request()
+
+    def test_opens_on_slow_call_rate(self):
+        for _ in range(4):
+            self.breaker.record_success(6.0)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_half_open_probe_success_closes(self):
+        self._trip()
+        self.now += 31
+        self.breaker.before_request()
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_request()
+        self.breaker.record_success(0.1)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_half_open_probe_failure_reopens(self):
+        self._trip()
+        self.now += 31
+        self.breaker.before_request()
+        self.breaker.record_failure(0.1)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_cancelled_probe_frees_its_slot(self):
+        self._trip()
+        self.now += 31
+        self.breaker.before_request()
+        self.breaker.cancel_request()
+        self.breaker.before_request()
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+
+
+class TransportBreakerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.limiter = mock.Mock()
+        self.transport = HTTPTransport(
+            host_config={'api.example': {'rate_limit': (1.0, 1), 'circuit_breaker': CONFIG}},
+            limiter=self.limiter
+        )
+        self.transport.session.get = mock.Mock(return_value=mock.Mock(status_code=200))
+        self.breaker = self.transport._breakers['api.example']
+
+    def tearDown(self):
+        self.transport.close()
+
+    def test_rate_limited_half_open_call_keeps_probe_slot(self):
+        self.breaker.state = HALF_OPEN
+        self.limiter.acquire.side_effect = RateLimitExceeded('api.example', 1.0)
+        for _ in range(3):
+            with self.assertRaises(RateLimitExceeded):
+                self.transport.get('https://api.example/drug')
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+
+        self.limiter.acquire.side_effect = None
+        self.transport.get('https://api.example/drug')
+        self.assertEqual(self.breaker.state, CLOSED)
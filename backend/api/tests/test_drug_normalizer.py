@@ -0,0 +1,46 @@
+"""Tests for api/drug_normalizer.py - salt stripping and the result memo"""
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from api.drug_normalizer import DrugNameNormalizer, strip_salt
+
+
+class StripSaltTests(SimpleTestCase):
+    def test_strips_salt_after_a_drug_name(self):
+        self.assertEqual(strip_salt('naproxen sodium'), 'naproxen')
+        self.assertEqual(strip_salt('sertraline hydrochloride'), 'sertraline')
+
+    def test_keeps_names_made_only_of_salt_words(self):
+        self.assertEqual(strip_salt('sodium bicarbonate'), 'sodium bicarbonate')
+        self.assertEqual(strip_salt('magnesium hydroxide'), 'magnesium hydroxide')
+        self.assertEqual(strip_salt('potassium chloride'), 'potassium chloride')
+
+    def test_unknown_salt_only_name_normalizes_whole(self):
+        normalizer = DrugNameNormalizer(medicines=[], use_rxnorm=False)
+        self.assertEqual(normalizer.normalize('Sodium Bicarbonate 650 mg'), 'sodium bicarbonate')
+        self.assertEqual(normalizer.normalize('Magnesium Hydroxide'), 'magnesium hydroxide')
+
+
+class MemoTests(SimpleTestCase):
+    def test_fallback_is_not_memoized(self):
+        normalizer = DrugNameNormalizer(medicines=[])
+        with mock.patch.object(normalizer, '_from_rxnorm_cache', return_value=None):
+            self.assertEqual(normalizer.normalize('Zorvexa'), 'zorvexa')
+        with mock.patch.object(normalizer, '_from_rxnorm_cache', return_value='zorvexamide'):
+            self.assertEqual(normalizer.normalize('Zorvexa'), 'zorvexamide')
+        self.assertEqual(normalizer.get_stats()['memo_entries'], 1)
+
+    def test_definite_result_is_memoized(self):
+        normalizer = DrugNameNormalizer(medicines=[])
+        with mock.patch.object(normalizer, '_from_rxnorm_cache', return_value='zorvexamide') as lookup:
+            normalizer.normalize('Zorvexa')
+            normalizer.normalize('Zorvexa')
+        lookup.assert_called_once()
+        self.assertEqual(normalizer.get_stats()['memo_hits'], 1)
+
+    def test_memo_is_bounded(self):
+        normalizer = DrugNameNormalizer(medicines=[], use_rxnorm=False, cache_size=2)
+        for name in ('warfarin', 'aspirin', 'ibuprofen'):
+            normalizer.normalize(name)
+        self.assertEqual(normalizer.get_stats()['memo_entries'], 2)
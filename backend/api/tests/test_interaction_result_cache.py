@@ -0,0 +1,153 @@
+"""
+Tests for api/interaction_result_cache.py - Reuse of unified interaction reports
+"""
+
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from api.enhanced_drug_interactions import EnhancedDrugInteractionChecker
+from api.http_transport import BACKGROUND_RATE_LIMIT_WAIT, http_transport
+from api.interaction_result_cache import interaction_result_cache
+from api.unified_drug_interactions import UnifiedDrugInteractionChecker
+
+
+class UnifiedReportReuseTests(SimpleTestCase):
+
+    def setUp(self):
+        interaction_result_cache.clear()
+        self.addCleanup(interaction_result_cache.clear)
+        self.checker = UnifiedDrugInteractionChecker()
+        self.checker.basic_checker = mock.Mock(data_version='v1')
+        self.checker.basic_checker.check_interactions.side_effect = lambda medicines: {
+            'status': 'success',
+            'interactions': [{'drug1': medicines[0], 'drug2': medicines[1], 'severity': 'HIGH',
+                              'description': 'Bleeding risk'}],
+        }
+        self.checker.enhanced_checker = mock.Mock()
+        self.checker.enhanced_checker.check_interactions.return_value = {'status': 'success', 'interactions': []}
+        self.stamp = ('label-1',)
+        self.checker.enhanced_checker.data_stamp.side_effect = lambda medicines: self.stamp
+
+    def test_report_built_cold_is_reused(self):
+        # The first check fetches the entries it is versioned on
+        stamps = iter([None, ('label-1',)])
+        self.checker.enhanced_checker.data_stamp.side_effect = lambda medicines: next(stamps, ('label-1',))
+        self.assertEqual(self.checker.check_interactions(['Advil', 'warfarin'])['result_cache'], 'miss')
+        self.assertEqual(self.checker.check_interactions(['Advil', 'warfarin'])['result_cache'], 'hit')
+        self.assertEqual(self.checker.enhanced_checker.check_interactions.call_count, 1)
+
+    def test_changed_entry_stamp_rebuilds(self):
+        self.checker.check_interactions(['Advil', 'warfarin'])
+        self.stamp = ('label-2',)
+        self.assertEqual(self.checker.check_interactions(['Advil', 'warfarin'])['result_cache'], 'miss')
+
+    def test_degraded_report_is_not_reused(self):
+        self.checker.enhanced_checker.check_interactions.return_value = {
+            'status': 'success', 'interactions': [], 'degraded': True,
+            'degraded_lookups': [{'source': 'OpenFDA', 'drug': 'warfarin', 'error_type': 'rate_limited'}],
+        }
+        first = self.checker.check_interactions(['Advil', 'warfarin'])
+        self.assertTrue(first['degraded'])
+        self.assertEqual(self.checker.check_interactions(['Advil', 'warfarin'])['result_cache'], 'miss')
+        self.assertEqual(self.checker.enhanced_checker.check_interactions.call_count, 2)
+
+    def test_hit_uses_the_callers_names_and_timestamp(self):
+        # Real stamps: the spellings below must read the same cache entries
+        enhanced = EnhancedDrugInteractionChecker()
+        enhanced.openfda_client = mock.Mock()
+        enhanced.openfda_client.data_stamp.side_effect = lambda drug_id: ('label', drug_id)
+        enhanced.rxnorm_client = mock.Mock()
+        enhanced.rxnorm_client.data_stamp.side_effect = lambda drug_id: ('search', drug_id)
+        enhanced.check_interactions = mock.Mock(return_value={'status': 'success', 'interactions': []})
+        self.checker.enhanced_checker = enhanced
+
+        first = self.checker.check_interactions(['Advil', 'warfarin'])
+        with mock.patch('api.unified_drug_interactions.datetime') as clock:
+            clock.now.return_value.isoformat.return_value = 'later'
+            second = self.checker.check_interactions(['Ibuprofen', 'Warfarin', 'Ibuprofen 200mg'])
+        self.assertEqual(second['result_cache'], 'hit')
+        interaction = second['interactions'][0]
+        self.assertEqual((interaction['drug1'], interaction['drug2']), ('Ibuprofen 200mg', 'Warfarin'))
+        self.assertEqual(second['total_medicines'], 3)
+        self.assertEqual(second['timestamp'], 'later')
+        self.assertEqual(first['interactions'][0]['drug1'], 'Advil')
+
+
+class EnhancedCheckerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.checker = EnhancedDrugInteractionChecker()
+        self.checker.manual_checker = mock.Mock()
+        self.checker.manual_checker.check_interactions.return_value = {'interactions': []}
+        self.checker.openfda_client = mock.Mock()
+        self.checker.openfda_client.check_interactions_among.return_value = {}
+        self.checker.openfda_client.data_stamp.side_effect = lambda drug_id: ('label', drug_id)
+        self.checker.rxnorm_client = mock.Mock()
+        self.checker.rxnorm_client.standardize_drug_name_with_error.side_effect = (
+            lambda name: (name, None, None))
+        self.checker.rxnorm_client.data_stamp.side_effect = lambda drug_id: ('search', drug_id)
+
+    def test_data_stamp_ignores_spelling_and_strength(self):
+        self.assertEqual(self.checker.data_stamp(['Metformin 500mg', 'Lisinopril']),
+                         self.checker.data_stamp(['lisinopril', 'metformin']))
+        self.assertEqual(self.checker.data_stamp(['Advil']), self.checker.data_stamp(['Ibuprofen']))
+        self.checker.openfda_client.data_stamp.assert_any_call('ibuprofen')
+
+    def test_failed_lookups_mark_the_report_degraded(self):
+        def among(medicines, failures, pairs=None):
+            failures['warfarin'] = 'rate_limited'
+            return {}
+        self.checker.openfda_client.check_interactions_among.side_effect = among
+        self.checker.rxnorm_client.standardize_drug_name_with_error.side_effect = lambda name: (
+            name, None, {'error': 'open', 'error_type': 'circuit_open'} if name == 'ibuprofen' else None)
+
+        with mock.patch.object(self.checker, '_schedule_retry', return_value=True) as schedule:
+            report = self.checker.check_interactions(['Advil', 'Warfarin'])
+
+        schedule.assert_called_once_with(['ibuprofen', 'warfarin'])
+        self.assertTrue(report['retry_scheduled'])
+        self.assertEqual(report['status'], 'success')
+        self.assertTrue(report['degraded'])
+        self.assertCountEqual(report['degraded_lookups'], [
+            {'source': 'OpenFDA', 'drug': 'warfarin', 'error_type': 'rate_limited'},
+            {'source': 'RxNorm', 'drug': 'advil', 'error_type': 'circuit_open'},
+        ])
+
+    def test_not_found_is_not_degraded(self):
+        self.checker.rxnorm_client.standardize_drug_name_with_error.side_effect = lambda name: (
+            name, None, {'error': 'No RxNorm concepts found', 'error_type': 'not_found'})
+        self.assertFalse(self.checker.check_interactions(['Advil', 'Warfarin'])['degraded'])
+
+    def test_check_pairs_looks_up_only_the_given_pairs(self):
+        self.checker.rxnorm_client.standardize_drug_name_with_error.side_effect = (
+            lambda name: (name, f'rx-{name}', None))
+        self.checker.rxnorm_client.get_drug_interactions.return_value = {'interactions': {}}
+
+        report = self.checker.check_pairs([('aspirin', 'warfarin'), ('ibuprofen', 'warfarin')])
+
+        self.assertFalse(report['degraded'])
+        kwargs = self.checker.openfda_client.check_interactions_among.call_args.kwargs
+        self.assertEqual(kwargs['pairs'], [('aspirin', 'warfarin'), ('ibuprofen', 'warfarin')])
+        # aspirin + ibuprofen is not wanted, so only two RxNorm pair lookups
+        self.assertEqual(self.checker.rxnorm_client.get_drug_interactions.call_count, 2)
+
+    def test_background_retry_waits_for_tokens(self):
+        budgets = []
+        def check(medicines, retry_degraded=True):
+            budgets.append((getattr(http_transport._local, 'rate_limit_wait', None), retry_degraded))
+            return {}
+        with mock.patch.object(self.checker, 'check_interactions', side_effect=check):
+            self.checker._retry_lookups(('ibuprofen', 'warfarin'))
+        self.assertEqual(budgets, [(BACKGROUND_RATE_LIMIT_WAIT, False)])
+        self.assertEqual(self.checker._retrying, set())
+
+    def test_bulk_download_waits_for_tokens(self):
+        budgets = []
+        def info(name):
+            budgets.append(getattr(http_transport._local, 'rate_limit_wait', None))
+            return {}
+        with mock.patch.object(self.checker, 'get_medicine_info', side_effect=info):
+            self.checker.bulk_download_medicine_data(['aspirin', 'warfarin'])
+        self.assertEqual(budgets, [BACKGROUND_RATE_LIMIT_WAIT] * 2)
+        self.assertIsNone(getattr(http_transport._local, 'rate_limit_wait', None))
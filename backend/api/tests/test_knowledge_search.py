@@ -0,0 +1,44 @@
+"""
+Tests for api/knowledge_search.py - Keyset pages over ranked full-text matches
+"""
+
+from unittest import mock
+
+from django.test import TestCase
+
+from api.knowledge_search import knowledge_search_index
+from api.models import MedicalKnowledge
+
+
+class KnowledgeSearchPagingTests(TestCase):
+
+    def setUp(self):
+        # Repeated explanations give tied scores, so the id tie-break matters
+        for i in range(7):
+            MedicalKnowledge.objects.create(
+                term=f'Hypertension {i}' if i % 3 == 0 else f'Condition {i}',
+                explanation='Raised blood pressure. ' * (i % 2 + 1),
+                category='cardiology',
+            )
+
+    def _all_pages(self, query, limit):
+        ranks, seen, after = [], [], None
+        while True:
+            results, _, after = knowledge_search_index.search(query, limit=limit, after=after, count=False)
+            ranks.extend(result['rank'] for result in results)
+            seen.extend(result['entry'].id for result in results)
+            if after is None:
+                return ranks, seen
+
+    def test_pages_cover_every_match_once_in_rank_order(self):
+        ranks, seen = self._all_pages('blood pressure', limit=2)
+        self.assertEqual(sorted(seen), sorted(MedicalKnowledge.objects.values_list('id', flat=True)))
+        self.assertEqual(ranks, sorted(ranks, reverse=True))
+
+    def test_total_is_counted_only_when_asked_and_capped(self):
+        _, total, after = knowledge_search_index.search('pressure', limit=3)
+        self.assertEqual(total, 7)
+        self.assertIsNotNone(after)
+        self.assertIsNone(knowledge_search_index.search('pressure', limit=3, after=after, count=False)[1])
+        with mock.patch('api.knowledge_search.MAX_COUNTED_MATCHES', 4):
+            self.assertEqual(knowledge_search_index.search('pressure', limit=3)[1], 5)
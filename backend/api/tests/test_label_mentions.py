@@ -0,0 +1,43 @@
+"""
+Tests for api/label_store.py - Interaction mention index and name matching
+"""
+
+from django.test import SimpleTestCase
+
+from api.label_store import index_interactions, mention_tokens, name_tokens, required_name_tokens
+from api.openfda_client import OpenFDAClient
+
+
+class MentionTokenTests(SimpleTestCase):
+
+    def test_possessives_reduce_to_the_noun(self):
+        self.assertIn('warfarin', mention_tokens("Monitor the patient's warfarin's effect"))
+        self.assertIn('warfarin', mention_tokens('Increases warfarin’s anticoagulant effect'))
+        self.assertEqual(name_tokens("St. John's Wort"), ['st', 'john', 'wort'])
+
+    def test_stopwords_are_never_required_from_a_name(self):
+        self.assertEqual(name_tokens('Vitamin A'), ['vitamin', 'a'])
+        self.assertEqual(required_name_tokens('Vitamin A'), ['vitamin'])
+
+
+class LabelMentionTests(SimpleTestCase):
+
+    def setUp(self):
+        self.client = OpenFDAClient(offline=True)
+
+    def _mentions(self, paragraphs, drug_name):
+        index = [set(words) for words in index_interactions(paragraphs)]
+        return [m['description'] for m in self.client._mentions(paragraphs, index, drug_name)]
+
+    def test_possessive_mention_matches(self):
+        paragraphs = ["Aspirin may enhance warfarin's anticoagulant effect.", 'Take with food.']
+        self.assertEqual(self._mentions(paragraphs, 'Warfarin'), [paragraphs[0]])
+
+    def test_name_with_stopword_matches(self):
+        paragraphs = ['High doses of vitamin A increase the risk of toxicity.',
+                      'Vitamin D levels may decrease.']
+        self.assertEqual(self._mentions(paragraphs, 'Vitamin A'), [paragraphs[0]])
+
+    def test_phrase_must_match_whole_words(self):
+        paragraphs = ['Vitamin ab12 was not studied.']
+        self.assertEqual(self._mentions(paragraphs, 'Vitamin A'), [])
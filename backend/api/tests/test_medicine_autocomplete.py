@@ -0,0 +1,58 @@
+"""
+Tests for api/medicine_autocomplete.py - Index built by the command, loaded by servers
+"""
+
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from api.medicine_autocomplete import MedicineAutocomplete
+
+RECORDS = [
+    ('advil\x01Advil', (2, 5)),
+    ('ibuprofen\x01Ibuprofen', (1, 9)),
+    ('ibuprofen\x01Advil', (2, 5)),
+]
+
+
+class MedicineAutocompleteTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'autocomplete.marisa')
+        patcher = mock.patch('api.medicine_autocomplete.collect_records', return_value=RECORDS)
+        self.collect = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_server_never_builds_the_index(self):
+        server = MedicineAutocomplete(self.path)
+        self.assertFalse(server.is_ready())
+        self.assertEqual(server.complete('ib'), [])
+        self.collect.assert_not_called()
+
+    def test_server_loads_the_built_file(self):
+        server = MedicineAutocomplete(self.path)
+        self.assertFalse(server.is_ready())
+
+        MedicineAutocomplete(self.path).build_index()
+        self.assertTrue(os.path.exists(server.file_path))
+        server._next_check = 0.0
+
+        self.assertTrue(server.is_ready())
+        self.assertEqual([item['name'] for item in server.complete('ib')], ['Ibuprofen', 'Advil'])
+
+    def test_rebuilt_file_is_reloaded(self):
+        builder = MedicineAutocomplete(self.path)
+        builder.build_index()
+        server = MedicineAutocomplete(self.path)
+        self.assertEqual(len(server.complete('adv')), 1)
+
+        self.collect.return_value = RECORDS + [('advair\x01Advair', (3, 1))]
+        builder.build_index()
+        os.utime(server.file_path, (0, server._mtime + 1))
+        server._next_check = 0.0
+
+        self.assertEqual([item['name'] for item in server.complete('adv')], ['Advil', 'Advair'])
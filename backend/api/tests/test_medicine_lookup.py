@@ -0,0 +1,31 @@
+"""
+Tests for api/medicine_lookup.py - Which medicine a name resolves to
+"""
+
+from django.test import TestCase
+
+from api.medicine_lookup import find_medicine, find_medicines
+from api.models import Medicine
+
+
+class FindMedicinesPrecedenceTests(TestCase):
+
+    def setUp(self):
+        self.ibuprofen = Medicine.objects.create(name='Ibuprofen', generic_name='Ibuprofen')
+        self.advil = Medicine.objects.create(name='Advil', generic_name='Ibuprofen', brand_names=['Advil Liqui-Gels'])
+        self.motrin = Medicine.objects.create(name='Motrin IB', generic_name='Ibuprofen', brand_names=['Motrin'])
+
+    def test_exact_name_beats_a_shared_generic(self):
+        self.assertEqual(find_medicine('Advil'), self.advil)
+        self.assertEqual(find_medicine('ibuprofen'), self.ibuprofen)
+
+    def test_cleaned_name_beats_the_canonical_ingredient(self):
+        self.assertEqual(find_medicine('Advil 200mg'), self.advil)
+
+    def test_alias_beats_the_canonical_ingredient(self):
+        self.assertEqual(find_medicine('Motrin'), self.motrin)
+        self.assertEqual(find_medicine('advil liqui-gels'), self.advil)
+
+    def test_batch_resolves_each_name_on_its_own(self):
+        resolved = find_medicines(['Advil', 'Ibuprofen', 'Motrin', 'Unknownium'])
+        self.assertEqual(resolved, {'Advil': self.advil, 'Ibuprofen': self.ibuprofen, 'Motrin': self.motrin})
@@ -0,0 +1,61 @@
+"""
+Tests for api/prefetch.py - Which fetch outcomes are retried next run
+"""
+
+import json
+import os
+import tempfile
+import time
+from datetime import timedelta
+
+from django.test import SimpleTestCase
+
+from api.prefetch import _is_retryable, load_checkpoint, retryable_error_type, save_checkpoint
+
+
+class RetryableErrorTypeTests(SimpleTestCase):
+
+    def test_found_and_not_found_are_final(self):
+        self.assertFalse(_is_retryable({'openfda_data': {'drug_name': 'aspirin'}, 'rxnorm_data': None}))
+        self.assertFalse(_is_retryable({
+            'openfda_data': {'error': 'No data', 'error_type': 'not_found'},
+            'rxnorm_data': {'error': 'No RxNorm concepts found', 'error_type': 'not_found'},
+        }))
+
+    def test_openfda_failure_is_retried(self):
+        result = {'openfda_data': {'error': 'timeout', 'error_type': 'transient'}, 'rxnorm_data': None}
+        self.assertEqual(retryable_error_type(result), 'transient')
+
+    def test_rxnorm_search_failure_is_retried(self):
+        result = {'openfda_data': {'drug_name': 'aspirin'},
+                  'rxnorm_data': {'error': 'Rate limit exceeded', 'error_type': 'rate_limited'}}
+        self.assertEqual(retryable_error_type(result), 'rate_limited')
+        self.assertTrue(_is_retryable(result))
+
+    def test_rxnorm_detail_failure_is_retried(self):
+        result = {'openfda_data': {'drug_name': 'aspirin'},
+                  'rxnorm_data': {'rxcui': '1191', 'drug_info': {'name': 'aspirin'},
+                                  'interactions': {'error': 'open', 'error_type': 'circuit_open'}}}
+        self.assertEqual(retryable_error_type(result), 'circuit_open')
+
+    def test_unexpected_error_is_retried(self):
+        self.assertTrue(_is_retryable({'error': 'boom'}))
+
+
+class CheckpointTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'checkpoint.json')
+
+    def test_recent_completions_are_skipped_old_ones_expire(self):
+        now = time.time()
+        save_checkpoint(self.path, {'aspirin': now - 60, 'warfarin': now - 3 * 86400})
+        self.assertEqual(set(load_checkpoint(self.path)), {'aspirin'})
+        self.assertEqual(load_checkpoint(self.path, max_age=timedelta(seconds=1)), {})
+
+    def test_checkpoint_without_times_starts_over(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'completed': ['aspirin', 'warfarin']}, f)
+        self.assertEqual(load_checkpoint(self.path), {})
@@ -0,0 +1,94 @@
+"""
+Tests for api/rate_limiter.py - Shared token bucket and wait budgets
+"""
+
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from api.http_transport import HTTPTransport
+from api.rate_limiter import RateLimitExceeded, TokenBucketLimiter
+
+
+class TokenBucketTests(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.limiter = TokenBucketLimiter(os.path.join(self.directory, 'rate_limits.sqlite3'))
+        self.now = 1000.0
+        patcher = mock.patch('api.rate_limiter.time.time', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_burst_then_wait_for_refill(self):
+        for _ in range(3):
+            self.assertEqual(self.limiter.reserve('api.example', rate=2.0, burst=3), 0.0)
+        self.assertAlmostEqual(self.limiter.reserve('api.example', rate=2.0, burst=3), 0.5)
+
+    def test_bucket_refills_from_elapsed_time(self):
+        for _ in range(3):
+            self.limiter.reserve('api.example', rate=2.0, burst=3)
+        self.now += 1.0
+        self.assertEqual(self.limiter.reserve('api.example', rate=2.0, burst=3), 0.0)
+        self.assertEqual(self.limiter.reserve('api.example', rate=2.0, burst=3), 0.0)
+        self.assertAlmostEqual(self.limiter.reserve('api.example', rate=2.0, burst=3), 0.5)
+
+    def test_refill_is_capped_at_burst(self):
+        self.limiter.reserve('api.example', rate=2.0, burst=3)
+        self.now += 60
+        for _ in range(3):
+            self.assertEqual(self.limiter.reserve('api.example', rate=2.0, burst=3), 0.0)
+        self.assertGreater(self.limiter.reserve('api.example', rate=2.0, burst=3), 0.0)
+
+    def test_rejected_reservation_takes_no_token(self):
+        self.limiter.reserve('api.example', rate=1.0, burst=1)
+        with self.assertRaises(RateLimitExceeded) as raised:
+            self.limiter.reserve('api.example', rate=1.0, burst=1, max_wait=0.5)
+        self.assertAlmostEqual(raised.exception.retry_after, 1.0)
+        self.now += 1.0
+        self.assertEqual(self.limiter.reserve('api.example', rate=1.0, burst=1, max_wait=0), 0.0)
+
+    def test_acquire_never_sleeps_by_default(self):
+        self.limiter.acquire('api.example', rate=1.0, burst=1)
+        with mock.patch('api.rate_limiter.time.sleep') as sleep:
+            with self.assertRaises(RateLimitExceeded):
+                self.limiter.acquire('api.example', rate=1.0, burst=1)
+        sleep.assert_not_called()
+
+
+class RateLimitBudgetTests(SimpleTestCase):
+
+    def setUp(self):
+        self.limiter = mock.Mock()
+        self.transport = HTTPTransport(
+            host_config={'api.example': {'rate_limit': (1.0, 1)}}, limiter=self.limiter
+        )
+        self.transport.session.get = mock.Mock(return_value=mock.Mock(status_code=200))
+
+    def tearDown(self):
+        self.transport.close()
+
+    def _max_wait(self):
+        return self.limiter.acquire.call_args[0][3]
+
+    def test_request_threads_do_not_wait(self):
+        self.transport.get('https://api.example/drug')
+        self.assertEqual(self._max_wait(), 0)
+
+    def test_budget_applies_inside_block_only(self):
+        with self.transport.rate_limit_budget(30):
+            self.transport.get('https://api.example/drug')
+            self.assertEqual(self._max_wait(), 30)
+        self.transport.get('https://api.example/drug')
+        self.assertEqual(self._max_wait(), 0)
+
+    def test_explicit_wait_overrides_budget(self):
+        with self.transport.rate_limit_budget(30):
+            self.transport.get('https://api.example/drug', rate_limit_wait=5)
+        self.assertEqual(self._max_wait(), 5)
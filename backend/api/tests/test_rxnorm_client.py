@@ -0,0 +1,97 @@
+"""
+Tests for api/rxnorm_client.py - Caching of RxNorm answers
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.test import SimpleTestCase
+
+from api.cache_store import CacheStore
+from api.rxnorm_client import RxNormClient
+
+
+class _Response:
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+class _Transport:
+    def __init__(self, response):
+        self.response = response
+        self.urls = []
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        return self.response
+
+
+class RxNormSearchCachingTests(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = CacheStore(os.path.join(self.directory, 'cache.sqlite3'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _client(self, response):
+        return RxNormClient(transport=_Transport(response), cache_store=self.store, offline=False,
+                           base_url='http://rxnav.test')
+
+    def _stored_entry(self, key):
+        conn = sqlite3.connect(self.store.db_path)
+        try:
+            return conn.execute('SELECT negative, expires_at - created_at FROM cache_entries '
+                                'WHERE source = ? AND key = ?', ('rxnorm', key)).fetchone()
+        finally:
+            conn.close()
+
+    def test_empty_drug_group_is_cached_as_not_found(self):
+        client = self._client(_Response(200, {'drugGroup': {'name': None}}))
+        result = client.search_drugs('notadrugxyz')
+
+        self.assertEqual(result['error_type'], 'not_found')
+        negative, ttl = self._stored_entry('notadrugxyz')
+        self.assertEqual(negative, 1)
+        self.assertLess(ttl, 2 * 24 * 3600)
+
+    def test_concepts_are_cached_as_positive_entry(self):
+        data = {'drugGroup': {'name': 'warfarin', 'conceptGroup': [
+            {'tty': 'IN', 'conceptProperties': [{'rxcui': '11289', 'name': 'warfarin'}]}]}}
+        client = self._client(_Response(200, data))
+
+        self.assertEqual(client.standardize_drug_name('warfarin'), ('warfarin', '11289'))
+        negative, ttl = self._stored_entry('warfarin')
+        self.assertEqual(negative, 0)
+        self.assertGreater(ttl, 20 * 24 * 3600)
+
+    def test_not_found_entry_is_served_without_refetching(self):
+        transport = _Transport(_Response(200, {'drugGroup': {'name': None, 'conceptGroup': []}}))
+        client = RxNormClient(transport=transport, cache_store=self.store, offline=False,
+                              base_url='http://rxnav.test')
+        client.search_drugs('notadrugxyz')
+        self.assertEqual(client.search_drugs('notadrugxyz')['error_type'], 'not_found')
+        self.assertEqual(len(transport.urls), 1)
+
+    def test_data_stamp_follows_the_drugs_own_entries(self):
+        data = {'drugGroup': {'name': 'warfarin', 'conceptGroup': [
+            {'tty': 'IN', 'conceptProperties': [{'rxcui': '11289', 'name': 'warfarin'}]}]}}
+        client = self._client(_Response(200, data))
+        self.assertEqual(client.data_stamp('warfarin'), (None, None))
+
+        client.standardize_drug_name('warfarin')
+        search_stamp, interactions_stamp = client.data_stamp('warfarin')
+        self.assertIsNotNone(search_stamp)
+        self.assertIsNone(interactions_stamp)
+
+        self.store.put('rxnorm', 'search', 'aspirin', {'results': {}}, ttl=60)
+        self.assertEqual(client.data_stamp('warfarin'), (search_stamp, None))
+        self.store.put('rxnorm', 'interactions', '11289', {'interactions': {}}, ttl=60)
+        self.assertIsNotNone(client.data_stamp('warfarin')[1])
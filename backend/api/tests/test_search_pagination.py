@@ -0,0 +1,56 @@
+"""
+Tests for api/search_pagination.py - Cursor tokens and keyset pages
+"""
+
+from django.test import SimpleTestCase, TestCase
+
+from api.models import MedicalKnowledge
+from api.search_pagination import decode_cursor, encode_cursor, keyset_page, rank_position
+
+
+class CursorTokenTests(SimpleTestCase):
+
+    def test_round_trip(self):
+        for position in ({'after': ['Zyrtec', 41]}, {'ranked': [2.034963487497234e-06, 7]}, {'after': ['é & ?', 1]}):
+            token = encode_cursor(position)
+            self.assertRegex(token, r'^[A-Za-z0-9_-]+$')
+            self.assertEqual(decode_cursor(token), position)
+
+    def test_no_token_is_the_first_page(self):
+        self.assertEqual(decode_cursor(None), {})
+        self.assertEqual(decode_cursor(''), {})
+
+    def test_foreign_tokens_are_rejected(self):
+        for token in ('not base64!', encode_cursor([1, 2])[:-1] + '*', 'W10', '_w'):
+            with self.assertRaises(ValueError):
+                decode_cursor(token)
+
+    def test_rank_position(self):
+        self.assertIsNone(rank_position({}))
+        self.assertEqual(rank_position({'ranked': [1.5, 3]}), [1.5, 3])
+        for cursor in ({'ranked': [1.5]}, {'ranked': ['1.5', 3]}, {'ranked': [1.5, True]},
+                       {'after': ['aspirin', 3]}, {'offset': 20}):
+            with self.assertRaises(ValueError):
+                rank_position(cursor)
+
+
+class KeysetPageTests(TestCase):
+
+    def setUp(self):
+        for term in ('Asthma', 'Anemia', 'Angina', 'Arrhythmia', 'Acne'):
+            MedicalKnowledge.objects.create(term=term, explanation='...')
+
+    def test_pages_cover_every_row_once_in_order(self):
+        queryset = MedicalKnowledge.objects.all()
+        rows, token = keyset_page(queryset, 'term', {}, 2)
+        seen = list(rows)
+        while token:
+            rows, token = keyset_page(queryset, 'term', decode_cursor(token), 2)
+            seen.extend(rows)
+        self.assertEqual([entry.term for entry in seen], ['Acne', 'Anemia', 'Angina', 'Arrhythmia', 'Asthma'])
+        self.assertEqual(len({entry.id for entry in seen}), 5)
+
+    def test_cursor_of_another_kind_is_rejected(self):
+        for cursor in ({'ranked': [1.5, 3]}, {'offset': 2}, {'after': 'Anemia'}):
+            with self.assertRaises(ValueError):
+                keyset_page(MedicalKnowledge.objects.all(), 'term', cursor, 2)
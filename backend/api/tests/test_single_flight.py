@@ -0,0 +1,95 @@
+"""
+Tests for api/single_flight.py - Coalescing of identical external fetches
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.test import SimpleTestCase
+
+from api.single_flight import SingleFlight, fcntl
+
+
+class SingleFlightTests(SimpleTestCase):
+
+    def setUp(self):
+        self.lock_dir = tempfile.mkdtemp()
+        self.flight = SingleFlight(self.lock_dir, wait_timeout=5)
+
+    def tearDown(self):
+        shutil.rmtree(self.lock_dir, ignore_errors=True)
+
+    def test_concurrent_identical_calls_fetch_once(self):
+        calls = []
+        release = threading.Event()
+
+        def fetch():
+            calls.append(1)
+            release.wait(2)
+            return {'name': 'aspirin'}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            self.flight.do('openfda', 'label', 'aspirin', fetch))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join(2)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'name': 'aspirin'}] * 5)
+
+    def test_different_keys_do_not_wait_for_each_other(self):
+        release = threading.Event()
+        slow = threading.Thread(target=self.flight.do,
+                                args=('openfda', 'label', 'aspirin', lambda: release.wait(2) and {}))
+        slow.start()
+        time.sleep(0.05)
+
+        started = time.monotonic()
+        result = self.flight.do('openfda', 'label', 'warfarin', lambda: {'name': 'warfarin'})
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(result, {'name': 'warfarin'})
+        release.set()
+        slow.join(2)
+
+    def test_lock_files_are_removed_after_the_fetch(self):
+        self.flight.do('rxnorm', 'rxcui', 'metformin', lambda: {'rxcui': '6809'})
+        self.assertEqual(os.listdir(self.lock_dir), [])
+
+    def test_waiting_process_rechecks_the_cache(self):
+        if fcntl is None:
+            self.skipTest('fcntl not available')
+        # A second instance stands in for another worker process
+        other = SingleFlight(self.lock_dir, wait_timeout=5)
+        cache = {}
+        release = threading.Event()
+
+        def leader_fetch():
+            release.wait(2)
+            cache['aspirin'] = {'name': 'aspirin'}
+            return cache['aspirin']
+
+        leader = threading.Thread(target=self.flight.do, args=('openfda', 'label', 'aspirin', leader_fetch))
+        leader.start()
+        time.sleep(0.05)
+
+        fetches = []
+        result = {}
+        follower = threading.Thread(target=lambda: result.update(other.do(
+            'openfda', 'label', 'aspirin', lambda: fetches.append(1) or {'name': 'fetched'},
+            recheck=lambda: cache.get('aspirin'))))
+        follower.start()
+        time.sleep(0.05)
+        release.set()
+        leader.join(2)
+        follower.join(2)
+
+        self.assertEqual(fetches, [])
+        self.assertEqual(result, {'name': 'aspirin'})
+        self.assertEqual(other.get_stats()['cross_process_hits'], 1)
@@ -0,0 +1,38 @@
+"""Tests for api/table_counts.py - stored counts and counted-on-read tables"""
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from api.models import Medicine, PrescriptionHistory, TableCount
+from api.table_counts import table_counter
+
+
+class TableCountTests(TestCase):
+    def setUp(self):
+        table_counter.clear_memo()
+        self.addCleanup(table_counter.clear_memo)
+
+    def test_medicine_inserts_and_deletes_adjust_the_stored_row(self):
+        self.assertEqual(table_counter.get(Medicine), 0)
+        medicine = Medicine.objects.create(name='Warfarin')
+        self.assertEqual(TableCount.objects.get(table='api.Medicine').count, 1)
+        self.assertEqual(table_counter.get(Medicine), 1)
+        medicine.delete()
+        self.assertEqual(table_counter.get(Medicine), 0)
+
+    def test_prescription_inserts_touch_no_counter_row(self):
+        user = User.objects.create_user('counts', password='x')
+        self.assertEqual(table_counter.get(PrescriptionHistory), 0)
+        PrescriptionHistory.objects.create(user=user, prescription_text='Rx', processing_method='ocr')
+        self.assertFalse(TableCount.objects.filter(table='api.PrescriptionHistory').exists())
+        # Counted on read once the memo expires
+        self.assertEqual(table_counter.get(PrescriptionHistory), 0)
+        table_counter.clear_memo()
+        self.assertEqual(table_counter.get(PrescriptionHistory), 1)
+
+    def test_refresh_stores_only_signal_counted_tables(self):
+        counts = table_counter.refresh()
+        self.assertEqual(set(counts), {'api.Medicine', 'api.MedicalKnowledge'})
+        self.assertEqual(
+            set(TableCount.objects.values_list('table', flat=True)),
+            {'api.Medicine', 'api.MedicalKnowledge'},
+        )
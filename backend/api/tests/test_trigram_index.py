@@ -0,0 +1,74 @@
+"""
+Tests for api/trigram_index.py - Suggestions never replace look-alike drugs
+"""
+
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from api.enhanced_drug_interactions import EnhancedDrugInteractionChecker
+from api.trigram_index import TrigramIndex, did_you_mean
+
+# Look-alike/sound-alike pairs (ISMP confused drug names) plus a typo target
+TERMS = {name: name for name in (
+    'prednisone', 'prednisolone', 'tretinoin', 'isotretinoin',
+    'hydralazine', 'hydroxyzine', 'amoxicillin',
+)}
+LOOK_ALIKES = [('prednisolone', 'prednisone'), ('tretinoin', 'isotretinoin'),
+               ('hydralazine', 'hydroxyzine')]
+
+
+class TrigramSuggestionTests(SimpleTestCase):
+
+    def setUp(self):
+        self.index = TrigramIndex(TERMS)
+
+    def test_exact_name_ranks_above_its_look_alike(self):
+        for name, look_alike in LOOK_ALIKES:
+            suggestions = self.index.suggest(name)
+            self.assertEqual(suggestions[0]['name'], name)
+            self.assertEqual(suggestions[0]['score'], 1.0)
+
+    def test_typo_is_suggested(self):
+        self.assertEqual(self.index.suggest('amoxicilin')[0]['name'], 'amoxicillin')
+
+    def test_did_you_mean_is_empty_for_known_names(self):
+        with mock.patch('api.trigram_index.medicine_trigram_index', self.index), \
+                mock.patch('api.trigram_index.drug_normalizer') as normalizer:
+            normalizer.normalize.side_effect = lambda name: name.lower()
+            normalizer.known = set(TERMS)
+            for name, _ in LOOK_ALIKES:
+                self.assertEqual(did_you_mean(name), [])
+            self.assertEqual(did_you_mean('amoxicilin')[0]['name'], 'amoxicillin')
+
+
+class MedicineInfoLookAlikeTests(SimpleTestCase):
+
+    def setUp(self):
+        self.checker = EnhancedDrugInteractionChecker()
+        self.checker.openfda_client = mock.Mock()
+        self.checker.rxnorm_client = mock.Mock()
+        self.checker.rxnorm_client.standardize_drug_name_with_error.side_effect = (
+            lambda name: (name, None, {'error': 'No RxNorm concepts found', 'error_type': 'not_found'}))
+        self.checker.openfda_client.get_drug_info.side_effect = (
+            lambda name: {'drug_name': name, 'error': 'No data', 'error_type': 'not_found'})
+
+    def test_unresolved_look_alike_is_queried_as_given(self):
+        with mock.patch('api.enhanced_drug_interactions.did_you_mean',
+                        return_value=[{'name': 'prednisone', 'ingredient': 'prednisone', 'score': 0.714}]):
+            info = self.checker.get_medicine_info('prednisolone')
+
+        self.checker.openfda_client.get_drug_info.assert_called_once_with('prednisolone')
+        self.checker.rxnorm_client.standardize_drug_name_with_error.assert_called_once_with('prednisolone')
+        self.assertEqual(info['standardized_name'], 'prednisolone')
+        self.assertEqual(info['did_you_mean'], ['prednisone'])
+
+    def test_resolved_name_gets_no_suggestions(self):
+        self.checker.rxnorm_client.standardize_drug_name_with_error.side_effect = (
+            lambda name: ('hydralazine', '5470', None))
+        self.checker.openfda_client.get_drug_info.side_effect = lambda name: {'drug_name': name}
+        with mock.patch('api.enhanced_drug_interactions.did_you_mean') as suggest:
+            info = self.checker.get_medicine_info('hydralazine')
+        suggest.assert_not_called()
+        self.assertNotIn('did_you_mean', info)
+        self.assertEqual(info['rxcui'], '5470')
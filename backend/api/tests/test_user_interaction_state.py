@@ -0,0 +1,111 @@
+"""
+Tests for api/user_interaction_state.py - Incremental standing medication checks
+"""
+
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from api.models import UserInteractionState, UserProfile
+from api.user_interaction_state import user_interaction_tracker
+
+
+def _local_report(medicines):
+    interactions = []
+    if {'warfarin', 'aspirin'} <= set(medicines):
+        interactions.append({'drugs': ['warfarin', 'aspirin'], 'severity': 'HIGH'})
+    return {'status': 'success', 'interactions': interactions}
+
+
+def _external_report(pairs):
+    interactions = []
+    if ('ibuprofen', 'warfarin') in pairs:
+        interactions.append({'drug1': 'ibuprofen', 'drug2': 'warfarin', 'severity': 'HIGH', 'source': 'OpenFDA'})
+    return {'status': 'success', 'interactions': interactions, 'degraded': False, 'degraded_lookups': []}
+
+
+class UserInteractionTrackerTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('patient', password='secret-pass')
+        self.profile = UserProfile.objects.create(user=self.user, medications=['Warfarin', 'Metformin'])
+        patcher = mock.patch('api.user_interaction_state.interaction_checker.check_interactions',
+                             side_effect=_local_report)
+        self.local = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch('api.enhanced_drug_interactions.enhanced_interaction_checker.check_pairs',
+                             side_effect=_external_report)
+        self.check = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_sync_checks_only_the_added_pairs(self):
+        user_interaction_tracker.sync(self.user)
+        self.profile.medications = ['Warfarin', 'Metformin', 'Aspirin', 'Ibuprofen']
+        self.profile.save()
+        self.check.reset_mock()
+        self.local.reset_mock()
+
+        summary = user_interaction_tracker.sync(self.user)
+
+        self.assertEqual(summary['pairs_checked'], 5)
+        self.assertEqual(self.check.call_count, 1)
+        self.assertEqual(len(self.check.call_args[0][0]), 5)
+        self.assertNotIn(('metformin', 'warfarin'), self.check.call_args[0][0])
+        self.assertEqual(self.local.call_count, 5)
+        state = UserInteractionState.objects.get(user=self.user)
+        self.assertEqual(sorted(f['pair'] for f in state.findings),
+                         [['aspirin', 'warfarin'], ['ibuprofen', 'warfarin']])
+
+    def test_degraded_lookups_leave_their_pairs_unchecked(self):
+        self.profile.medications = ['Warfarin', 'Metformin', 'Ibuprofen']
+        self.profile.save()
+        self.check.side_effect = lambda pairs: {
+            'status': 'success', 'interactions': [], 'degraded': True,
+            'degraded_lookups': [{'source': 'OpenFDA', 'drug': 'ibuprofen', 'error_type': 'rate_limited'}],
+        }
+        self.assertEqual(user_interaction_tracker.sync(self.user)['pairs_checked'], 1)
+        self.assertEqual(UserInteractionState.objects.get(user=self.user).checked_pairs, ['metformin|warfarin'])
+
+        self.check.side_effect = _external_report
+        self.assertEqual(user_interaction_tracker.sync(self.user)['pairs_checked'], 2)
+        state = UserInteractionState.objects.get(user=self.user)
+        self.assertEqual([f['pair'] for f in state.findings], [['ibuprofen', 'warfarin']])
+
+    def test_removed_drug_drops_its_findings(self):
+        self.profile.medications = ['Warfarin', 'Aspirin']
+        self.profile.save()
+        user_interaction_tracker.sync(self.user)
+        self.profile.medications = ['Aspirin']
+        self.profile.save()
+        user_interaction_tracker.sync(self.user)
+        self.assertEqual(UserInteractionState.objects.get(user=self.user).findings, [])
+
+    def test_failed_check_leaves_pairs_unchecked(self):
+        self.check.side_effect = lambda pairs: {'status': 'error'}
+        user_interaction_tracker.sync(self.user)
+        self.assertEqual(UserInteractionState.objects.get(user=self.user).checked_pairs, [])
+        self.check.side_effect = _external_report
+        self.assertEqual(user_interaction_tracker.sync(self.user)['pairs_checked'], 1)
+
+    def test_get_state_does_not_write(self):
+        state = user_interaction_tracker.get_state(self.user)
+        self.assertFalse(state['up_to_date'])
+        self.assertFalse(UserInteractionState.objects.filter(user=self.user).exists())
+        self.check.assert_not_called()
+
+        user_interaction_tracker.sync(self.user)
+        self.assertTrue(user_interaction_tracker.get_state(self.user)['up_to_date'])
+        self.profile.medications = ['Warfarin', 'Metformin', 'Aspirin']
+        self.profile.save()
+        self.assertFalse(user_interaction_tracker.get_state(self.user)['up_to_date'])
+
+    def test_new_prescription_is_checked_against_standing_drugs_once(self):
+        user_interaction_tracker.sync(self.user)
+        self.check.reset_mock()
+
+        result = user_interaction_tracker.check_new_prescription(self.user, ['Aspirin 81mg', 'Ibuprofen'])
+
+        self.assertEqual(self.check.call_count, 1)
+        self.assertEqual(result['pairs_checked'], 4)
+        self.assertEqual(result['interactions_found'], 2)
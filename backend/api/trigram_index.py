@@ -0,0 +1,161 @@
+"""
+============================================================================
+TRIGRAM INDEX - Typo-Tolerant Medicine Name Resolution
+============================================================================
+
+Exact lookups miss misspelled names ("amoxicilin", "metfromin"), and the
+fallbacks behind them (database scans, regex vocabularies, external API
+queries) miss too. This file keeps an in-memory character-trigram index
+over every medicine name, brand name and synonym known to the drug name
+normalizer and returns the closest names by trigram similarity.
+
+How it works:
+- Each term is padded ("  name ") and split into character trigrams
+- An inverted index maps each trigram to the terms that contain it
+- A query counts shared trigrams per term over the posting lists of its
+  own trigrams only, then scores with Jaccard similarity:
+  shared / (query trigrams + term trigrams - shared)
+
+Suggestions only:
+- Look-alike/sound-alike drugs score high on trigram similarity
+  (prednisolone/prednisone 0.71, tretinoin/isotretinoin 0.53,
+  hydralazine/hydroxyzine 0.41), so a close name is never substituted
+  for the one given; it is offered for the user to confirm
+- suggest() - Top-k similar names with their canonical ingredient IDs
+- did_you_mean() - Suggestions for a name the normalizer does not know
+
+Used by:
+- api/views.py: suggest_medicines() - GET /api/medicines/suggest/
+- api/enhanced_drug_interactions.py: get_medicine_info() - did_you_mean
+  when neither OpenFDA nor RxNorm resolves the name
+============================================================================
+"""
+
+import heapq
+import logging
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Set
+
+from .drug_normalizer import drug_normalizer, clean_drug_name
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SUGGESTIONS = 5
+MIN_SUGGEST_SCORE = 0.3
+
+
+def trigrams(text: str) -> Set[str]:
+    """Character trigrams of a cleaned name, padded like pg_trgm"""
+    text = f"  {text} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """
+    In-memory trigram index over medicine names.
+
+    Singleton Pattern:
+    - Instance created: medicine_trigram_index = TrigramIndex()
+    - Built on first use from the drug name normalizer's tables
+
+    Main Methods:
+    - suggest() - Top-k candidates by similarity
+    - rebuild() - Re-read the names (after the medicine data changed)
+    """
+
+    def __init__(self, terms: Optional[Dict[str, str]] = None):
+        self._source_terms = terms
+        self._lock = threading.Lock()
+        self._built = False
+        self.terms = []        # term id -> name
+        self.ingredients = []  # term id -> canonical ingredient ID
+        self.sizes = []        # term id -> number of trigrams
+        self.postings = {}     # trigram -> term ids
+
+    def _collect_terms(self) -> Dict[str, str]:
+        """Name -> canonical ingredient ID for every known name"""
+        if self._source_terms is not None:
+            return {clean_drug_name(term): ingredient for term, ingredient in self._source_terms.items()}
+        drug_normalizer.ensure_loaded()
+        terms = {name: name for name in drug_normalizer.known}
+        terms.update(drug_normalizer.aliases)
+        return terms
+
+    def _build(self):
+        terms, ingredients, sizes, postings = [], [], [], {}
+        for term, ingredient in sorted(self._collect_terms().items()):
+            if not term:
+                continue
+            term_id = len(terms)
+            grams = trigrams(term)
+            terms.append(term)
+            ingredients.append(ingredient)
+            sizes.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(term_id)
+        self.terms, self.ingredients, self.sizes, self.postings = terms, ingredients, sizes, postings
+        logger.info(f"Trigram index: {len(terms)} names, {len(postings)} trigrams")
+
+    def _ensure_built(self):
+        if self._built:
+            return
+        with self._lock:
+            if not self._built:
+                self._build()
+                self._built = True
+
+    def rebuild(self):
+        with self._lock:
+            self._build()
+            self._built = True
+
+    def suggest(self, query: str, limit: int = DEFAULT_SUGGESTIONS,
+                min_score: float = MIN_SUGGEST_SCORE) -> List[Dict]:
+        """
+        Most similar names for a (possibly misspelled) query, best first.
+
+        Returns:
+        - [{'name', 'ingredient', 'score'}, ...]
+        """
+        self._ensure_built()
+        query = clean_drug_name(query or '')
+        if not query:
+            return []
+        query_grams = trigrams(query)
+
+        shared = Counter()
+        for gram in query_grams:
+            postings = self.postings.get(gram)
+            if postings:
+                shared.update(postings)
+
+        query_size = len(query_grams)
+        scored = (
+            (count / (query_size + self.sizes[term_id] - count), term_id)
+            for term_id, count in shared.items()
+        )
+        best = heapq.nlargest(limit, (item for item in scored if item[0] >= min_score),
+                              key=lambda item: (item[0], -item[1]))
+        return [
+            {'name': self.terms[term_id], 'ingredient': self.ingredients[term_id], 'score': round(score, 3)}
+            for score, term_id in best
+        ]
+
+    def get_stats(self) -> Dict:
+        return {'built': self._built, 'names': len(self.terms), 'trigrams': len(self.postings)}
+
+# Global instance
+medicine_trigram_index = TrigramIndex()
+
+
+def did_you_mean(name: str, limit: int = 3) -> List[Dict]:
+    """
+    Suggestions for a name the normalizer does not know ([] for known
+    names), for the caller to confirm - never to replace the name
+    """
+    drug_id = drug_normalizer.normalize(name or '')
+    if not drug_id or drug_id in drug_normalizer.known:
+        return []
+    return [suggestion for suggestion in medicine_trigram_index.suggest(name, limit=limit + 1)
+            if suggestion['ingredient'] != drug_id][:limit]
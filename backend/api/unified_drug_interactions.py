@@ -11,6 +11,7 @@ Strategy:
 2. Run Enhanced Checker second (comprehensive, online APIs)
 3. Merge and prioritize results
 4. Return unified safety report
+5. Cache the report per medication set (interaction_result_cache.py)
 
 Benefits:
 - Maximum safety coverage (both local + online data)
@@ -29,6 +30,7 @@ Performance:
 - Enhanced checker: ~500ms-2s (API calls)
 - Total time: ~550ms-2s (acceptable for safety)
 - Caching reduces repeated API calls
+- Repeated medication sets are answered from the result cache
 
 Data Sources Combined:
 1. Local Database (DrugBank) - Basic checker
@@ -50,6 +52,8 @@ from typing import List, Dict, Optional
 from datetime import datetime
 from .drug_interactions import interaction_checker as basic_checker
 from .enhanced_drug_interactions import enhanced_interaction_checker
+from .drug_normalizer import canonical_drug_id
+from .interaction_result_cache import interaction_result_cache, medication_set_key
 
 class UnifiedDrugInteractionChecker:
     """
@@ -92,6 +96,14 @@ class UnifiedDrugInteractionChecker:
         try:
             logging.info(f"Starting unified drug interaction check for {len(medicines)} medicines")
             
+            # Step 0: Reuse the report for this medication set if its data is unchanged
+            medication_set = medication_set_key(medicines)
+            data_version = self._data_version(medicines)
+            if data_version is not None:
+                cached = interaction_result_cache.get(medication_set, data_version)
+                if cached is not None:
+                    return self._reuse_report(cached, medicines)
+            
             # Step 1: Run basic checker first (fast, reliable)
             basic_results = self._run_basic_checker(medicines)
             
@@ -106,17 +118,38 @@ class UnifiedDrugInteractionChecker:
             
             # Step 5: Generate unified recommendations
             unified_results['recommendations'] = self._generate_unified_recommendations(unified_results)
+            if enhanced_results.get('degraded'):
+                unified_results['recommendations'].insert(0, (
+                    "⚠️ Some FDA/RxNorm data could not be loaded right now (rate limited or unavailable); "
+                    "this report may be incomplete. Check again in a minute."
+                ))
             
             # Step 6: Add metadata
             unified_results.update({
                 'checker_used': 'Unified (Basic + Enhanced)',
                 'basic_checker_status': basic_results.get('status', 'unknown'),
                 'enhanced_checker_status': enhanced_results.get('status', 'unknown'),
+                # Some OpenFDA/RxNorm lookups failed (rate limited, circuit open,
+                # transient): the report lacks their findings
+                'degraded': bool(enhanced_results.get('degraded')),
+                'degraded_lookups': enhanced_results.get('degraded_lookups', []),
+                'retry_scheduled': bool(enhanced_results.get('retry_scheduled')),
                 'total_sources': len(set([i.get('source', 'Unknown') for i in unified_results.get('interactions', [])])),
                 'timestamp': datetime.now().isoformat()
             })
             
             logging.info(f"Unified check completed: {unified_results['interactions_found']} interactions found")
+            
+            # Step 7: Cache complete reports only (a failed checker or a degraded
+            # lookup is retried next time), versioned on the entries as they are
+            # now that the checks fetched them
+            unified_results['result_cache'] = 'miss'
+            data_version = self._data_version(medicines)
+            if (data_version is not None and unified_results.get('status') == 'success'
+                    and basic_results.get('status') == 'success'
+                    and enhanced_results.get('status') == 'success'
+                    and not unified_results['degraded']):
+                interaction_result_cache.put(medication_set, data_version, unified_results)
             return unified_results
             
         except Exception as e:
@@ -132,6 +165,34 @@ class UnifiedDrugInteractionChecker:
                 'timestamp': datetime.now().isoformat()
             }
     
+    def _data_version(self, medicines: List[str]) -> Optional[tuple]:
+        """
+        Version of the data behind a report for these medicines: the local
+        interaction database plus the stamps of the OpenFDA/RxNorm cache
+        entries the enhanced checker reads for them. Fetches for other
+        medicines don't change it. None disables result caching.
+        """
+        try:
+            return (self.basic_checker.data_version, self.enhanced_checker.data_stamp(medicines))
+        except Exception as e:
+            logging.warning(f"Could not read interaction data version: {e}")
+            return None
+    
+    def _reuse_report(self, report: Dict, medicines: List[str]) -> Dict:
+        """
+        Adapt a cached report to this request: the caller's own spelling of
+        each drug name, the medicine count and a fresh timestamp
+        """
+        names = {canonical_drug_id(medicine): medicine for medicine in medicines if medicine}
+        for interaction in report.get('interactions', []):
+            for field in ('drug1', 'drug2', 'medicine1', 'medicine2'):
+                if isinstance(interaction.get(field), str):
+                    interaction[field] = names.get(canonical_drug_id(interaction[field]), interaction[field])
+        report['total_medicines'] = len(medicines)
+        report['timestamp'] = datetime.now().isoformat()
+        report['result_cache'] = 'hit'
+        return report
+    
     def _run_basic_checker(self, medicines: List[str]) -> Dict:
         """
         Run basic drug interaction checker (fast, local database)
@@ -168,11 +168,20 @@ urlpatterns = [
     path('interactions/enhanced/medicine/<str:medicine_name>/', views.get_medicine_info_enhanced, name='get_medicine_info_enhanced'),
     
     # Bulk download medicine data for caching
+    # POST /api/interactions/enhanced/bulk-download/ -> 202 {job_id}
     path('interactions/enhanced/bulk-download/', views.bulk_download_medicine_data, name='bulk_download_medicine_data'),
     
+    # Bulk download job status
+    # GET /api/interactions/enhanced/bulk-download/<job_id>/
+    path('interactions/enhanced/bulk-download/<str:job_id>/', views.get_bulk_download_status, name='get_bulk_download_status'),
+    
     # Get cache statistics
     path('interactions/enhanced/cache-stats/', views.get_cache_stats, name='get_cache_stats'),
     
+    # Get external API transport state (pools, rate limits, circuit breakers)
+    # GET /api/interactions/enhanced/transport-stats/
+    path('interactions/enhanced/transport-stats/', views.get_transport_stats, name='get_transport_stats'),
+    
     # Enhanced prescription analysis with OpenFDA
     path('prescription/analyze-enhanced/', views.analyze_prescription_enhanced, name='analyze_prescription_enhanced'),
     
@@ -192,6 +201,11 @@ urlpatterns = [
     # Get all known interactions for a medicine
     path('interactions/medicine/<str:medicine_name>/', views.get_medicine_interactions, name='get_medicine_interactions'),
     
+    # Interactions among the user's standing medications (profile + active reminders)
+    # GET /api/interactions/user-state/
+    # Returns: Checked pairs and findings, updated incrementally
+    path('interactions/user-state/', views.get_user_interaction_state, name='get_user_interaction_state'),
+    
     # Get specific interaction between two medicines
     path('interactions/<str:medicine1>/<str:medicine2>/', views.get_interaction_details, name='get_interaction_details'),
     
@@ -200,8 +214,9 @@ urlpatterns = [
     # ========================================================================
     
     # Search medical terms and conditions
-    # GET /api/medical-knowledge/search/?query=diabetes
-    # Returns: List of matching medical terms with explanations
+    # GET /api/medical-knowledge/search/?query=diabetes&limit=20&cursor=<next_cursor>
+    # Returns: Matching medical terms ranked by relevance, with highlighted snippets,
+    #          plus next_cursor for the following page (null on the last page)
     # Called by: Flutter MedicalKnowledgeScreen
     path('medical-knowledge/search/', views.search_medical_knowledge, name='search_medical_knowledge'),
     
@@ -225,6 +240,24 @@ urlpatterns = [
     # Called by: Flutter MedicineSearchScreen
     path('medicines/search/', views.search_medicines, name='search_medicines'),
     
+    # Prefix completions for the search box (prebuilt trie, no database query)
+    # GET /api/medicines/autocomplete/?query=asp&limit=10
+    # Returns: [{id, name, matched, popularity}] most prescribed first
+    # Not yet used by the app
+    path('medicines/autocomplete/', views.autocomplete_medicines, name='autocomplete_medicines'),
+    
+    # Typo-tolerant name suggestions (trigram similarity)
+    # GET /api/medicines/suggest/?query=amoxicilin&limit=5
+    # Returns: [{name, ingredient, score}] best first
+    # Not yet used by the app
+    path('medicines/suggest/', views.suggest_medicines, name='suggest_medicines'),
+    
+    # Details for many medicines in one request (one database query)
+    # POST /api/medicines/batch/ {"medicines": ["Advil", "metformin 500mg"]}
+    # Returns: [{query, id, name, generic_name, ...}] plus not_found names
+    # Not yet used by the app
+    path('medicines/batch/', views.batch_medicine_info, name='batch_medicine_info'),
+    
     # ========================================================================
     # NOTIFICATION ENDPOINTS (Day 16 Feature)
     # ========================================================================
@@ -0,0 +1,310 @@
+"""
+============================================================================
+USER INTERACTION STATE - Incremental Checks Against Standing Medications
+============================================================================
+
+This file keeps, per user, the drug pairs of their standing medication list
+(UserProfile.medications + active reminders) that have already been checked
+for interactions and what was found (UserInteractionState model).
+
+Why incremental:
+- Re-checking a whole medication list redoes every pair on each change
+- Adding one drug to n standing drugs only needs n new pair checks
+- Removing a drug only drops the pairs and findings that involve it
+- A new prescription only checks its new drugs × the standing drugs
+  (new × new pairs are covered by the prescription's own unified check)
+
+Pair Checks:
+- Only the pairs still to check are evaluated: the local interaction
+  database per pair, and OpenFDA/RxNorm through ONE
+  enhanced_interaction_checker.check_pairs() call that looks each drug up
+  once (a full check of the drugs involved would evaluate every pair of
+  them and never hit the result cache, since the set is new)
+- Findings are assigned to pairs by canonical drug ID (combination
+  products by ingredient), one finding per pair
+- Drugs are keyed by canonical drug ID (drug_normalizer.canonical_drug_id)
+- Pairs whose lookups were degraded (rate limited, circuit open,
+  transient) are not marked checked, so the next sync retries them
+- A changed local interaction database version re-checks every pair
+
+Concurrency:
+- The check runs before any row lock is taken (it may call external APIs)
+- The results are merged inside transaction.atomic() with the state row
+  locked (select_for_update), against the state as it is then, so
+  concurrent syncs for one user never overwrite each other
+- get_state() only reads; a state that is behind is reported as
+  up_to_date=False until the next sync
+
+Used by:
+- api/auth_views.py: update_user_profile() - sync() after medication edits
+- api/views.py: create/update/delete_reminder() - sync() after changes
+- api/views.py: analyze_prescription() - check_new_prescription()
+- api/views.py: get_user_interaction_state() - Current findings
+============================================================================
+"""
+
+import logging
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .drug_interactions import interaction_checker
+from .drug_normalizer import canonical_drug_id, drug_normalizer
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_PRIORITY = {'HIGH': 3, 'MEDIUM': 2, 'LOW': 1, 'INFO': 0, 'UNKNOWN': 0}
+
+
+def pair_key(drug_a: str, drug_b: str) -> str:
+    """Order-independent key for a drug pair"""
+    return '|'.join(sorted((drug_a, drug_b)))
+
+
+def _interaction_drug_ids(interaction: Dict) -> Optional[Tuple[str, str]]:
+    """Canonical IDs of the two drugs a unified check finding is about"""
+    names = interaction.get('drugs') or [
+        interaction.get('drug1') or interaction.get('medicine1'),
+        interaction.get('drug2') or interaction.get('medicine2'),
+    ]
+    if len(names) != 2 or not all(isinstance(name, str) and name for name in names):
+        return None
+    return canonical_drug_id(names[0]), canonical_drug_id(names[1])
+
+
+def _overall_risk(findings: List[Dict]) -> str:
+    if not findings:
+        return 'NONE'
+    return max((finding.get('severity', 'UNKNOWN') for finding in findings),
+               key=lambda severity: SEVERITY_PRIORITY.get(severity, 0))
+
+
+class UserInteractionTracker:
+    """
+    Maintains UserInteractionState rows incrementally.
+
+    Singleton Pattern:
+    - Instance created: user_interaction_tracker = UserInteractionTracker()
+
+    Main Methods:
+    - standing_medications() - Current profile + reminder medications
+    - sync() - Bring a user's state in line with their standing medications
+    - check_new_prescription() - Check new drugs against standing drugs
+    - get_state() - Serializable view of a user's state
+    """
+
+    def standing_medications(self, user) -> Dict[str, str]:
+        """Canonical drug ID -> display name for profile meds and active reminders"""
+        from .models import MedicationReminder, UserProfile
+
+        names = []
+        profile = UserProfile.objects.filter(user=user).only('medications').first()
+        if profile and isinstance(profile.medications, list):
+            for medication in profile.medications:
+                name = medication.get('name', '') if isinstance(medication, dict) else medication
+                if isinstance(name, str):
+                    names.append(name)
+        names.extend(
+            MedicationReminder.objects.filter(user=user, active=True)
+            .values_list('medicine_name', flat=True)
+        )
+
+        medications = {}
+        for name in names:
+            drug_id = canonical_drug_id(name or '')
+            if drug_id:
+                medications.setdefault(drug_id, name.strip())
+        return medications
+
+    def _check_pairs(self, pairs: Iterable[Tuple[str, str]]) -> Tuple[List[str], List[Dict]]:
+        """
+        Check exactly the given pairs: the local database per pair, and
+        OpenFDA/RxNorm for those pairs only (each drug looked up once).
+        Returns (checked pair keys, findings of those pairs); pairs whose
+        check failed or was degraded (a lookup rate limited, circuit open or
+        transient) don't count as checked, so the next sync retries them.
+        """
+        from .enhanced_drug_interactions import enhanced_interaction_checker
+
+        wanted = {pair_key(drug_a, drug_b) for drug_a, drug_b in pairs}
+        if not wanted:
+            return [], []
+        drugs = sorted({drug for key in wanted for drug in key.split('|')})
+
+        unchecked = set()
+        interactions = []
+        for key in sorted(wanted):
+            results = interaction_checker.check_interactions(key.split('|'))
+            if results.get('status') != 'success':
+                logger.warning(f"Local interaction check failed for {key}")
+                unchecked.add(key)
+                continue
+            for interaction in results.get('interactions', []):
+                interaction['source'] = 'Local Database (DrugBank)'
+                interactions.append(interaction)
+
+        external = enhanced_interaction_checker.check_pairs([tuple(key.split('|')) for key in sorted(wanted)])
+        failed_drugs = {lookup.get('drug') for lookup in external.get('degraded_lookups', [])}
+        if external.get('status') != 'success' or None in failed_drugs:
+            logger.warning(f"External interaction check failed for {', '.join(drugs)}")
+            unchecked = set(wanted)
+        else:
+            unchecked |= {key for key in wanted if failed_drugs & set(key.split('|'))}
+        interactions.extend(external.get('interactions', []))
+
+        # Canonical/ingredient ID -> the checked drugs it belongs to
+        owners = {}
+        for drug in drugs:
+            for drug_id in [drug] + drug_normalizer.ingredients(drug):
+                owners.setdefault(drug_id, set()).add(drug)
+
+        # One finding per pair: the local database's, else the first external one
+        findings = {}
+        for interaction in interactions:
+            drug_ids = _interaction_drug_ids(interaction)
+            if drug_ids is None:
+                continue
+            keys = {
+                pair_key(drug_a, drug_b)
+                for drug_a in owners.get(drug_ids[0], ())
+                for drug_b in owners.get(drug_ids[1], ())
+                if drug_a != drug_b
+            } & (wanted - unchecked)
+            for key in sorted(keys):
+                if key in findings:
+                    sources = findings[key].setdefault('sources', [findings[key].get('source', 'Unknown')])
+                    if interaction.get('source') not in sources:
+                        sources.append(interaction.get('source', 'Unknown'))
+                    continue
+                finding = dict(interaction)
+                finding['pair'] = key.split('|')
+                findings[key] = finding
+        return sorted(wanted - unchecked), list(findings.values())
+
+    def _sync_state(self, user):
+        """Bring the stored state in line with the standing medications"""
+        from django.db import transaction
+        from .models import UserInteractionState
+
+        # Pairs still to check, from an unlocked read; checked before locking
+        data_version = interaction_checker.data_version
+        stored = UserInteractionState.objects.filter(user=user).first()
+        checked_before = set()
+        if stored is not None and stored.data_version == data_version:
+            checked_before = set(stored.checked_pairs)
+        current = self.standing_medications(user)
+        pairs = [
+            (drug_a, drug_b) for drug_a, drug_b in combinations(sorted(current), 2)
+            if pair_key(drug_a, drug_b) not in checked_before
+        ]
+        checked, new_findings = self._check_pairs(pairs)
+
+        with transaction.atomic():
+            _, changed = UserInteractionState.objects.get_or_create(user=user)
+            state = UserInteractionState.objects.select_for_update().get(user=user)
+            if state.data_version != data_version:
+                # Checked against an older interaction database: start over
+                state.medications, state.checked_pairs, state.findings = {}, [], []
+                state.data_version = data_version
+                changed = True
+
+            # Medications may have changed while the check ran: re-read them
+            current = self.standing_medications(user)
+            previous = state.medications or {}
+            removed = set(previous) - set(current)
+            added = set(current) - set(previous)
+
+            checked_pairs = set(state.checked_pairs)
+            findings = state.findings
+            if removed:
+                checked_pairs = {key for key in checked_pairs if not removed & set(key.split('|'))}
+                findings = [f for f in findings if not removed & set(f.get('pair', []))]
+
+            # Keep results for pairs still standing and not merged by a concurrent sync
+            fresh = {key for key in checked if key not in checked_pairs and set(key.split('|')) <= set(current)}
+            findings = findings + [f for f in new_findings if pair_key(*f['pair']) in fresh]
+
+            if changed or added or removed or fresh or current != previous:
+                checked_pairs.update(fresh)
+                findings.sort(key=lambda f: SEVERITY_PRIORITY.get(f.get('severity'), 0), reverse=True)
+                state.medications = current
+                state.checked_pairs = sorted(checked_pairs)
+                state.findings = findings
+                state.save()
+                logger.info(
+                    f"Interaction state for {user.username}: +{len(added)} -{len(removed)} medications, "
+                    f"{len(fresh)} pairs checked"
+                )
+        return state, {'added': sorted(added), 'removed': sorted(removed), 'pairs_checked': len(fresh)}
+
+    def sync(self, user) -> Dict:
+        """
+        Update the user's state after their standing medications changed.
+        Only pairs involving added drugs are checked; pairs involving
+        removed drugs are dropped. Nothing is written when nothing changed.
+        """
+        _, summary = self._sync_state(user)
+        return summary
+
+    def check_new_prescription(self, user, medicine_names: List[str]) -> Dict:
+        """
+        Interactions between a prescription and the user's standing list.
+
+        New drugs are checked against every standing drug; drugs already on
+        the standing list reuse the stored findings. The prescription does
+        not change the standing list.
+        """
+        state, _ = self._sync_state(user)
+
+        standing = set(state.medications)
+        prescribed = {canonical_drug_id(name) for name in medicine_names if name}
+        prescribed.discard('')
+        new_drugs = prescribed - standing
+        already_standing = prescribed & standing
+
+        pairs = [(new, existing) for new in sorted(new_drugs) for existing in sorted(standing)]
+        _, findings = self._check_pairs(pairs)
+        findings += [f for f in state.findings if already_standing & set(f.get('pair', []))]
+        findings.sort(key=lambda f: SEVERITY_PRIORITY.get(f.get('severity'), 0), reverse=True)
+
+        return {
+            'standing_medications': sorted(state.medications.values()),
+            'new_medicines': sorted(new_drugs),
+            'pairs_checked': len(pairs),
+            'interactions_found': len(findings),
+            'overall_risk_level': _overall_risk(findings),
+            'interactions': findings,
+        }
+
+    def get_state(self, user) -> Dict:
+        """
+        Serializable view of the user's stored interaction state (read only).
+        up_to_date is False while the standing medications or the
+        interaction database have changed since the last sync.
+        """
+        from .models import UserInteractionState
+
+        state = UserInteractionState.objects.filter(user=user).first()
+        current = self.standing_medications(user)
+        if state is None or state.data_version != interaction_checker.data_version:
+            return {
+                'medications': current,
+                'checked_pairs': 0,
+                'interactions_found': 0,
+                'overall_risk_level': 'UNKNOWN' if len(current) > 1 else 'NONE',
+                'interactions': [],
+                'up_to_date': len(current) < 2,
+                'updated_at': state.updated_at.isoformat() if state else None,
+            }
+        total_pairs = len(current) * (len(current) - 1) // 2
+        return {
+            'medications': state.medications,
+            'checked_pairs': len(state.checked_pairs),
+            'interactions_found': len(state.findings),
+            'overall_risk_level': _overall_risk(state.findings),
+            'interactions': state.findings,
+            'up_to_date': state.medications == current and len(state.checked_pairs) == total_pairs,
+            'updated_at': state.updated_at.isoformat(),
+        }
+
+# Global instance
+user_interaction_tracker = UserInteractionTracker()
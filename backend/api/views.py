@@ -22,6 +22,8 @@ Key Endpoints in this file:
 - trigger_reminder_notifications() - Check and notify due reminders
 - get_prescription_history() - View past analyses
 - search_medicines() - Search medicine database
+- autocomplete_medicines() - Prefix completions for the search box
+- suggest_medicines() - Typo-tolerant name suggestions
 - search_medical_knowledge() - Search medical terms
 
 Helper Modules Used:
@@ -49,9 +51,10 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
+import copy
 import json
 import logging
-import re
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 from django.utils import timezone
@@ -60,6 +63,21 @@ from django.utils import timezone
 from .nlp_processor import extract_medicine_info, processor           # Rule-based extraction
 from .biobert_processor import BioBERTProcessor                        # AI extraction
 from .unified_drug_interactions import unified_interaction_checker     # Unified checking (Both systems)
+from .drug_interactions import interaction_checker                     # Basic checking (Local database)
+from .enhanced_drug_interactions import enhanced_interaction_checker   # Enhanced checking (OpenFDA + RxNorm)
+from .http_transport import http_transport                             # External API connection/circuit state
+from .prefetch import enqueue_prefetch, get_prefetch_job               # Background bulk downloads
+from .user_interaction_state import user_interaction_tracker            # Per-user standing medication checks
+from .drug_normalizer import drug_normalizer                           # Shared medicine name resolution
+from .trigram_index import medicine_trigram_index  # Typo-tolerant name suggestions
+from .medicine_autocomplete import medicine_autocomplete                  # Prefix trie for the search box
+from .medicine_autocomplete import DEFAULT_LIMIT as AUTOCOMPLETE_DEFAULT_LIMIT, MAX_LIMIT as AUTOCOMPLETE_MAX_LIMIT
+from .knowledge_search import knowledge_search_index, MAX_COUNTED_MATCHES  # Full-text medical knowledge search
+from .medicine_lookup import find_medicine, find_medicines               # Indexed Medicine lookup by name
+from .search_pagination import (                                       # Keyset pages and cursor tokens
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, encode_cursor, keyset_page, rank_position,
+)
+from .table_counts import table_counter                                   # Cached table sizes
 from .database_views import (                                          # Database operations
     analyze_prescription_with_safety as db_analyze_prescription,
     create_medication_reminder as db_create_reminder,
@@ -67,7 +85,8 @@ from .database_views import (                                          # Databas
     get_medicine_info as db_get_medicine_info,
     search_medical_knowledge as db_search_knowledge,
     get_medical_explanation as db_get_explanation,
-    get_medical_knowledge_stats as db_get_stats
+    get_medical_knowledge_stats as db_get_stats,
+    _medicine_details as db_medicine_details
 )
 
 # Import database models
@@ -319,6 +338,9 @@ def analyze_prescription(request):
                                 'overall_risk_level': 'UNKNOWN'
                             }
                     
+                    # Check new medicines against the user's standing medications
+                    _check_against_standing_medications(request, medicine_names, response_data)
+                    
                     # Save to prescription history if user is authenticated
                     if request.user.is_authenticated:
                         try:
@@ -435,6 +457,9 @@ def analyze_prescription(request):
                     'overall_risk_level': 'UNKNOWN'
                 }
         
+        # Check new medicines against the user's standing medications
+        _check_against_standing_medications(request, medicine_names, response_data)
+        
         # Save to prescription history if user is authenticated (rule-based fallback)
         if request.user.is_authenticated:
             try:
@@ -611,6 +636,39 @@ def get_reminders(request):
     """Database-backed medication reminders retrieval"""
     return db_get_reminders(request)
 
+def _check_against_standing_medications(request, medicine_names, response_data):
+    """
+    Add interactions between the prescription's new medicines and the
+    user's standing medication list (profile + active reminders).
+    Only new drug × standing drug pairs are checked.
+    """
+    if not request.user.is_authenticated or not medicine_names:
+        return
+    try:
+        response_data['standing_medication_interactions'] = \
+            user_interaction_tracker.check_new_prescription(request.user, medicine_names)
+    except Exception as e:
+        logging.error(f"Standing medication interaction check failed: {e}")
+
+
+def _sync_interaction_state(user):
+    """Update the user's interaction state after their medications changed"""
+    try:
+        user_interaction_tracker.sync(user)
+    except Exception as e:
+        logging.error(f"Failed to update interaction state for {user.username}: {e}")
+
+
+# ============================================================================
+# MEDICINE RESOLUTION CACHE
+# ============================================================================
+# Resolving a name scans the full medicine database (and re-reads the JSON
+# file), so results are memoized per normalized name (drug_normalizer.py:
+# cleaned text + canonical ingredient ID). Callers get deep copies
+# because they add fields to the returned dicts. Filled ahead of traffic by
+# the startup warm-up thread (api/cache_warmup.py, WARM_CACHES_ON_STARTUP=1).
+MEDICINE_RESULT_CACHE_SIZE = 4096
+
 def _get_detailed_medicine_info(medicine_name):
     """Helper function to get detailed medicine information from database"""
     try:
@@ -621,55 +679,62 @@ def _get_detailed_medicine_info(medicine_name):
         if not isinstance(medicine_name, str):
             medicine_name = str(medicine_name)
         
-        # Use the comprehensive medicine database (17,430 medicines)
-        import json
-        import os
-        
-        # Load the ultimate comprehensive database
-        comprehensive_db_path = os.path.join(os.path.dirname(__file__), '..', '..', 'datasets', 'processed', 'enhanced_ultimate_medicine_database.json')
-        try:
-            with open(comprehensive_db_path, 'r') as f:
-                comprehensive_data = json.load(f)
-            medicines = comprehensive_data.get('medicines', [])
-        except:
-            # Fallback to original database
-            original_db_path = os.path.join(os.path.dirname(__file__), '..', 'medicines_database.json')
-            try:
-                with open(original_db_path, 'r') as f:
-                    original_data = json.load(f)
-                medicines = original_data if isinstance(original_data, list) else original_data.get('medicines', [])
-            except:
-                # Final fallback to processor database
-                medicines = processor.medicine_database.get('medicines', [])
-        
-        # Clean the medicine name for better matching
-        clean_name = medicine_name.lower().strip()
-        
-        # Remove dosage information for better matching (e.g., "aspirin 81mg" -> "aspirin")
-        clean_name_no_dosage = re.sub(r'\s*\d+\s*(mg|mcg|g|ml|mcg)\s*', ' ', clean_name).strip()
-        
-        # Simple matching using database synonyms and brand names
-        # Database now has all proper brand names populated
-        for medicine in medicines:
-            db_name = medicine.get('name', '').lower()
-            db_generic = medicine.get('generic_name', '').lower()
-            
-            # Get synonyms and brand names from the dataset
-            synonyms = [str(s).lower() for s in medicine.get('synonyms', [])]
-            brand_names = [str(b).lower() for b in medicine.get('brand_names', [])]
-            all_aliases = synonyms + brand_names
-            
-            # Simple exact match with any alias
-            if (clean_name in all_aliases or clean_name_no_dosage in all_aliases or
-                db_name == clean_name or db_generic == clean_name or
-                db_name == clean_name_no_dosage or db_generic == clean_name_no_dosage):
-                return _format_medicine_details(medicine)
-        
-        return None
+        # No fuzzy fallback: a close name may be a different drug
+        # (suggestions are offered by GET /api/medicines/suggest/)
+        details = _lookup_medicine_details(
+            drug_normalizer.clean(medicine_name), drug_normalizer.normalize(medicine_name)
+        )
+        return copy.deepcopy(details)
     except Exception as e:
         logging.error(f"Error getting detailed medicine info: {e}")
         return None
 
+@lru_cache(maxsize=MEDICINE_RESULT_CACHE_SIZE)
+def _lookup_medicine_details(clean_name, drug_id):
+    """
+    Resolve a medicine against the medicine database (memoized).
+    clean_name / drug_id come from the shared drug name normalizer.
+    """
+    # Use the comprehensive medicine database (17,430 medicines)
+    import json
+    import os
+    
+    # Load the ultimate comprehensive database
+    comprehensive_db_path = os.path.join(os.path.dirname(__file__), '..', '..', 'datasets', 'processed', 'enhanced_ultimate_medicine_database.json')
+    try:
+        with open(comprehensive_db_path, 'r') as f:
+            comprehensive_data = json.load(f)
+        medicines = comprehensive_data.get('medicines', [])
+    except:
+        # Fallback to original database
+        original_db_path = os.path.join(os.path.dirname(__file__), '..', 'medicines_database.json')
+        try:
+            with open(original_db_path, 'r') as f:
+                original_data = json.load(f)
+            medicines = original_data if isinstance(original_data, list) else original_data.get('medicines', [])
+        except:
+            # Final fallback to processor database
+            medicines = processor.medicine_database.get('medicines', [])
+    
+    # Simple matching using database synonyms and brand names
+    # Database now has all proper brand names populated
+    for medicine in medicines:
+        db_name = medicine.get('name', '').lower()
+        db_generic = medicine.get('generic_name', '').lower()
+        
+        # Get synonyms and brand names from the dataset
+        synonyms = [str(s).lower() for s in medicine.get('synonyms', [])]
+        brand_names = [str(b).lower() for b in medicine.get('brand_names', [])]
+        all_aliases = synonyms + brand_names
+        
+        # Simple exact match with any alias, or the canonical ingredient
+        if (clean_name in all_aliases or drug_id in all_aliases or
+            db_name == clean_name or db_generic == clean_name or
+            db_name == drug_id or db_generic == drug_id):
+            return _format_medicine_details(medicine)
+    
+    return None
+
 def _format_medicine_details(medicine):
     """Helper function to format medicine details consistently"""
     # Handle both database formats
@@ -710,19 +775,23 @@ def _get_medicine_alternatives(medicine_name):
     if not medicine_name:
         return []
     
+    alternatives = _find_medicine_alternatives(
+        drug_normalizer.clean(medicine_name), drug_normalizer.normalize(medicine_name)
+    )
+    return copy.deepcopy(alternatives)
+
+@lru_cache(maxsize=MEDICINE_RESULT_CACHE_SIZE)
+def _find_medicine_alternatives(clean_name, drug_id):
+    """Find alternatives for a normalized medicine name (memoized)"""
     medicines = processor.medicine_database.get('medicines', [])
     
-    # Clean the medicine name - remove dosage information for better matching
-    clean_name = medicine_name.lower().strip()
-    clean_name_no_dosage = re.sub(r'\s*\d+\s*(mg|mcg|g|ml|mcg)\s*', ' ', clean_name).strip()
-    
     # Find the medicine
     medicine = None
     for med in medicines:
         if (med.get('name', '').lower() == clean_name or
             med.get('generic_name', '').lower() == clean_name or
-            med.get('name', '').lower() == clean_name_no_dosage or
-            med.get('generic_name', '').lower() == clean_name_no_dosage):
+            med.get('name', '').lower() == drug_id or
+            med.get('generic_name', '').lower() == drug_id):
             medicine = med
             break
     
@@ -841,35 +910,86 @@ def check_drug_interactions(request):
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def search_medical_knowledge(request):
-    """Database-backed medical knowledge search"""
+    """
+    Database-backed medical knowledge search
+    
+    Uses the full-text index (knowledge_search.py): results are ranked by
+    relevance (BM25 / ts_rank) and carry a highlighted snippet. Falls back
+    to the icontains query, paged on (term, id), when no index exists.
+    Paginated with ?limit= (default 20, max 100) and ?cursor= (the
+    next_cursor of the previous page); ranked pages continue after the
+    last (score, id). total_matches is counted on the first ranked page
+    only, up to MAX_COUNTED_MATCHES (total_matches_capped when there are
+    more).
+    """
     try:
         query = request.GET.get('query', '')
-        limit = int(request.GET.get('limit', 20))
+        try:
+            limit = min(int(request.GET.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+            cursor = decode_cursor(request.GET.get('cursor'))
+        except ValueError:
+            return Response({
+                'error': 'limit must be an integer and cursor a next_cursor value'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
         if not query:
             return Response({
                 'error': 'Query parameter is required'
             }, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({
+                'error': 'limit must be positive'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
         # Search in medical knowledge database
         from .models import MedicalKnowledge
         from django.db.models import Q
         
-        knowledge_entries = MedicalKnowledge.objects.filter(
-            Q(term__icontains=query) |
-            Q(explanation__icontains=query) |
-            Q(category__icontains=query)
-        ).order_by('term')[:limit]
+        next_cursor = None
+        total_capped = False
+        ranked = None
+        if knowledge_search_index.is_available():
+            try:
+                after_rank = rank_position(cursor)
+            except ValueError:
+                return Response({
+                    'error': 'Invalid cursor'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            # Matches are only counted (up to MAX_COUNTED_MATCHES) for the first page
+            ranked = knowledge_search_index.search(query, limit=limit, after=after_rank, count=not cursor)
+        if ranked is not None:
+            matches, total, next_after = ranked
+            if next_after is not None:
+                next_cursor = encode_cursor({'ranked': next_after})
+            if total is not None and total > MAX_COUNTED_MATCHES:
+                total, total_capped = MAX_COUNTED_MATCHES, True
+        else:
+            knowledge_entries = MedicalKnowledge.objects.filter(
+                Q(term__icontains=query) |
+                Q(explanation__icontains=query) |
+                Q(category__icontains=query)
+            )
+            try:
+                knowledge_entries, next_cursor = keyset_page(knowledge_entries, 'term', cursor, limit)
+            except ValueError:
+                return Response({
+                    'error': 'Invalid cursor'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            matches = [{'entry': entry, 'rank': None, 'snippet': None} for entry in knowledge_entries]
+            total = None
         
         results = []
-        for entry in knowledge_entries:
+        for match in matches:
+            entry = match['entry']
             results.append({
                 'term': entry.term,
                 'explanation': entry.explanation,
                 'category': entry.category,
                 'related_terms': entry.related_terms,
                 'source': entry.source,
-                'created_at': entry.created_at.isoformat()
+                'created_at': entry.created_at.isoformat(),
+                'rank': match['rank'],
+                'snippet': match['snippet']
             })
         
         return Response({
@@ -877,7 +997,12 @@ def search_medical_knowledge(request):
             'query': query,
             'results': results,
             'total_found': len(results),
-            'database_size': MedicalKnowledge.objects.count()
+            'total_matches': total,
+            'total_matches_capped': total_capped,
+            'limit': limit,
+            'next_cursor': next_cursor,
+            'ranked': ranked is not None,
+            'database_size': table_counter.get(MedicalKnowledge)
         })
         
     except Exception as e:
@@ -891,15 +1016,8 @@ def search_medical_knowledge(request):
 def get_medical_explanation(request, medicine_name):
     """Database-backed medical explanation"""
     try:
-        # Try to find medicine in database
-        from .models import Medicine
-        from django.db.models import Q
-        
-        medicine = Medicine.objects.filter(
-            Q(name__iexact=medicine_name) |
-            Q(generic_name__iexact=medicine_name) |
-            Q(brand_names__icontains=medicine_name)
-        ).first()
+        # Try to find medicine in database (indexed name / alias lookup)
+        medicine = find_medicine(medicine_name)
         
         if medicine and medicine.medical_explanation:
             return Response({
@@ -930,11 +1048,12 @@ def get_medical_knowledge_stats(request):
         from .models import Medicine, MedicalKnowledge, MedicationReminder, PrescriptionHistory
         from django.utils import timezone
         
-        # Get statistics
-        total_medicines = Medicine.objects.count()
-        total_medical_knowledge = MedicalKnowledge.objects.count()
-        total_reminders = MedicationReminder.objects.count()
-        total_prescriptions = PrescriptionHistory.objects.count()
+        # Get statistics (cached table sizes)
+        counts = table_counter.get_many([Medicine, MedicalKnowledge, MedicationReminder, PrescriptionHistory])
+        total_medicines = counts[Medicine._meta.label]
+        total_medical_knowledge = counts[MedicalKnowledge._meta.label]
+        total_reminders = counts[MedicationReminder._meta.label]
+        total_prescriptions = counts[PrescriptionHistory._meta.label]
         
         # Get medicines with detailed explanations
         medicines_with_explanations = Medicine.objects.filter(
@@ -971,15 +1090,31 @@ def get_medical_knowledge_stats(request):
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def search_medicines(request):
-    """Search medicines in the database"""
+    """
+    Search medicines in the database
+    
+    Results are in name order, paginated on (name, id) with ?limit=
+    (default 20, max 100) and ?cursor= (the next_cursor of the previous
+    page).
+    """
     try:
         query = request.GET.get('query', '')
-        limit = int(request.GET.get('limit', 20))
+        try:
+            limit = min(int(request.GET.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+            cursor = decode_cursor(request.GET.get('cursor'))
+        except ValueError:
+            return Response({
+                'error': 'limit must be an integer and cursor a next_cursor value'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
         if not query:
             return Response({
                 'error': 'Query parameter is required'
             }, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({
+                'error': 'limit must be positive'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
         # Search in medicines database
         from .models import Medicine
@@ -989,7 +1124,13 @@ def search_medicines(request):
             Q(name__icontains=query) |
             Q(generic_name__icontains=query) |
             Q(brand_names__icontains=query)
-        ).order_by('name')[:limit]
+        )
+        try:
+            medicines, next_cursor = keyset_page(medicines, 'name', cursor, limit)
+        except ValueError:
+            return Response({
+                'error': 'Invalid cursor'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
         results = []
         for medicine in medicines:
@@ -1013,7 +1154,9 @@ def search_medicines(request):
             'query': query,
             'medicines': results,
             'total_found': len(results),
-            'database_size': Medicine.objects.count()
+            'limit': limit,
+            'next_cursor': next_cursor,
+            'database_size': table_counter.get(Medicine)
         })
         
     except Exception as e:
@@ -1022,6 +1165,60 @@ def search_medicines(request):
             'error': f'Search failed: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+# Names resolved per POST /api/medicines/batch/ request
+BATCH_LOOKUP_MAX = 100
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def batch_medicine_info(request):
+    """
+    Details for many medicines at once
+    
+    Body: {"medicines": ["Advil", "metformin 500mg", ...]} (at most 100).
+    Names are resolved like the single-medicine lookups (name, generic
+    name, brand names / synonyms) in one database query.
+    """
+    try:
+        names = request.data.get('medicines', [])
+        if not isinstance(names, list) or not names:
+            return Response({
+                'error': 'medicines must be a non-empty list of names'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if len(names) > BATCH_LOOKUP_MAX:
+            return Response({
+                'error': f'At most {BATCH_LOOKUP_MAX} medicines per request'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        names = [str(name) for name in names]
+        medicines_by_name = find_medicines(names)
+        
+        results = []
+        not_found = []
+        for name in dict.fromkeys(names):
+            medicine = medicines_by_name.get(name)
+            if medicine is None:
+                not_found.append(name)
+                continue
+            results.append({
+                'query': name,
+                'id': medicine.id,
+                'name': medicine.name,
+                **db_medicine_details(medicine)
+            })
+        
+        return Response({
+            'status': 'success',
+            'medicines': results,
+            'not_found': not_found,
+            'total_found': len(results)
+        })
+        
+    except Exception as e:
+        logger.error(f"Error in batch medicine lookup: {e}")
+        return Response({
+            'error': f'Batch lookup failed: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 @api_view(['POST'])
 def validate_prescription_safety(request):
     """
@@ -1049,19 +1246,128 @@ def validate_prescription_safety(request):
             'error': f'An error occurred: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def autocomplete_medicines(request):
+    """
+    Prefix completions for the medicine search box (every keystroke)
+    
+    Served from the prebuilt trie over names, generic names and brand
+    names (medicine_autocomplete.py) without a database query; most
+    prescribed first. ?limit= defaults to 10, max 50. 503 until the
+    index file has been built.
+    """
+    try:
+        query = request.GET.get('query', '')
+        if not query.strip():
+            return Response({
+                'error': 'Query parameter is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(int(request.GET.get('limit', AUTOCOMPLETE_DEFAULT_LIMIT)), AUTOCOMPLETE_MAX_LIMIT)
+        except ValueError:
+            return Response({
+                'error': 'limit must be an integer'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({
+                'error': 'limit must be positive'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not medicine_autocomplete.is_ready():
+            return Response({
+                'error': 'Autocomplete index is not built yet (python manage.py build_autocomplete_index)'
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        
+        completions = medicine_autocomplete.complete(query, limit=limit)
+        
+        return Response({
+            'status': 'success',
+            'query': query,
+            'medicines': completions,
+            'total_found': len(completions)
+        })
+        
+    except Exception as e:
+        logger.error(f"Error completing medicine names: {e}")
+        return Response({
+            'error': f'Autocomplete failed: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def suggest_medicines(request):
+    """
+    Typo-tolerant medicine name suggestions ("amoxicilin" -> amoxicillin)
+    
+    Answered from the in-memory trigram index over names, brands and
+    synonyms (no database query). ?limit= defaults to 5, max 20.
+    """
+    try:
+        query = request.GET.get('query', '').strip()
+        if not query:
+            return Response({
+                'error': 'Query parameter is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(int(request.GET.get('limit', 5)), 20)
+        except ValueError:
+            return Response({
+                'error': 'limit must be an integer'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({
+                'error': 'limit must be positive'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        suggestions = medicine_trigram_index.suggest(query, limit=limit)
+        
+        return Response({
+            'status': 'success',
+            'query': query,
+            'suggestions': suggestions,
+            'total_found': len(suggestions)
+        })
+        
+    except Exception as e:
+        logger.error(f"Error suggesting medicines: {e}")
+        return Response({
+            'error': f'Suggestion failed: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 @api_view(['GET'])
 def get_medicine_interactions(request, medicine_name):
     """
     Get all interactions for a specific medicine
+    
+    Answered from the checker's precomputed adjacency map (most severe
+    first). Paginated with ?limit= (default 50, max 200) and ?offset=.
     """
     try:
-        interactions = interaction_checker.get_medicine_interactions(medicine_name)
+        try:
+            limit = min(int(request.GET.get('limit', 50)), 200)
+            offset = int(request.GET.get('offset', 0))
+        except ValueError:
+            return Response({
+                'error': 'limit and offset must be integers'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1 or offset < 0:
+            return Response({
+                'error': 'limit must be positive and offset must not be negative'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        interactions, total = interaction_checker.get_medicine_interactions_page(
+            medicine_name, limit=limit, offset=offset
+        )
         
         return Response({
             'status': 'success',
             'medicine': medicine_name,
             'interactions': interactions,
-            'total_interactions': len(interactions)
+            'total_interactions': total,
+            'limit': limit,
+            'offset': offset,
+            'next_offset': offset + limit if offset + limit < total else None
         })
         
     except Exception as e:
@@ -1100,6 +1406,26 @@ def get_interaction_details(request, medicine1, medicine2):
             'error': f'An error occurred: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_user_interaction_state(request):
+    """
+    Get interactions among the user's standing medications
+    (profile medications + active reminders), as last synced; read only,
+    up_to_date tells whether a sync is pending
+    """
+    try:
+        return Response({
+            'status': 'success',
+            'data': user_interaction_tracker.get_state(request.user)
+        })
+        
+    except Exception as e:
+        logging.error(f"Error getting user interaction state: {e}")
+        return Response({
+            'error': f'An error occurred: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 @api_view(['POST'])
 def analyze_prescription_with_safety(request):
     """Database-backed prescription analysis with safety checks"""
@@ -1159,7 +1485,11 @@ def get_medicine_info_enhanced(request, medicine_name):
 @api_view(['POST'])
 def bulk_download_medicine_data(request):
     """
-    Bulk download and cache medicine data from all sources
+    Queue a background download of medicine data from all sources.
+    
+    Returns 202 with a job id right away; poll
+    GET /api/interactions/enhanced/bulk-download/<job_id>/ for progress.
+    For large runs use: python manage.py prefetch_drug_data
     """
     try:
         medicine_names = request.data.get('medicines', [])
@@ -1169,14 +1499,14 @@ def bulk_download_medicine_data(request):
                 'error': 'No medicines provided'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Bulk download data
-        results = enhanced_interaction_checker.bulk_download_medicine_data(medicine_names)
+        # Enqueue only - the work runs on a background thread
+        job_id = enqueue_prefetch(medicine_names)
         
         return Response({
-            'status': 'success',
-            'message': f'Downloaded data for {len(medicine_names)} medicines',
-            'results': results
-        })
+            'status': 'queued',
+            'message': f'Queued download of data for {len(medicine_names)} medicines',
+            'job_id': job_id
+        }, status=status.HTTP_202_ACCEPTED)
         
     except Exception as e:
         logging.error(f"Error in bulk download: {e}")
@@ -1184,6 +1514,22 @@ def bulk_download_medicine_data(request):
             'error': f'An error occurred: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['GET'])
+def get_bulk_download_status(request, job_id):
+    """
+    Get the status (and summary, once finished) of a bulk download job
+    """
+    job = get_prefetch_job(job_id)
+    if job is None:
+        return Response({
+            'error': 'Job not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response({
+        'status': 'success',
+        'data': job
+    })
+
 @api_view(['GET'])
 def get_cache_stats(request):
     """
@@ -1203,6 +1549,24 @@ def get_cache_stats(request):
             'error': f'An error occurred: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['GET'])
+def get_transport_stats(request):
+    """
+    Get connection pool, rate limiter and circuit breaker state for the
+    external drug APIs (OpenFDA, RxNorm)
+    """
+    try:
+        return Response({
+            'status': 'success',
+            'data': http_transport.get_stats()
+        })
+        
+    except Exception as e:
+        logging.error(f"Error getting transport stats: {e}")
+        return Response({
+            'error': f'An error occurred: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 @api_view(['POST'])
 def analyze_prescription_enhanced(request):
     """
@@ -1623,6 +1987,9 @@ def create_reminder(request):
             related_reminder_id=reminder.id
         )
         
+        # New standing medication: check only its pairs
+        _sync_interaction_state(request.user)
+        
         return Response({
             'status': 'success',
             'reminder': {
@@ -1664,6 +2031,7 @@ def update_reminder(request, reminder_id):
             reminder.end_date = data['end_date']
         
         reminder.save()
+        _sync_interaction_state(request.user)
         
         return Response({
             'status': 'success',
@@ -1691,6 +2059,7 @@ def delete_reminder(request, reminder_id):
             user=request.user
         )
         reminder.delete()
+        _sync_interaction_state(request.user)
         
         return Response({
             'status': 'success',
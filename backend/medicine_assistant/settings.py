@@ -10,11 +10,22 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import atexit
+import os
+import shutil
+import sys
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Test runs keep the external API cache, rate limit bucket, label store and
+# lock files (api/cache_store.py CACHE_DIR) out of backend/datasets/cache
+if sys.argv[1:2] == ['test'] and 'MEDICINE_CACHE_DIR' not in os.environ:
+    os.environ['MEDICINE_CACHE_DIR'] = tempfile.mkdtemp(prefix='medicine-cache-')
+    atexit.register(shutil.rmtree, os.environ['MEDICINE_CACHE_DIR'], ignore_errors=True)
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -7,10 +7,15 @@ Collects medicine information from various public APIs and sources
 import requests
 import json
 import csv
+import sys
 import time
 from pathlib import Path
 import logging
 
+# Share the backend's pooled HTTP transport (keep-alive + retry/backoff)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / "backend"))
+from api.http_transport import http_transport
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -41,7 +46,7 @@ class MedicineDataCollector:
                 'search': 'effective_time:[20200101+TO+20241231]'  # Recent drugs
             }
             
-            response = requests.get(base_url, params=params, timeout=30)
+            response = http_transport.get(base_url, params=params, timeout=30, rate_limit_wait=60)
             response.raise_for_status()
             
             data = response.json()